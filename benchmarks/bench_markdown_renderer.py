@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Benchmark the shared Markdown renderer against the legacy multi-pass converter.
+
+Reports conversion time per MB of UTF-8 input and checks that both produce
+identical HTML. Without --base-dir a synthetic corpus is generated.
+
+Usage:
+  python benchmarks/bench_markdown_renderer.py                # synthetic corpus
+  python benchmarks/bench_markdown_renderer.py --base-dir .   # real KB
+"""
+
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+from typing import Callable, List
+
+# Make src and the legacy reference (tests/) importable
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for path in (os.path.join(ROOT_DIR, "src"), os.path.join(ROOT_DIR, "tests")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from document_generator.markdown_renderer import markdown_to_html  # noqa: E402
+from legacy_markdown import legacy_markdown_to_html  # noqa: E402
+
+_BLOCKS = [
+    "## 小节标题\n\n",
+    "这是用于基准测试的填充文本，包含一些常见的中文字符。Some latin filler text. ",
+    "**重点**内容，以及*强调*的部分。",
+    "参见 [知乎回答](https://www.zhihu.com/question/12345/answer_67890)。",
+    "\n\n- 列表项一\n- 列表项二\n- 列表项三\n\n",
+    "\n\n1. 第一步\n2. 第二步\n\n",
+    "\n\n> 引用的一段话。\n\n",
+    "\n\n---\n\n",
+    "\n\n",
+]
+
+
+def make_synthetic_corpus(files: int, size: int, seed: int = 0) -> List[str]:
+    """Random articles mixing paragraphs, emphasis, links, lists, quotes and rules."""
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(files):
+        parts = [f"# 文章 {i}\n\n"]
+        while sum(len(p) for p in parts) < size:
+            parts.append(rng.choice(_BLOCKS))
+        corpus.append("".join(parts))
+    return corpus
+
+
+def load_kb_corpus(base_dir: str) -> List[str]:
+    pattern = os.path.join(base_dir, "knowledge_base", "sth-matters", "**", "*.md")
+    corpus = []
+    for path in sorted(glob.glob(pattern, recursive=True)):
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            corpus.append(f.read())
+    return corpus
+
+
+def time_renderer(render: Callable[[str], str], corpus: List[str], repeat: int) -> float:
+    """Return the best wall-clock time of `repeat` passes over the corpus."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in corpus:
+            render(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Markdown renderer: legacy vs single-pass")
+    parser.add_argument("--base-dir", help="Project root with a real knowledge_base/ (default: synthetic corpus)")
+    parser.add_argument("--files", type=int, default=200, help="Synthetic article count")
+    parser.add_argument("--size", type=int, default=20000, help="Synthetic article size in characters")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.base_dir:
+        corpus = load_kb_corpus(args.base_dir)
+    else:
+        print(f"Generating synthetic corpus: {args.files} articles x {args.size} chars")
+        corpus = make_synthetic_corpus(args.files, args.size)
+    megabytes = sum(len(text.encode("utf-8")) for text in corpus) / (1024 * 1024)
+    if not megabytes:
+        print("Empty corpus")
+        return 1
+
+    mismatches = sum(1 for text in corpus
+                     if markdown_to_html(text, "_blank") != legacy_markdown_to_html(text, "_blank"))
+    print(f"{len(corpus)} articles, {megabytes:.1f} MB, {mismatches} mismatching outputs")
+
+    print(f"{'renderer':>10} {'s/MB':>8} {'speedup':>8}")
+    legacy = time_renderer(lambda text: legacy_markdown_to_html(text, "_blank"), corpus, args.repeat)
+    shared = time_renderer(lambda text: markdown_to_html(text, "_blank"), corpus, args.repeat)
+    print(f"{'legacy':>10} {legacy / megabytes:>8.3f} {1.0:>7.2f}x")
+    print(f"{'shared':>10} {shared / megabytes:>8.3f} {legacy / shared:>7.2f}x")
+    return 0 if mismatches == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
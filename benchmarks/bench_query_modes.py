@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Benchmark quick search query modes (literal vs regex vs boolean).
+
+Runs every query with the result cache disabled, so each timing is a full
+match pass. Without --base-dir a synthetic KB is generated.
+
+Usage:
+  python benchmarks/bench_query_modes.py                       # synthetic KB
+  python benchmarks/bench_query_modes.py --base-dir .          # real KB
+  python benchmarks/bench_query_modes.py --base-dir . --index  # with build-index first
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+# Make src importable
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+for path in (SRC_DIR, os.path.dirname(os.path.abspath(__file__))):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from bench_quick_search import make_synthetic_kb  # noqa: E402
+from quick_search import build_search_index, perform_quick_search  # noqa: E402
+
+# (label, topic, mode)
+QUERIES = [
+    ("literal CJK", "社会化", "literal"),
+    ("regex CJK", "社会化", "regex"),
+    ("literal Latin", "latin", "literal"),
+    ("regex Latin", "latin", "regex"),
+    ("regex pattern", "社会.{0,4}教育", "regex"),
+    ("boolean", "社会化 -伦理 | 家庭教育", "boolean"),
+]
+
+
+def time_query(topic: str, mode: str, base_dir: str, repeat: int) -> float:
+    """Return the best wall-clock time of `repeat` uncached searches."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            perform_quick_search(topic, base_dir, mode=mode, use_cache=False, slim=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Quick search query mode benchmark")
+    parser.add_argument("--base-dir", help="Project root with a real knowledge_base/ (default: synthetic KB)")
+    parser.add_argument("--files", type=int, default=3000, help="Synthetic KB file count")
+    parser.add_argument("--size", type=int, default=8000, help="Synthetic article size in characters")
+    parser.add_argument("--index", action="store_true", help="Build the search index before timing")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base_dir = args.base_dir
+        if base_dir is None:
+            base_dir = tmp
+            print(f"Generating synthetic KB: {args.files} files x {args.size} chars")
+            make_synthetic_kb(base_dir, args.files, args.size)
+        if args.index:
+            with contextlib.redirect_stdout(io.StringIO()):
+                build_search_index(base_dir)
+
+        print(f"repeat={args.repeat} (best of), index={'yes' if args.index else 'no'}")
+        print(f"{'query':<16} {'mode':<8} {'seconds':>10}")
+        for label, topic, mode in QUERIES:
+            seconds = time_query(topic, mode, base_dir, args.repeat)
+            print(f"{label:<16} {mode:<8} {seconds:>10.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
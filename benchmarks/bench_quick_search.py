@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Benchmark quick search scan modes.
+
+Usage:
+  python benchmarks/bench_quick_search.py                      # synthetic KB
+  python benchmarks/bench_quick_search.py --base-dir .         # real KB
+  python benchmarks/bench_quick_search.py --workers 1 4 16 --topic 社会化
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import List
+
+# Make src importable
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SRC_DIR = os.path.join(ROOT_DIR, "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from quick_search import perform_quick_search  # noqa: E402
+
+_WORDS = ["社会化", "认知偏差", "家庭教育", "人格发展", "伦理", "自我认知",
+          "AI", "功夫", "核心能力", "亲子关系", "实践", "批判"]
+
+
+def make_synthetic_kb(base_dir: str, files: int, size: int, seed: int = 0) -> None:
+    """Write a knowledge_base/sth-matters tree of random CJK/Latin articles."""
+    rng = random.Random(seed)
+    filler = "这是用于基准测试的填充文本，包含一些常见的中文字符。Some latin filler text. "
+    for i in range(files):
+        folder = os.path.join(base_dir, "knowledge_base", "sth-matters", f"dir_{i % 20:02d}")
+        os.makedirs(folder, exist_ok=True)
+        parts: List[str] = [f"# 文章 {i}\n\n"]
+        while sum(len(p) for p in parts) < size:
+            parts.append(filler)
+            if rng.random() < 0.05:
+                parts.append(rng.choice(_WORDS))
+        with open(os.path.join(folder, f"article_{i:05d}.md"), "w", encoding="utf-8") as f:
+            f.write("".join(parts))
+
+
+def time_search(topic: str, base_dir: str, workers: int, repeat: int) -> float:
+    """Return the best wall-clock time of `repeat` searches."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            perform_quick_search(topic, base_dir, workers=workers)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Quick search serial vs parallel benchmark")
+    parser.add_argument("--base-dir", help="Project root with a real knowledge_base/ (default: synthetic KB)")
+    parser.add_argument("--files", type=int, default=3000, help="Synthetic KB file count")
+    parser.add_argument("--size", type=int, default=8000, help="Synthetic article size in characters")
+    parser.add_argument("--topic", default="社会化")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        base_dir = args.base_dir
+        if base_dir is None:
+            base_dir = tmp
+            print(f"Generating synthetic KB: {args.files} files x {args.size} chars")
+            make_synthetic_kb(base_dir, args.files, args.size)
+
+        print(f"topic={args.topic!r}  repeat={args.repeat} (best of)")
+        print(f"{'workers':>8} {'seconds':>10} {'speedup':>8}")
+        baseline = None
+        for workers in sorted(set(args.workers)):
+            seconds = time_search(args.topic, base_dir, workers, args.repeat)
+            baseline = baseline or seconds
+            print(f"{workers:>8} {seconds:>10.3f} {baseline / seconds:>7.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
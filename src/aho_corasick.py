@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Aho-Corasick: match many keywords against a text in one linear pass.
+
+Used by quick search for multi-keyword topics such as
+``"关键词1 | 关键词2 | 关键词3"`` instead of a backtracking regex alternation.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+class AhoCorasick:
+    """Keyword automaton; build once per query, then scan any number of texts."""
+
+    def __init__(self, keywords: Iterable[str], ignore_case: bool = True):
+        self.ignore_case = ignore_case
+        self.keywords: List[str] = []
+        self._lengths: List[int] = []
+        # Trie as parallel lists: transitions, failure link, keyword ids ending here
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        for keyword in keywords:
+            if keyword and keyword not in self.keywords:
+                self._add(keyword)
+        self._build_failure_links()
+
+    def _normalize(self, text: str) -> str:
+        return text.lower() if self.ignore_case else text
+
+    def _add(self, keyword: str) -> None:
+        keyword_id = len(self.keywords)
+        self.keywords.append(keyword)
+        normalized = self._normalize(keyword)
+        self._lengths.append(len(normalized))
+        node = 0
+        for ch in normalized:
+            next_node = self._goto[node].get(ch)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][ch] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = next_node
+        self._out[node].append(keyword_id)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                # Inherit the outputs reachable through the failure link
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """Yield (start offset, keyword) for every occurrence, overlaps included.
+
+        Offsets refer to the case-normalized text, which has the same length
+        as the input for all but a handful of special characters.
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        keywords, lengths = self.keywords, self._lengths
+        node = 0
+        for pos, ch in enumerate(self._normalize(text)):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for keyword_id in out[node]:
+                yield pos - lengths[keyword_id] + 1, keywords[keyword_id]
+
+    def count(self, text: str) -> Dict[str, int]:
+        """Return {keyword: occurrences} for the keywords found in text."""
+        counts: Dict[str, int] = {}
+        for _, keyword in self.iter_matches(text):
+            counts[keyword] = counts.get(keyword, 0) + 1
+        return counts
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Chunker: split knowledge base articles into heading and paragraph chunks.
+
+A chunk is a heading line or a paragraph (a run of non-blank lines; fenced
+code blocks stay whole) with its character offsets in the article and the
+path of headings it sits under. Chunk ids hash the article path and the
+chunk text, so they survive edits elsewhere in the article.
+
+The chunk table of the whole knowledge base is persisted next to the
+inverted index and maintained by build-index/update-index; search maps its
+match spans onto it to report the best chunks of every result.
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+CHUNKS_FILENAME = "chunks.json"
+CHUNKS_VERSION = 1
+
+# Best chunks reported per search result
+MAX_BEST_CHUNKS = 3
+
+_HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+_FENCE_RE = re.compile(r'^\s*(```|~~~)')
+
+# Loaded chunk tables keyed by path, invalidated when the file's mtime changes
+_LOADED: Dict[str, "ChunkTable"] = {}
+
+
+class Chunk(NamedTuple):
+    chunk_id: str
+    start: int
+    end: int
+    kind: str  # "heading" or "paragraph"
+    heading_path: Tuple[str, ...]
+
+
+def chunk_id(rel_path: str, text: str, occurrence: int = 0) -> str:
+    """Stable id of a chunk; occurrence tells repeated identical chunks apart."""
+    payload = f"{rel_path}\0{text}\0{occurrence}" if occurrence else f"{rel_path}\0{text}"
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def chunk_document(rel_path: str, content: str) -> List[Chunk]:
+    """Split an article into heading and paragraph chunks, in document order."""
+    chunks: List[Chunk] = []
+    headings: List[Tuple[int, str]] = []
+    seen: Dict[str, int] = {}
+
+    def emit(start: int, end: int, kind: str) -> None:
+        text = content[start:end]
+        occurrence = seen.get(text, 0)
+        seen[text] = occurrence + 1
+        path = tuple(title for _, title in headings)
+        chunks.append(Chunk(chunk_id(rel_path, text, occurrence), start, end, kind, path))
+
+    para_start: Optional[int] = None
+    para_end = 0
+    in_fence = False
+    pos = 0
+    for line in content.splitlines(keepends=True):
+        line_start, pos = pos, pos + len(line)
+        stripped = line.rstrip('\r\n')
+        line_end = line_start + len(stripped)
+
+        if _FENCE_RE.match(stripped):
+            in_fence = not in_fence
+        elif not in_fence:
+            heading = _HEADING_RE.match(stripped)
+            if heading or not stripped.strip():
+                if para_start is not None:
+                    emit(para_start, para_end, "paragraph")
+                    para_start = None
+                if heading:
+                    level = len(heading.group(1))
+                    while headings and headings[-1][0] >= level:
+                        headings.pop()
+                    emit(line_start, line_end, "heading")
+                    headings.append((level, heading.group(2)))
+                continue
+
+        if para_start is None:
+            para_start = line_start
+        para_end = line_end
+
+    if para_start is not None:
+        emit(para_start, para_end, "paragraph")
+    return chunks
+
+
+def best_chunks(chunks: Sequence[Chunk], spans: Iterable[Tuple[int, int]],
+                limit: int = MAX_BEST_CHUNKS) -> List[Dict]:
+    """Map match spans onto chunks and return the chunks with the most hits.
+
+    Ties go to the earlier chunk; the result is ordered by hits, then position.
+    """
+    ends = [chunk.end for chunk in chunks]
+    hits: Dict[int, int] = {}
+    for start, _ in spans:
+        i = bisect.bisect_right(ends, start)
+        if i < len(chunks) and chunks[i].start <= start:
+            hits[i] = hits.get(i, 0) + 1
+    ranked = sorted(hits, key=lambda i: (-hits[i], i))[:limit]
+    return [{
+        "chunk_id": chunks[i].chunk_id,
+        "start": chunks[i].start,
+        "end": chunks[i].end,
+        "kind": chunks[i].kind,
+        "heading_path": list(chunks[i].heading_path),
+        "hits": hits[i],
+    } for i in ranked]
+
+
+class ChunkTable:
+    """Chunks of every knowledge base article, with the content hash they belong to."""
+
+    def __init__(self, documents: Optional[Dict[str, Dict]] = None):
+        self.documents: Dict[str, Dict] = documents or {}
+        self._mtime: Optional[float] = None
+
+    def add_document(self, rel_path: str, content: str, digest: str) -> None:
+        self.documents[rel_path] = {
+            "hash": digest,
+            "chunks": [[c.chunk_id, c.start, c.end, c.kind, list(c.heading_path)]
+                       for c in chunk_document(rel_path, content)],
+        }
+
+    def remove_documents(self, rel_paths: Iterable[str]) -> None:
+        for rel_path in rel_paths:
+            self.documents.pop(rel_path, None)
+
+    def __len__(self) -> int:
+        return sum(len(doc["chunks"]) for doc in self.documents.values())
+
+    def chunks(self, rel_path: str, digest: Optional[str] = None) -> Optional[List[Chunk]]:
+        """Stored chunks of an article, or None if unknown or stored for other content."""
+        doc = self.documents.get(rel_path)
+        if doc is None or (digest is not None and doc["hash"] != digest):
+            return None
+        return [Chunk(cid, start, end, kind, tuple(path))
+                for cid, start, end, kind, path in doc["chunks"]]
+
+    def save(self, index_dir: str) -> str:
+        """Atomically write the chunk table into index_dir and return its path."""
+        os.makedirs(index_dir, exist_ok=True)
+        chunks_path = os.path.join(index_dir, CHUNKS_FILENAME)
+        tmp_path = chunks_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": CHUNKS_VERSION, "documents": self.documents},
+                      f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, chunks_path)
+        self._mtime = os.path.getmtime(chunks_path)
+        _LOADED[chunks_path] = self
+        return chunks_path
+
+    @classmethod
+    def load(cls, index_dir: str) -> Optional["ChunkTable"]:
+        """Load the chunk table from index_dir, or return None if it is missing or outdated."""
+        chunks_path = os.path.join(index_dir, CHUNKS_FILENAME)
+        try:
+            mtime = os.path.getmtime(chunks_path)
+        except OSError:
+            return None
+
+        cached = _LOADED.get(chunks_path)
+        if cached is not None and cached._mtime == mtime:
+            return cached
+
+        try:
+            with open(chunks_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error loading chunk table {chunks_path}: {e}")
+            return None
+        if data.get("version") != CHUNKS_VERSION:
+            return None
+
+        table = cls(data["documents"])
+        table._mtime = mtime
+        _LOADED[chunks_path] = table
+        return table
+
+
+def document_chunks(rel_path: str, content: str, digest: str,
+                    table: Optional[ChunkTable] = None) -> List[Chunk]:
+    """Chunks of an article from the table when current, otherwise chunked now."""
+    chunks = table.chunks(rel_path, digest) if table is not None else None
+    return chunks if chunks is not None else chunk_document(rel_path, content)
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Dedup: collapse mirrored articles into one search result.
+
+The same article is often reachable under several trees of the knowledge base
+(e.g. ``【文章目录】/...`` and ``【答集】/...``). Exact mirrors share a content
+hash (the manifest's SHA-1); near-duplicates (re-formatted copies, an added
+footer) are found with MinHash signatures over character shingles, bucketed
+with LSH so only likely pairs are compared. Signatures are computed once at
+index time by build-index/update-index and stored next to the index.
+"""
+
+import os
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+import kb_index
+
+SIGNATURES_FILENAME = "minhash.npz"
+
+NUM_PERM = 64
+SHINGLE_SIZE = 5
+# 16 bands of 4 rows: pairs above ~0.5 Jaccard similarity share a bucket
+LSH_BANDS = 16
+NEAR_DUP_THRESHOLD = 0.9
+
+_PRIME = (1 << 31) - 1
+_BASE = 1_000_003
+_rng = np.random.RandomState(20240101)
+_PERM_A = _rng.randint(1, _PRIME, size=NUM_PERM).astype(np.uint64)
+_PERM_B = _rng.randint(0, _PRIME, size=NUM_PERM).astype(np.uint64)
+_WHITESPACE = re.compile(r'\s+')
+
+# Loaded signature stores keyed by path, invalidated when the file's mtime changes
+_LOADED: Dict[str, "SignatureStore"] = {}
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    """Hash every SHINGLE_SIZE-character shingle of text (vectorized rolling hash)."""
+    text = _WHITESPACE.sub(' ', text).strip()
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    if codes.size == 0:
+        return codes
+    width = min(SHINGLE_SIZE, codes.size)
+    count = codes.size - width + 1
+    hashes = np.zeros(count, dtype=np.uint64)
+    for offset in range(width):
+        hashes = (hashes * _BASE + codes[offset:offset + count]) % _PRIME
+    return np.unique(hashes)
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """Return the NUM_PERM-value MinHash signature of text."""
+    hashes = _shingle_hashes(text)
+    if hashes.size == 0:
+        return np.full(NUM_PERM, _PRIME, dtype=np.uint32)
+    permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % _PRIME
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def estimate_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimate the Jaccard similarity of two documents from their signatures."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def category_of(rel_path: str) -> str:
+    """Return the top-level knowledge base directory of a relative path."""
+    parts = rel_path.replace('\\', '/').split('/')
+    return parts[0] if len(parts) > 1 else ""
+
+
+class SignatureStore:
+    """MinHash signatures of the knowledge base, keyed by relative path."""
+
+    def __init__(self, signatures: Optional[Dict[str, np.ndarray]] = None):
+        self.signatures: Dict[str, np.ndarray] = dict(signatures or {})
+        self._mtime: Optional[float] = None
+
+    def add_document(self, rel_path: str, content: str) -> None:
+        self.signatures[rel_path] = minhash_signature(content)
+
+    def remove_documents(self, rel_paths: Iterable[str]) -> None:
+        for rel_path in rel_paths:
+            self.signatures.pop(rel_path, None)
+
+    def get(self, rel_path: str) -> Optional[np.ndarray]:
+        return self.signatures.get(rel_path)
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def save(self, index_dir: str) -> str:
+        """Atomically write the signatures into index_dir and return the path."""
+        os.makedirs(index_dir, exist_ok=True)
+        store_path = os.path.join(index_dir, SIGNATURES_FILENAME)
+        tmp_path = store_path + ".tmp.npz"
+        paths = sorted(self.signatures)
+        matrix = (np.stack([self.signatures[p] for p in paths]) if paths
+                  else np.zeros((0, NUM_PERM), dtype=np.uint32))
+        np.savez(tmp_path, paths=np.array(paths, dtype=str), signatures=matrix)
+        os.replace(tmp_path, store_path)
+        self._mtime = os.path.getmtime(store_path)
+        _LOADED[store_path] = self
+        return store_path
+
+    @classmethod
+    def load(cls, index_dir: str) -> Optional["SignatureStore"]:
+        """Load the signatures from index_dir, or return None if they are missing."""
+        store_path = os.path.join(index_dir, SIGNATURES_FILENAME)
+        try:
+            mtime = os.path.getmtime(store_path)
+        except OSError:
+            return None
+
+        cached = _LOADED.get(store_path)
+        if cached is not None and cached._mtime == mtime:
+            return cached
+
+        try:
+            with np.load(store_path) as data:
+                paths, matrix = data["paths"], data["signatures"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error loading MinHash signatures {store_path}: {e}")
+            return None
+        if matrix.ndim != 2 or matrix.shape[1] != NUM_PERM:
+            return None
+
+        store = cls({str(p): matrix[i] for i, p in enumerate(paths)})
+        store._mtime = mtime
+        _LOADED[store_path] = store
+        return store
+
+
+def duplicate_groups(hashes: Sequence[Optional[str]],
+                     signatures: Sequence[Optional[np.ndarray]],
+                     threshold: float = NEAR_DUP_THRESHOLD) -> List[List[int]]:
+    """
+    Group item indices that are exact (same hash) or near duplicates.
+
+    Groups are listed by their first member and keep the input order inside,
+    so with ranked input the best-ranked item of a group comes first.
+    """
+    parent = list(range(len(hashes)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i: int, j: int) -> None:
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            # The earlier item stays the representative
+            parent[max(ri, rj)] = min(ri, rj)
+
+    first_by_hash: Dict[str, int] = {}
+    for i, digest in enumerate(hashes):
+        if digest is None:
+            continue
+        if digest in first_by_hash:
+            union(first_by_hash[digest], i)
+        else:
+            first_by_hash[digest] = i
+
+    rows = NUM_PERM // LSH_BANDS
+    buckets: Dict[tuple, List[int]] = {}
+    for i, signature in enumerate(signatures):
+        if signature is None:
+            continue
+        for band in range(LSH_BANDS):
+            key = (band, signature[band * rows:(band + 1) * rows].tobytes())
+            for j in buckets.setdefault(key, []):
+                if find(i) != find(j) and estimate_similarity(signature, signatures[j]) >= threshold:
+                    union(j, i)
+            buckets[key].append(i)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(hashes)):
+        groups.setdefault(find(i), []).append(i)
+    return [groups[root] for root in sorted(groups)]
+
+
+def collapse_duplicates(items: List[Dict[str, Any]],
+                        hash_of: Callable[[Dict[str, Any]], Optional[str]],
+                        signature_of: Callable[[Dict[str, Any]], Optional[np.ndarray]],
+                        path_of: Callable[[Dict[str, Any]], str],
+                        categories_of: Callable[[Dict[str, Any]], List[str]],
+                        threshold: float = NEAR_DUP_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Keep the first item of every duplicate group.
+
+    The kept item gets ``alternate_paths`` (the paths of the collapsed
+    mirrors) and ``categories`` (the distinct categories of the whole group).
+    """
+    groups = duplicate_groups([hash_of(item) for item in items],
+                              [signature_of(item) for item in items], threshold)
+    collapsed = []
+    for group in groups:
+        primary = items[group[0]]
+        primary["alternate_paths"] = [path_of(items[i]) for i in group[1:]]
+        categories: List[str] = []
+        for i in group:
+            for category in categories_of(items[i]):
+                if category and category not in categories:
+                    categories.append(category)
+        primary["categories"] = categories
+        collapsed.append(primary)
+    return collapsed
+
+
+def collapse_sources(sources: List[Dict[str, Any]], kb_dir: str,
+                     resolve_path: Callable[[str], str]) -> List[Dict[str, Any]]:
+    """
+    Collapse mirrored sources of a search index before documents are generated.
+
+    Hashes come from the source's ``content_hash``, else from the KB manifest,
+    else from the file itself; near-duplicates use the stored signatures.
+    ``resolve_path`` maps a source's file path to an absolute path.
+    """
+    index_dir = kb_index.default_index_dir(kb_dir)
+    hashes = kb_index.manifest_hashes(index_dir)
+    store = SignatureStore.load(index_dir)
+
+    keys: Dict[int, tuple] = {}
+    for source in sources:
+        file_path = source.get('file_path') or source.get('path') or ""
+        full_path = resolve_path(file_path) if file_path else ""
+        rel_path = os.path.relpath(full_path, kb_dir) if full_path else ""
+        digest = source.get('content_hash') or hashes.get(rel_path)
+        if digest is None and source.get('full_content'):
+            digest = kb_index.content_hash(source['full_content'].encode('utf-8'))
+        if digest is None and full_path:
+            try:
+                with open(full_path, 'rb') as f:
+                    digest = kb_index.content_hash(f.read())
+            except OSError:
+                digest = None
+        signature = store.get(rel_path) if store is not None and rel_path else None
+        # Category from the KB directory, as the quick-search indexer does; the index's own
+        # category is only a fallback (quick-search indexes set it to a constant)
+        category = category_of(rel_path) if rel_path and not rel_path.startswith('..') else ""
+        keys[id(source)] = (digest, signature, file_path, category or source.get('category'))
+
+    return collapse_duplicates(
+        sources,
+        hash_of=lambda source: keys[id(source)][0],
+        signature_of=lambda source: keys[id(source)][1],
+        path_of=lambda source: keys[id(source)][2],
+        categories_of=lambda source: [keys[id(source)][3]],
+    )
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文档生成接口
+在当前进程内根据已加载的索引数据生成 MD / HTML / EPUB 文档，并直接返回生成的文件路径。
+md_generator.py 与 epub_cli.py 的命令行只是这里的薄包装。
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from document_generator.epub_generator import EPUBDocumentGenerator
+from document_generator.excerpts import DEFAULT_CONTEXT_PARAGRAPHS
+from document_generator.md_generator import HTML_LAYOUTS, MDDocumentGenerator
+
+# `-l all` 生成的布局（摘录版式需显式指定）
+DEFAULT_LAYOUTS = ('thematic', 'source_based', 'concepts', 'summary', 'html')
+ALL_LAYOUTS = DEFAULT_LAYOUTS + ('excerpt', 'excerpt_html')
+
+
+def load_index(index_file_path: str) -> Dict[str, Any]:
+    """加载JSON索引文件"""
+    try:
+        with open(index_file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"索引文件未找到: {index_file_path}")
+    except json.JSONDecodeError as e:
+        raise ValueError(f"JSON解析错误: {e}")
+
+
+def layout_output_path(output_dir: str, topic: str, layout: str) -> str:
+    """布局文档的输出路径"""
+    extension = 'html' if layout in HTML_LAYOUTS else 'md'
+    return os.path.join(output_dir, f"{topic}_{layout}_文档.{extension}")
+
+
+def epub_output_path(output_dir: str, topic: str, excerpt: bool = False,
+                     build_time: Optional[datetime] = None) -> str:
+    """EPUB 的输出路径（带时间戳，可重现构建时使用固定的生成时间）"""
+    suffix = '_摘录' if excerpt else ''
+    timestamp = (build_time or datetime.now()).strftime('%Y%m%d_%H%M%S')
+    return os.path.join(output_dir, f'{topic}{suffix}_{timestamp}.epub')
+
+
+def generate_documents(index_data: Dict[str, Any], kb_dir: str, output_dir: str,
+                       layouts: Iterable[str] = DEFAULT_LAYOUTS,
+                       epub: bool = True,
+                       topic: Optional[str] = None,
+                       include_source_content: bool = True,
+                       excerpt_context: int = DEFAULT_CONTEXT_PARAGRAPHS,
+                       epub_excerpt: bool = False,
+                       build_time: Optional[datetime] = None) -> Dict[str, str]:
+    """
+    生成指定布局的文档以及（可选的）EPUB。
+
+    index_data 不会被修改；返回 {布局名: 路径}，EPUB 的键为 'epub'。
+    布局文档流式写入文件，不在内存中拼出整篇文档。
+    build_time 非空时为可重现构建：文档中的生成日期、EPUB 文件名和元数据都使用它，
+    EPUB 标识符由索引内容派生，相同输入生成逐字节相同的文件。
+    生成或写入失败时抛出异常。
+    """
+    layouts = list(layouts)
+    unknown = [layout for layout in layouts if layout not in ALL_LAYOUTS]
+    if unknown:
+        raise ValueError(f"不支持的布局类型: {', '.join(unknown)}")
+
+    artifacts: Dict[str, str] = {}
+
+    if layouts:
+        generator = MDDocumentGenerator(None, kb_dir, index_data=index_data)
+        if topic:
+            generator.index_data['metadata']['topic'] = topic
+        generator.include_source_content = include_source_content
+        generator.excerpt_context = excerpt_context
+        generator.build_time = build_time
+        topic_name = generator.index_data['metadata']['topic']
+
+        for layout in layouts:
+            print(f"正在生成 {layout} 格式的文档...")
+            output_file = layout_output_path(output_dir, topic_name, layout)
+            generator.write_document(layout, output_file)
+            artifacts[layout] = output_file
+            print(f"{layout} 格式文档生成完成!")
+
+    if epub:
+        generator = EPUBDocumentGenerator(None, kb_dir, index_data=index_data)
+        if topic:
+            generator.index_data['metadata']['topic'] = topic
+        if epub_excerpt:
+            generator.excerpt_context = excerpt_context
+        generator.build_time = build_time
+        topic_name = generator.index_data['metadata']['topic']
+
+        output_file = epub_output_path(output_dir, topic_name, excerpt=epub_excerpt,
+                                       build_time=build_time)
+        print(f'正在生成EPUB文件: {topic_name}')
+        generator.generate_epub(output_file)
+        artifacts['epub'] = output_file
+
+    return artifacts
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+产物缓存
+按 (规范化后的索引内容, 知识库版本, 生成器版本, 布局选项和生成时间) 的哈希缓存生成好的
+MD / HTML / EPUB 文件。同一索引（或内容相同的快速搜索结果）再次生成时，直接把缓存的
+文件硬链接（跨文件系统时复制）到输出目录，不再重新生成。
+
+缓存的前提是输出可重现：启用缓存时生成器使用 reproducible_time() 由索引内容得出的时间，
+EPUB 标识符也由索引内容派生，而不是 datetime.now()。生成时间会出现在文档头、
+EPUB 元数据和文件名中，因此计入缓存键：只有同一天（同一 search_date）的相同搜索才会命中。
+知识库没有 manifest 时，知识库版本取索引中各来源文件 (大小, 修改时间) 的哈希。
+每个条目一个目录（knowledge_base/.sth_index/artifact_cache/<key>/），按字节上限 LRU 淘汰。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import kb_index
+from document_generator.markdown_renderer import RENDERER_VERSION
+from document_generator.source_store import SourceStore
+
+CACHE_DIRNAME = "artifact_cache"
+DEFAULT_DISK_BUDGET = 512 * 1024 * 1024
+
+# 生成器输出格式变化时递增，用于失效已缓存的产物
+GENERATOR_VERSION = 1
+
+# 规范化索引时忽略的元数据字段：search_date 只经由 build_time 影响产物，
+# 而 build_time 单独计入缓存键；EPUB 标识符也不应随搜索日期变化
+VOLATILE_METADATA = ('search_date',)
+
+# 已创建的缓存，按目录区分，同一进程内共享
+_CACHES: Dict[str, "ArtifactCache"] = {}
+
+
+def reproducible_time(kb_dir: str, index_data: Optional[Dict[str, Any]] = None) -> datetime:
+    """
+    可重现构建使用的生成时间，依次取：环境变量 SOURCE_DATE_EPOCH、索引的搜索日期
+    （metadata.search_date）、索引中来源文件的最新修改时间；都没有时使用当前时间。
+    """
+    epoch = os.environ.get('SOURCE_DATE_EPOCH')
+    if epoch:
+        try:
+            return datetime.fromtimestamp(int(epoch), timezone.utc).replace(tzinfo=None)
+        except ValueError:
+            print(f"忽略无效的 SOURCE_DATE_EPOCH: {epoch}")
+    index_data = index_data or {}
+
+    search_date = index_data.get('metadata', {}).get('search_date')
+    if search_date:
+        try:
+            return datetime.fromisoformat(str(search_date)).replace(tzinfo=None)
+        except ValueError:
+            print(f"忽略无法解析的搜索日期: {search_date}")
+
+    store = SourceStore(kb_dir)
+    mtimes = []
+    for source in index_data.get('sources', []):
+        file_path = source.get('file_path') or source.get('path')
+        if not file_path:
+            continue
+        try:
+            mtimes.append(os.path.getmtime(store.resolve(file_path)))
+        except OSError:
+            continue
+    if mtimes:
+        return datetime.fromtimestamp(int(max(mtimes)), timezone.utc).replace(tzinfo=None)
+    return datetime.now().replace(microsecond=0)
+
+
+def normalize_index(index_data: Dict[str, Any]) -> bytes:
+    """索引的规范化表示：忽略易变的元数据字段，键排序后序列化"""
+    normalized = dict(index_data)
+    metadata = {key: value for key, value in index_data.get('metadata', {}).items()
+                if key not in VOLATILE_METADATA}
+    normalized['metadata'] = metadata
+    return json.dumps(normalized, ensure_ascii=False, sort_keys=True,
+                      separators=(',', ':'), default=str).encode('utf-8')
+
+
+def index_digest(index_data: Dict[str, Any]) -> str:
+    """规范化索引内容的哈希，也用作可重现的 EPUB 标识符"""
+    return hashlib.sha1(normalize_index(index_data)).hexdigest()
+
+
+def sources_fingerprint(index_data: Dict[str, Any], kb_dir: str) -> str:
+    """索引中各来源文件 (路径, 大小, 修改时间) 的哈希，没有 manifest 时代替知识库版本"""
+    store = SourceStore(kb_dir)
+    digest = hashlib.sha1()
+    for source in index_data.get('sources', []):
+        file_path = source.get('file_path') or source.get('path')
+        if not file_path:
+            continue
+        full_path = store.resolve(file_path)
+        try:
+            stat = os.stat(full_path)
+            digest.update(f"{full_path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode('utf-8'))
+        except OSError:
+            digest.update(f"{full_path}\0missing\n".encode('utf-8'))
+    return "files:" + digest.hexdigest()[:16]
+
+
+def artifact_key(index_data: Dict[str, Any], kb_dir: str, job: str,
+                 options: Dict[str, Any]) -> str:
+    """单个产物（布局或 EPUB）的缓存键；options 含 build_time"""
+    kb_version = kb_index.current_kb_version(kb_index.default_index_dir(os.path.abspath(kb_dir)))
+    if kb_version is None:
+        kb_version = sources_fingerprint(index_data, kb_dir)
+    header = json.dumps({
+        "job": job,
+        "kb_version": kb_version,
+        "generator_version": GENERATOR_VERSION,
+        "renderer_version": RENDERER_VERSION,
+        "options": options,
+    }, ensure_ascii=False, sort_keys=True, default=str)
+    digest = hashlib.sha1(header.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(normalize_index(index_data))
+    return digest.hexdigest()
+
+
+def link_or_copy(src: str, dst: str) -> None:
+    """把 src 硬链接到 dst（失败时复制），通过临时文件原子替换已有的 dst"""
+    tmp_path = f"{dst}.{os.getpid()}.tmp"
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+class ArtifactCache:
+    """每个条目一个目录、按字节上限 LRU 淘汰的产物缓存"""
+
+    def __init__(self, cache_dir: str, disk_budget: int = DEFAULT_DISK_BUDGET):
+        self.cache_dir = cache_dir
+        self.disk_budget = disk_budget
+        # 条目及其大小，最久未使用的在前
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._load_keys()
+
+    @classmethod
+    def for_dir(cls, cache_dir: str) -> "ArtifactCache":
+        """返回保存在 cache_dir 的进程内共享缓存"""
+        cache = _CACHES.get(cache_dir)
+        if cache is None:
+            cache = _CACHES[cache_dir] = cls(cache_dir)
+        return cache
+
+    @classmethod
+    def for_kb_dir(cls, kb_dir: str) -> "ArtifactCache":
+        """返回该知识库索引目录下的共享缓存"""
+        return cls.for_dir(os.path.join(kb_index.default_index_dir(os.path.abspath(kb_dir)), CACHE_DIRNAME))
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def _entry_file(self, key: str) -> Optional[str]:
+        try:
+            names = os.listdir(self._entry_dir(key))
+        except OSError:
+            return None
+        return os.path.join(self._entry_dir(key), names[0]) if names else None
+
+    def _load_keys(self) -> None:
+        """登记磁盘上已有的条目（按修改时间排序）"""
+        try:
+            keys = [name for name in os.listdir(self.cache_dir) if not name.endswith('.tmp')]
+        except OSError:
+            return
+        entries = []
+        for key in keys:
+            path = self._entry_file(key)
+            if path is None:
+                continue
+            try:
+                stat = os.stat(self._entry_dir(key))
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, key, size))
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self._bytes += size
+        self._evict()
+
+    def fetch(self, key: str, output_dir: str) -> Optional[str]:
+        """命中时把缓存的产物放入 output_dir 并返回其路径，未命中返回 None"""
+        path = self._entry_file(key) if key in self._entries else None
+        if path is None:
+            self._forget(key)
+            self.misses += 1
+            return None
+        output_path = os.path.join(output_dir, os.path.basename(path))
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            link_or_copy(path, output_path)
+            os.utime(self._entry_dir(key))
+        except OSError as e:
+            print(f"读取产物缓存失败 {key}: {e}")
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return output_path
+
+    def put(self, key: str, artifact_path: str) -> None:
+        """复制一份产物存入缓存（复制而非硬链接，输出文件之后被改写也不影响缓存）"""
+        if key in self._entries:
+            return
+        entry_dir = self._entry_dir(key)
+        tmp_dir = f"{entry_dir}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(tmp_dir, exist_ok=True)
+            shutil.copyfile(artifact_path, os.path.join(tmp_dir, os.path.basename(artifact_path)))
+            size = os.path.getsize(artifact_path)
+            os.rename(tmp_dir, entry_dir)
+        except OSError as e:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not os.path.isdir(entry_dir):
+                print(f"写入产物缓存失败 {key}: {e}")
+                return
+            # 其他进程已写入同一条目
+            size = os.path.getsize(artifact_path)
+        self._entries[key] = size
+        self._bytes += size
+        self._evict()
+
+    def _forget(self, key: str) -> None:
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._bytes -= size
+
+    def _evict(self) -> None:
+        while self._bytes > self.disk_budget and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._bytes -= size
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
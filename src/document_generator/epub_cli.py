@@ -1,12 +1,14 @@
 import sys
 import os
 import argparse
-from datetime import datetime
 
 # 确保可以从父目录导入
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from document_generator.epub_generator import EPUBDocumentGenerator
+from document_generator.api import load_index
+from document_generator.artifact_cache import reproducible_time
+from document_generator.scheduler import schedule_documents
+from document_generator.excerpts import DEFAULT_CONTEXT_PARAGRAPHS
 
 
 def parse_arguments():
@@ -18,6 +20,8 @@ def parse_arguments():
 使用示例:
   python epub_cli.py -i /path/to/index.json -o /path/to/output -k /path/to/kb
   python epub_cli.py -i /path/to/index.json -o /path/to/output -k /path/to/kb -t "自定义书名"
+  python epub_cli.py -i /path/to/index.json -o /path/to/output -k /path/to/kb --excerpt -c 2
+  python epub_cli.py -i /path/to/index.json -o /path/to/output -k /path/to/kb --reproducible
         '''
     )
     
@@ -43,6 +47,30 @@ def parse_arguments():
         '-t', '--title',
         help='自定义书名（默认使用JSON中的主题）'
     )
+
+    parser.add_argument(
+        '--excerpt',
+        action='store_true',
+        help='摘录模式：每篇只收录命中的段落及其上下文'
+    )
+
+    parser.add_argument(
+        '-c', '--context',
+        type=int,
+        default=DEFAULT_CONTEXT_PARAGRAPHS,
+        help=f'摘录模式中命中段落前后保留的段落数 (默认: {DEFAULT_CONTEXT_PARAGRAPHS})'
+    )
+
+    parser.add_argument(
+        '--reproducible',
+        action='store_true',
+        help='可重现构建：固定的标识符与生成日期（取 SOURCE_DATE_EPOCH、索引的搜索日期或来源文件的最新修改时间）'
+    )
+
+    parser.add_argument(
+        '-m', '--manifest',
+        help='生成结束后把任务清单（产物路径、大小、哈希、耗时）写入该文件'
+    )
     
     return parser.parse_args()
 
@@ -52,24 +80,20 @@ def main():
     args = parse_arguments()
     
     try:
-        # 创建生成器
-        generator = EPUBDocumentGenerator(args.index, args.kb_dir)
-        
-        # 如果有自定义书名，更新索引数据
-        if args.title:
-            generator.index_data['metadata']['topic'] = args.title
-        
-        # 生成EPUB文件名
-        topic_name = generator.index_data['metadata']['topic']
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        output_file = os.path.join(args.output, f'{topic_name}_{timestamp}.epub')
-        
-        # 生成EPUB文件
-        print(f'正在生成EPUB文件: {topic_name}')
-        generator.generate_epub(output_file)
+        index_data = load_index(args.index)
+        result = schedule_documents(
+            index_data, args.kb_dir, args.output,
+            layouts=(),
+            manifest_file=args.manifest,
+            index_path=os.path.abspath(args.index),
+            topic=args.title,
+            excerpt_context=args.context,
+            epub_excerpt=args.excerpt,
+            build_time=reproducible_time(args.kb_dir, index_data) if args.reproducible else None,
+        )
         
         print('EPUB文件生成完成!')
-        print(f'输出文件: {output_file}')
+        print(f"输出文件: {result['artifacts']['epub']}")
         
     except Exception as e:
         print(f'生成EPUB文件时发生错误: {e}')
@@ -7,20 +7,44 @@ EPUB电子书生成器
 
 import json
 import os
-import re
+import zipfile
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 from ebooklib import epub
 from bs4 import BeautifulSoup
 import html
 
+from dedup import collapse_sources
+from document_generator.artifact_cache import index_digest
+from document_generator.excerpts import (excerpt_sections, format_heading_path,
+                                         full_article_link, source_terms)
+from document_generator.render_cache import RenderCache
+from document_generator.source_store import SourceStore
+
 
 class EPUBDocumentGenerator:
-    def __init__(self, index_file_path: str, kb_dir: str):
-        """初始化EPUB生成器"""
+    def __init__(self, index_file_path: Optional[str], kb_dir: str,
+                 index_data: Optional[Dict[str, Any]] = None,
+                 source_store: Optional[SourceStore] = None,
+                 render_cache: Optional[RenderCache] = None):
+        """初始化EPUB生成器
+
+        已加载的索引可通过 index_data 传入，此时不再读取 index_file_path。
+        source_store 默认使用该知识库在进程内共享的 SourceStore，
+        render_cache 默认使用该知识库索引目录下的渲染缓存。
+        """
         self.index_file_path = index_file_path
         self.kb_dir = os.path.abspath(kb_dir)
-        self.index_data = self._load_index()
+        self.source_store = (source_store if source_store is not None
+                             else SourceStore.for_kb_dir(self.kb_dir))
+        self.render_cache = (render_cache if render_cache is not None
+                             else RenderCache.for_kb_dir(self.kb_dir))
+        self.index_data = self._load_index() if index_data is None else self._copy_index(index_data)
+        self._collapse_mirrors()
+        # 摘录模式：None 表示收录全文，否则为命中段落前后保留的段落数
+        self.excerpt_context: Optional[int] = None
+        # 可重现构建：固定的生成时间，标识符由索引内容派生；None 表示使用当前时间
+        self.build_time: Optional[datetime] = None
 
     @staticmethod
     def _get_source_path(source: Dict[str, Any]) -> str:
@@ -29,28 +53,27 @@ class EPUBDocumentGenerator:
 
     def _resolve_source_path(self, file_path: str) -> str:
         """Normalize source path to an absolute path under kb_dir."""
-        if not file_path:
-            return ""
-
-        # Normalize separators
-        normalized = os.path.normpath(file_path.strip())
-
-        # If already absolute, keep as-is
-        if os.path.isabs(normalized):
-            return normalized
-
-        # Drop duplicated knowledge base prefix if present
-        parts = normalized.split(os.sep)
-        if parts and parts[0] in ("knowledge_base", "knowledgebase"):
-            parts = parts[1:]
-
-        # Handle cases where path already starts with kb basename (e.g., sth-matters/...)
-        kb_basename = os.path.basename(self.kb_dir.rstrip(os.sep))
-        if parts and parts[0] == kb_basename:
-            parts = parts[1:]
+        return self.source_store.resolve(file_path)
+
+    def _collapse_mirrors(self) -> None:
+        """合并内容相同（或近似重复）的来源，避免同一篇文章重复收录"""
+        sources = self.index_data.get('sources') or []
+        collapsed = collapse_sources(sources, self.kb_dir, self._resolve_source_path)
+        removed = len(sources) - len(collapsed)
+        if removed:
+            print(f"合并了 {removed} 个重复来源")
+            self.index_data['sources'] = collapsed
+            metadata = self.index_data.get('metadata', {})
+            if metadata.get('total_sources'):
+                metadata['total_sources'] = max(metadata['total_sources'] - removed, len(collapsed))
 
-        resolved = os.path.join(self.kb_dir, *parts)
-        return os.path.normpath(resolved)
+    @staticmethod
+    def _copy_index(index_data: Dict[str, Any]) -> Dict[str, Any]:
+        """浅拷贝索引数据，生成过程中对元数据和来源的修改不影响调用方"""
+        copied = dict(index_data)
+        copied['metadata'] = dict(index_data.get('metadata') or {})
+        copied['sources'] = [dict(source) for source in index_data.get('sources') or []]
+        return copied
 
     def _load_index(self) -> Dict[str, Any]:
         """加载JSON索引文件"""
@@ -64,160 +87,46 @@ class EPUBDocumentGenerator:
 
     def _read_source_file(self, file_path: str) -> str:
         """读取源文件内容"""
-        full_path = self._resolve_source_path(file_path)
-
-        if os.path.exists(full_path):
-            try:
-                with open(full_path, 'r', encoding='utf-8') as f:
-                    return f.read()
-            except Exception as e:
-                return f"读取文件时出错: {full_path}, 错误: {e}"
-        
-        return f"无法找到文件: {full_path}"
+        return self.source_store.read_text(file_path)
 
     def _markdown_to_html(self, markdown_text: str) -> str:
         """将markdown文本转换为HTML格式"""
-        if not markdown_text:
-            return ""
-
-        html = markdown_text
-
-        # 处理标题 (# ## ### #### ##### ######)
-        html = re.sub(r'^# (.+)$', r'<h1>\1</h1>', html, flags=re.MULTILINE)
-        html = re.sub(r'^## (.+)$', r'<h2>\1</h2>', html, flags=re.MULTILINE)
-        html = re.sub(r'^### (.+)$', r'<h3>\1</h3>', html, flags=re.MULTILINE)
-        html = re.sub(r'^#### (.+)$', r'<h4>\1</h4>', html, flags=re.MULTILINE)
-        html = re.sub(r'^##### (.+)$', r'<h5>\1</h5>',
-                      html, flags=re.MULTILINE)
-        html = re.sub(r'^###### (.+)$', r'<h6>\1</h6>',
-                      html, flags=re.MULTILINE)
-
-        # 处理粗体 (**text** 和 __text__)
-        html = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', html)
-        html = re.sub(r'__(.+?)__', r'<strong>\1</strong>', html)
-
-        # 处理斜体 (*text* 和 _text_)
-        html = re.sub(r'\*([^*]+)\*', r'<em>\1</em>', html)
-        html = re.sub(r'_([^_]+)_', r'<em>\1</em>', html)
-
-        # 处理链接 [text](url)
-        html = re.sub(r'\[([^\]]+)\]\(([^)]+)\)', r'<a href="\2">\1</a>', html)
-
-        # 处理无序列表 (- item 和 * item)
-        def process_list_items(text):
-            lines = text.split('\n')
-            in_list = False
-            result = []
-
-            for line in lines:
-                if re.match(r'^[\s]*[-*] ', line):
-                    if not in_list:
-                        result.append('<ul>')
-                        in_list = True
-                    # 处理列表项，可能包含内部格式
-                    item_content = re.sub(r'^[\s]*[-*] ', '', line)
-                    result.append(f'<li>{item_content}</li>')
-                else:
-                    if in_list:
-                        result.append('</ul>')
-                        in_list = False
-                    result.append(line)
-
-            if in_list:
-                result.append('</ul>')
-
-            return '\n'.join(result)
-
-        html = process_list_items(html)
-
-        # 处理有序列表 (1. item)
-        def process_ordered_list_items(text):
-            lines = text.split('\n')
-            in_list = False
-            result = []
-
-            for line in lines:
-                if re.match(r'^[\s]*\d+\. ', line):
-                    if not in_list:
-                        result.append('<ol>')
-                        in_list = True
-                    # 处理列表项
-                    item_content = re.sub(r'^[\s]*\d+\. ', '', line)
-                    result.append(f'<li>{item_content}</li>')
-                else:
-                    if in_list:
-                        result.append('</ol>')
-                        in_list = False
-                    result.append(line)
-
-            if in_list:
-                result.append('</ol>')
-
-            return '\n'.join(result)
-
-        html = process_ordered_list_items(html)
-
-        # 处理引用 (> text)
-        html = re.sub(r'^> (.+)$', r'<blockquote>\1</blockquote>',
-                      html, flags=re.MULTILINE)
-
-        # 处理代码块 (```text```)
-        html = re.sub(r'```([^`]+)```', r'<pre><code>\1</code></pre>', html)
-
-        # 处理行内代码 (`text`)
-        html = re.sub(r'`([^`]+)`', r'<code>\1</code>', html)
-
-        # 处理分割线 (--- 或 ***)
-        html = re.sub(r'^[-*]{3,}$', r'<hr>', html, flags=re.MULTILINE)
-
-        # 处理段落（将连续的非空行包装在<p>标签中）
-        def process_paragraphs(text):
-            lines = text.split('\n')
-            result = []
-            in_paragraph = False
-            current_paragraph = []
-
-            for line in lines:
-                stripped_line = line.strip()
-
-                # 跳过已经是HTML标签的行
-                if stripped_line.startswith('<') and stripped_line.endswith('>'):
-                    if in_paragraph:
-                        result.append(
-                            '<p>' + ' '.join(current_paragraph) + '</p>')
-                        current_paragraph = []
-                        in_paragraph = False
-                    result.append(line)
-                    continue
-
-                # 跳过空行
-                if not stripped_line:
-                    if in_paragraph:
-                        result.append(
-                            '<p>' + ' '.join(current_paragraph) + '</p>')
-                        current_paragraph = []
-                        in_paragraph = False
-                    continue
-
-                # 添加到当前段落
-                current_paragraph.append(stripped_line)
-                in_paragraph = True
-
-            # 处理最后一个段落
-            if in_paragraph:
-                result.append('<p>' + ' '.join(current_paragraph) + '</p>')
-
-            return '\n'.join(result)
-
-        html = process_paragraphs(html)
-
-        return html
+        return self.render_cache.render(markdown_text)
+
+    def _excerpt_html(self, source: Dict[str, Any], content: str) -> str:
+        """只渲染命中的段落（及上下文），并附上原文链接"""
+        file_path = self._get_source_path(source)
+        full_path = self._resolve_source_path(file_path)
+        rel_path = os.path.relpath(full_path, self.kb_dir) if full_path else ""
+        sections = excerpt_sections(
+            rel_path, content,
+            terms=source_terms(source, self.index_data.get('metadata', {}).get('topic', '')),
+            best_chunks=source.get('best_chunks'),
+            context=self.excerpt_context,
+        )
+
+        parts = []
+        for section in sections:
+            parts.append('<div class="excerpt">')
+            if section.heading_path:
+                parts.append(
+                    f'<p class="excerpt-path">📍 {html.escape(format_heading_path(section.heading_path))}</p>')
+            parts.append(self._markdown_to_html(section.text))
+            parts.append('</div>')
+
+        link = full_article_link(source, full_path)
+        if link:
+            parts.append(f'<p class="full-link"><a href="{html.escape(link)}">阅读全文</a></p>')
+        return '\n'.join(parts)
 
     def _create_chapter_content(self, source: Dict[str, Any]) -> str:
         """创建章节内容"""
         file_path = self._get_source_path(source)
         content = self._read_source_file(file_path) if file_path else ""
-        html_content = self._markdown_to_html(content)
+        if self.excerpt_context is not None:
+            html_content = self._excerpt_html(source, content)
+        else:
+            html_content = self._markdown_to_html(content)
 
         # 创建章节HTML
         chapter_html = f"""
@@ -318,6 +227,15 @@ class EPUBDocumentGenerator:
                 .tags {{
                     margin-top: 0.5em;
                 }}
+                .excerpt-path {{
+                    color: #667eea;
+                    font-size: 0.9em;
+                    margin-bottom: 0.5em;
+                }}
+                .excerpt + .excerpt {{
+                    border-top: 1px dashed #ddd;
+                    padding-top: 1em;
+                }}
                 .tag {{
                     display: inline-block;
                     background: #667eea;
@@ -342,6 +260,19 @@ class EPUBDocumentGenerator:
 
         return chapter_html
 
+    @staticmethod
+    def _normalize_zip_times(path: str, build_time: datetime) -> None:
+        """把 EPUB 中各文件的时间戳统一为 build_time，使输出逐字节可重现"""
+        date_time = build_time.timetuple()[:6]
+        tmp_path = path + '.zip'
+        with zipfile.ZipFile(path) as source, zipfile.ZipFile(tmp_path, 'w') as target:
+            for info in source.infolist():
+                normalized = zipfile.ZipInfo(info.filename, date_time)
+                normalized.compress_type = info.compress_type
+                normalized.external_attr = info.external_attr
+                target.writestr(normalized, source.read(info))
+        os.replace(tmp_path, path)
+
     def generate_epub(self, output_path: str) -> None:
         """生成EPUB文件"""
         # 创建EPUB书籍
@@ -354,15 +285,20 @@ class EPUBDocumentGenerator:
         total_sources = metadata.get("total_sources", len(sources))
         topic = metadata.get("topic", "主题")
 
-        book.set_identifier(
-            f'socialization-{datetime.now().strftime("%Y%m%d-%H%M%S")}')
-        book.set_title(f'{topic} - 知识文档合集')
+        generated_at = self.build_time or datetime.now()
+        if self.build_time is None:
+            book.set_identifier(
+                f'socialization-{generated_at.strftime("%Y%m%d-%H%M%S")}')
+        else:
+            book.set_identifier(f'socialization-{index_digest(self.index_data)[:16]}')
+        book.set_title(f'{topic} - 知识文档合集' if self.excerpt_context is None
+                       else f'{topic} - 摘录合集')
         book.set_language('zh-CN')
         book.add_author('Claude Code')
         book.add_metadata(
             'DC', 'description', f'{topic}主题的深度知识合集，包含{total_sources}篇精选文章，总字数约{total_words}字。涵盖核心理论、批判分析、家庭教育、人格发展等多个维度，是理解社会化概念的完整知识体系。')
         book.add_metadata('DC', 'publisher', 'Claude Code')
-        book.add_metadata('DC', 'date', datetime.now().strftime('%Y-%m-%d'))
+        book.add_metadata('DC', 'date', generated_at.strftime('%Y-%m-%d'))
         book.add_metadata('DC', 'subject', '社会化,家庭教育,人格发展,伦理学,社会学')
         book.add_metadata(
             'DC', 'rights', 'Generated by Claude Code for personal use')
@@ -462,7 +398,7 @@ class EPUBDocumentGenerator:
                 </div>
                 <div class="stat">
                     <span><span class="stat-icon">📅</span> 生成日期</span>
-                    <span>{datetime.now().strftime("%Y-%m-%d")}</span>
+                    <span>{generated_at.strftime("%Y-%m-%d")}</span>
                 </div>
             </div>
             <div class="generated">
@@ -601,7 +537,12 @@ class EPUBDocumentGenerator:
         # 写入EPUB文件
         try:
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            epub.write_epub(output_path, book, {})
+            # 先写临时文件再替换，不改写已有文件（它可能是产物缓存的硬链接）
+            tmp_path = f"{output_path}.{os.getpid()}.tmp"
+            epub.write_epub(tmp_path, book, {'mtime': generated_at, 'raise_exceptions': True})
+            if self.build_time is not None:
+                self._normalize_zip_times(tmp_path, self.build_time)
+            os.replace(tmp_path, output_path)
             print(f"EPUB文件已生成: {output_path}")
         except Exception as e:
             print(f"生成EPUB文件时发生错误: {e}")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+摘录选取
+只保留来源中命中的段落（及其前后 N 个段落），并附带标题路径，
+供 MD / HTML / EPUB 的摘录版式共用。
+"""
+
+import bisect
+import os
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from chunker import Chunk, chunk_document
+from kb_index import is_literal_query
+from query_modes import parse_keywords
+
+# 命中段落前后保留的段落数
+DEFAULT_CONTEXT_PARAGRAPHS = 1
+
+# 标题路径的分隔符
+HEADING_SEPARATOR = " › "
+
+
+class ExcerptSection(NamedTuple):
+    heading_path: Tuple[str, ...]
+    text: str
+    start: int
+    end: int
+
+
+def source_terms(source: Dict[str, Any], topic: str = "") -> List[str]:
+    """返回用于定位命中段落的词：命中关键词、关键概念以及主题本身"""
+    terms: List[str] = []
+    candidates: List[str] = list(source.get('keyword_hits') or {})
+    candidates += list(source.get('key_concepts') or [])
+    if topic:
+        candidates += parse_keywords(topic) or ([topic] if is_literal_query(topic) else [])
+    for term in candidates:
+        term = term.strip()
+        if term and term not in terms:
+            terms.append(term)
+    return terms
+
+
+def _term_spans(content: str, terms: Iterable[str]) -> List[Tuple[int, int]]:
+    """不区分大小写地查找所有词的出现位置"""
+    folded = content.casefold()
+    # casefold 可能改变长度（如 ß），此时位置无法与原文对齐，只能区分大小写查找
+    aligned = len(folded) == len(content)
+    haystack = folded if aligned else content
+    spans = []
+    for term in terms:
+        needle = term.casefold() if aligned else term
+        if not needle:
+            continue
+        pos = haystack.find(needle)
+        while pos != -1:
+            spans.append((pos, pos + len(needle)))
+            pos = haystack.find(needle, pos + len(needle))
+    return spans
+
+
+def _matched_chunks(chunks: Sequence[Chunk], spans: Iterable[Tuple[int, int]],
+                    best: Optional[Iterable[Dict[str, Any]]]) -> Set[int]:
+    """返回命中的段落下标：来自搜索结果的 best_chunks 以及词的出现位置"""
+    matched: Set[int] = set()
+    by_id = {chunk.chunk_id: i for i, chunk in enumerate(chunks)}
+    for item in best or []:
+        # 以 chunk_id 对齐，文件改动后失效的偏移量会被忽略
+        i = by_id.get(item.get('chunk_id'))
+        if i is not None:
+            matched.add(i)
+
+    starts = [chunk.start for chunk in chunks]
+    for start, _ in spans:
+        i = bisect.bisect_right(starts, start) - 1
+        if i >= 0 and start < chunks[i].end:
+            matched.add(i)
+    return matched
+
+
+def _window(chunks: Sequence[Chunk], i: int, context: int) -> Tuple[int, int]:
+    """命中段落及同一小节内前后 context 个段落的下标范围（含两端）"""
+    anchor = chunks[i]
+    if anchor.kind == "heading":
+        # 命中的是标题：带上紧随其后的段落
+        last = i
+        while (last + 1 < len(chunks) and last - i < context
+               and chunks[last + 1].kind == "paragraph"):
+            last += 1
+        return i, last
+
+    first = i
+    while (first > 0 and i - first < context and chunks[first - 1].kind == "paragraph"
+           and chunks[first - 1].heading_path == anchor.heading_path):
+        first -= 1
+    last = i
+    while (last + 1 < len(chunks) and last - i < context and chunks[last + 1].kind == "paragraph"
+           and chunks[last + 1].heading_path == anchor.heading_path):
+        last += 1
+    return first, last
+
+
+def excerpt_sections(rel_path: str, content: str, terms: Iterable[str] = (),
+                     best_chunks: Optional[Iterable[Dict[str, Any]]] = None,
+                     context: int = DEFAULT_CONTEXT_PARAGRAPHS) -> List[ExcerptSection]:
+    """
+    选取文章中命中的段落，连同前后 context 个段落合并为摘录小节。
+
+    相邻或重叠的窗口会合并；没有任何命中时返回文章开头的段落，
+    保证每个来源至少有一段可读内容。
+    """
+    chunks = chunk_document(rel_path, content)
+    if not chunks:
+        return []
+    context = max(0, context)
+
+    matched = _matched_chunks(chunks, _term_spans(content, terms), best_chunks)
+    if not matched:
+        first_paragraph = next((i for i, c in enumerate(chunks) if c.kind == "paragraph"), 0)
+        matched = {first_paragraph}
+
+    windows = sorted(_window(chunks, i, context) for i in matched)
+    merged: List[List[int]] = []
+    for first, last in windows:
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+
+    sections = []
+    for first, last in merged:
+        start, end = chunks[first].start, chunks[last].end
+        sections.append(ExcerptSection(chunks[first].heading_path, content[start:end], start, end))
+    return sections
+
+
+def format_heading_path(heading_path: Sequence[str]) -> str:
+    """把标题路径格式化为面包屑"""
+    return HEADING_SEPARATOR.join(heading_path)
+
+
+def full_article_link(source: Dict[str, Any], full_path: str = "") -> str:
+    """返回原文链接：优先知乎链接，否则为本地文件路径"""
+    if source.get('zhihu_link'):
+        return source['zhihu_link']
+    if full_path:
+        return 'file://' + os.path.abspath(full_path).replace(os.sep, '/')
+    return ""
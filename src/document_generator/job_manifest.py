@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+生成任务清单
+每次生成（一个任务）结束后，把产物的路径、大小、哈希和耗时写入一个 JSON 清单并返回。
+调用方直接读取清单获得产物路径，无需扫描输出目录、按修改时间排序或等待文件“落盘”；
+清单以临时文件加 os.replace 原子写入，读到的清单总是完整的。
+"""
+
+import hashlib
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+MANIFEST_VERSION = 1
+MANIFEST_SUFFIX = ".manifest.json"
+
+# 计算哈希时每次读取的字节数
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def new_job_id() -> str:
+    """生成任务ID：时间戳加随机后缀，同一秒内的并发任务也不会冲突"""
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+
+def manifest_path(output_dir: str, job_id: str) -> str:
+    """任务清单的默认路径"""
+    return os.path.join(output_dir, f"{job_id}{MANIFEST_SUFFIX}")
+
+
+def file_sha1(path: str) -> str:
+    """按块读取文件计算 SHA-1"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def build_manifest(job_id: str, topic: str, artifacts: Dict[str, str],
+                   timings: Dict[str, float], elapsed: float,
+                   cached: Iterable[str] = (),
+                   inputs: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    根据生成结果构建清单，产物按任务顺序排列。
+    inputs 记录索引路径、知识库目录和生成选项，之后可据此按需补充生成其他布局。
+    """
+    cached = set(cached)
+    records: Dict[str, Dict[str, Any]] = {}
+    for job, path in artifacts.items():
+        path = os.path.abspath(path)
+        records[job] = {
+            "path": path,
+            "size": os.path.getsize(path),
+            "sha1": file_sha1(path),
+            "seconds": round(timings.get(job, 0.0), 4),
+            "cached": job in cached,
+        }
+    return {
+        "version": MANIFEST_VERSION,
+        "job_id": job_id,
+        "topic": topic,
+        "created": datetime.now().isoformat(timespec='seconds'),
+        "elapsed": round(elapsed, 4),
+        "artifacts": records,
+        "inputs": inputs,
+    }
+
+
+def write_manifest(manifest: Dict[str, Any], path: str) -> str:
+    """原子写入清单并返回其路径"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    """读取清单"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"任务清单未找到: {path}")
+    except json.JSONDecodeError as e:
+        raise ValueError(f"任务清单解析错误: {path}, {e}")
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"不支持的任务清单版本: {manifest.get('version')}")
+    return manifest
+
+
+def artifact_paths(manifests: List[Dict[str, Any]]) -> Dict[str, str]:
+    """合并一个或多个清单，返回 {任务名: 路径}"""
+    paths: Dict[str, str] = {}
+    for manifest in manifests:
+        for job, record in manifest.get("artifacts", {}).items():
+            paths[job] = record["path"]
+    return paths
+
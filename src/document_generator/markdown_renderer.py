@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Markdown 转 HTML 渲染器
+MD 与 EPUB 生成器共用。输出与旧版逐条 re.sub 的实现逐字节一致：
+
+- 六级标题合并为一次替换；
+- 粗体、斜体、链接、代码等行内规则可能跨行匹配（与旧版一致），仍按原顺序整体替换，
+  但使用预编译的正则，且文本中没有对应标记时直接跳过；
+- 列表、引用、分割线和段落合并为一次逐行扫描（由生成器串联）。
+  只有文本包含反引号时，代码规则必须夹在中间执行，才会拆成两次逐行扫描。
+"""
+
+import re
+from typing import Iterable, Iterator, List, Optional
+
+# 渲染结果变化时递增，用于失效已缓存的渲染结果
+RENDERER_VERSION = 1
+
+_HEADING = re.compile(r'^(#{1,6}) (.+)$', re.MULTILINE)
+_BOLD_STARS = re.compile(r'\*\*(.+?)\*\*')
+_BOLD_UNDERSCORES = re.compile(r'__(.+?)__')
+_ITALIC_STARS = re.compile(r'\*([^*]+)\*')
+_ITALIC_UNDERSCORES = re.compile(r'_([^_]+)_')
+_LINK = re.compile(r'\[([^\]]+)\]\(([^)]+)\)')
+_CODE_BLOCK = re.compile(r'```([^`]+)```')
+_INLINE_CODE = re.compile(r'`([^`]+)`')
+# 无序列表项 (- item, * item) 与有序列表项 (1. item)；group(1) 非空即无序列表
+_LIST_ITEM = re.compile(r'[\s]*(?:([-*])|\d+\.) ')
+_HR = re.compile(r'[-*]{3,}')
+
+
+def _heading(match: "re.Match") -> str:
+    level = len(match.group(1))
+    return f'<h{level}>{match.group(2)}</h{level}>'
+
+
+def _blocks(lines: Iterable[str]) -> Iterator[str]:
+    """无序列表、有序列表和引用"""
+    in_ul = in_ol = False
+    for line in lines:
+        first = line[:1]
+        item = (_LIST_ITEM.match(line)
+                if first and (first in '-*' or first.isspace() or first.isdigit()) else None)
+        if item and item.group(1):
+            if in_ol:
+                yield '</ol>'
+                in_ol = False
+            if not in_ul:
+                yield '<ul>'
+                in_ul = True
+            yield f'<li>{line[item.end():]}</li>'
+            continue
+        if in_ul:
+            yield '</ul>'
+            in_ul = False
+
+        if item:
+            if not in_ol:
+                yield '<ol>'
+                in_ol = True
+            yield f'<li>{line[item.end():]}</li>'
+            continue
+        if in_ol:
+            yield '</ol>'
+            in_ol = False
+
+        if first == '>' and line.startswith('> ') and len(line) > 2:
+            line = f'<blockquote>{line[2:]}</blockquote>'
+        yield line
+
+    if in_ul:
+        yield '</ul>'
+    if in_ol:
+        yield '</ol>'
+
+
+def _paragraphs(lines: Iterable[str]) -> str:
+    """分割线和段落：连续的非空行合并为一个 <p>，已是HTML标签的行原样保留"""
+    result: List[str] = []
+    paragraph: List[str] = []
+    for line in lines:
+        if line[:1] in ('-', '*') and _HR.fullmatch(line):
+            line = '<hr>'
+        stripped = line.strip()
+
+        if stripped.startswith('<') and stripped.endswith('>'):
+            if paragraph:
+                result.append('<p>' + ' '.join(paragraph) + '</p>')
+                paragraph = []
+            result.append(line)
+        elif not stripped:
+            if paragraph:
+                result.append('<p>' + ' '.join(paragraph) + '</p>')
+                paragraph = []
+        else:
+            paragraph.append(stripped)
+
+    if paragraph:
+        result.append('<p>' + ' '.join(paragraph) + '</p>')
+    return '\n'.join(result)
+
+
+def markdown_to_html(markdown_text: str, link_target: Optional[str] = None) -> str:
+    """将markdown文本转换为HTML；link_target 非空时链接带 target 属性"""
+    if not markdown_text:
+        return ""
+
+    html = markdown_text
+    if '# ' in html:
+        html = _HEADING.sub(_heading, html)
+    if '**' in html:
+        html = _BOLD_STARS.sub(r'<strong>\1</strong>', html)
+    if '__' in html:
+        html = _BOLD_UNDERSCORES.sub(r'<strong>\1</strong>', html)
+    if '*' in html:
+        html = _ITALIC_STARS.sub(r'<em>\1</em>', html)
+    if '_' in html:
+        html = _ITALIC_UNDERSCORES.sub(r'<em>\1</em>', html)
+    if '](' in html:
+        target = f' target="{link_target}"' if link_target else ''
+        html = _LINK.sub(rf'<a href="\2"{target}>\1</a>', html)
+
+    if '`' not in html:
+        return _paragraphs(_blocks(html.split('\n')))
+
+    # 代码规则在列表/引用之后、分割线/段落之前执行
+    html = '\n'.join(_blocks(html.split('\n')))
+    if '```' in html:
+        html = _CODE_BLOCK.sub(r'<pre><code>\1</code></pre>', html)
+    html = _INLINE_CODE.sub(r'<code>\1</code>', html)
+    return _paragraphs(html.split('\n'))
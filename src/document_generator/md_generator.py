@@ -8,19 +8,55 @@
 import json
 import os
 import re
+import sys
 import argparse
+import html
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, Iterator, List, Any, Optional
+
+# 确保可以从父目录导入
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dedup import collapse_sources
+from document_generator.excerpts import (DEFAULT_CONTEXT_PARAGRAPHS, excerpt_sections,
+                                         format_heading_path, full_article_link, source_terms)
+from document_generator.render_cache import RenderCache
+from document_generator.source_store import SourceStore
+
+# 流式写入文档时的文件缓冲区大小
+WRITE_BUFFER_SIZE = 256 * 1024
+
+# 输出为HTML文件的布局
+HTML_LAYOUTS = ('html', 'excerpt_html')
 
 
 class MDDocumentGenerator:
-    def __init__(self, index_file_path: str, kb_dir: str):
-        """初始化文档生成器"""
+    def __init__(self, index_file_path: Optional[str], kb_dir: str,
+                 index_data: Optional[Dict[str, Any]] = None,
+                 source_store: Optional[SourceStore] = None,
+                 render_cache: Optional[RenderCache] = None):
+        """初始化文档生成器
+
+        已加载的索引可通过 index_data 传入，此时不再读取 index_file_path。
+        source_store 默认使用该知识库在进程内共享的 SourceStore，
+        render_cache 默认使用该知识库索引目录下的渲染缓存。
+        """
         self.index_file_path = index_file_path
         self.kb_dir = kb_dir
-        self.index_data = self._load_index()
+        self.source_store = (source_store if source_store is not None
+                             else SourceStore.for_kb_dir(kb_dir))
+        self.render_cache = (render_cache if render_cache is not None
+                             else RenderCache.for_kb_dir(kb_dir))
+        self.index_data = self._load_index() if index_data is None else self._copy_index(index_data)
+        self._collapse_mirrors()
         self.total_sources = self._get_total_sources()
         self.include_source_content = True  # 默认包含原始内容
+        self.excerpt_context = DEFAULT_CONTEXT_PARAGRAPHS  # 摘录版式中命中段落前后保留的段落数
+        self.build_time: Optional[datetime] = None  # 可重现构建时固定的生成时间，None 表示当前时间
+
+    def _generation_date(self) -> str:
+        """文档头部显示的生成日期"""
+        return (self.build_time or datetime.now()).strftime('%Y-%m-%d %H:%M:%S')
 
     def _get_total_sources(self) -> int:
         """Return total sources count with a safe fallback."""
@@ -38,10 +74,12 @@ class MDDocumentGenerator:
         """Return category with a fallback."""
         return source.get('category') or 'uncategorized'
 
-    @staticmethod
-    def _get_word_count(source: Dict[str, Any]) -> int:
-        """Return word count with a numeric fallback."""
-        return source.get('word_count') or 0
+    def _get_word_count(self, source: Dict[str, Any]) -> int:
+        """Return word count, falling back to counting the source file."""
+        if source.get('word_count'):
+            return source['word_count']
+        file_path = self._get_source_path(source)
+        return self.source_store.get(file_path).word_count if file_path else 0
 
     @staticmethod
     def _get_tags(source: Dict[str, Any]) -> List[str]:
@@ -54,10 +92,25 @@ class MDDocumentGenerator:
         return source.get('key_concepts') or []
 
     @staticmethod
-    def _get_preview(source: Dict[str, Any]) -> str:
-        """Return preview/summary text with a safe fallback."""
+    def _get_preview(source: Dict[str, Any], concept: Optional[str] = None) -> str:
+        """Return preview/summary text with a safe fallback.
+
+        With a concept, prefer the first match snippet that mentions it.
+        """
+        if concept:
+            for snippet in source.get('snippets') or []:
+                if concept.casefold() in snippet.casefold():
+                    return snippet
         return source.get('content_preview') or source.get('summary') or ""
 
+    @staticmethod
+    def _copy_index(index_data: Dict[str, Any]) -> Dict[str, Any]:
+        """浅拷贝索引数据，生成过程中对元数据和来源的修改不影响调用方"""
+        copied = dict(index_data)
+        copied['metadata'] = dict(index_data.get('metadata') or {})
+        copied['sources'] = [dict(source) for source in index_data.get('sources') or []]
+        return copied
+
     def _load_index(self) -> Dict[str, Any]:
         """加载JSON索引文件"""
         try:
@@ -68,166 +121,37 @@ class MDDocumentGenerator:
         except json.JSONDecodeError as e:
             raise ValueError(f"JSON解析错误: {e}")
 
+    def _collapse_mirrors(self) -> None:
+        """合并内容相同（或近似重复）的来源，避免同一篇文章重复生成"""
+        sources = self.index_data.get('sources') or []
+        collapsed = collapse_sources(sources, self.kb_dir, self._resolve_source_path)
+        removed = len(sources) - len(collapsed)
+        if removed:
+            print(f"合并了 {removed} 个重复来源")
+            self.index_data['sources'] = collapsed
+            metadata = self.index_data.get('metadata', {})
+            if metadata.get('total_sources'):
+                metadata['total_sources'] = max(metadata['total_sources'] - removed, len(collapsed))
+
+    def _resolve_source_path(self, file_path: str) -> str:
+        """返回源文件的完整路径"""
+        return self.source_store.resolve(file_path)
+
     def _read_source_file(self, file_path: str) -> str:
         """读取源文件内容"""
         if not self.include_source_content:
             return "（已跳过原始文件内容）"
+        return self.source_store.read_text(file_path)
 
-  # 处理文件路径：如果已经包含knowledge_base前缀，则直接使用；否则拼接
-        if file_path.startswith('knowledge_base/'):
-            # 路径已经包含knowledge_base前缀，直接使用
-            full_path = file_path
-        else:
-            # 路径是相对的，需要拼接知识库目录
-            full_path = os.path.join(self.kb_dir, file_path)
-
-        if os.path.exists(full_path):
-            try:
-                with open(full_path, 'r', encoding='utf-8') as f:
-                    return f.read()
-            except Exception as e:
-                return f"读取文件时出错: {full_path}, 错误: {e}"
-
-        return f"无法找到文件: {full_path}"
+    def _source_error(self, file_path: str) -> Optional[str]:
+        """源文件缺失或读取失败时返回错误说明，否则返回 None"""
+        if not self.include_source_content:
+            return None
+        return self.source_store.get(file_path).error
 
     def _markdown_to_html(self, markdown_text: str) -> str:
         """将markdown文本转换为HTML格式"""
-        if not markdown_text:
-            return ""
-
-        html = markdown_text
-
-        # 处理标题 (# ## ### #### ##### ######)
-        html = re.sub(r'^# (.+)$', r'<h1>\1</h1>', html, flags=re.MULTILINE)
-        html = re.sub(r'^## (.+)$', r'<h2>\1</h2>', html, flags=re.MULTILINE)
-        html = re.sub(r'^### (.+)$', r'<h3>\1</h3>', html, flags=re.MULTILINE)
-        html = re.sub(r'^#### (.+)$', r'<h4>\1</h4>', html, flags=re.MULTILINE)
-        html = re.sub(r'^##### (.+)$', r'<h5>\1</h5>',
-                      html, flags=re.MULTILINE)
-        html = re.sub(r'^###### (.+)$', r'<h6>\1</h6>',
-                      html, flags=re.MULTILINE)
-
-        # 处理粗体 (**text** 和 __text__)
-        html = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', html)
-        html = re.sub(r'__(.+?)__', r'<strong>\1</strong>', html)
-
-        # 处理斜体 (*text* 和 _text_)
-        html = re.sub(r'\*([^*]+)\*', r'<em>\1</em>', html)
-        html = re.sub(r'_([^_]+)_', r'<em>\1</em>', html)
-
-        # 处理链接 [text](url)
-        html = re.sub(r'\[([^\]]+)\]\(([^)]+)\)',
-                      r'<a href="\2" target="_blank">\1</a>', html)
-
-        # 处理无序列表 (- item 和 * item)
-        def process_list_items(text):
-            lines = text.split('\n')
-            in_list = False
-            result = []
-
-            for line in lines:
-                if re.match(r'^[\s]*[-*] ', line):
-                    if not in_list:
-                        result.append('<ul>')
-                        in_list = True
-                    # 处理列表项，可能包含内部格式
-                    item_content = re.sub(r'^[\s]*[-*] ', '', line)
-                    result.append(f'<li>{item_content}</li>')
-                else:
-                    if in_list:
-                        result.append('</ul>')
-                        in_list = False
-                    result.append(line)
-
-            if in_list:
-                result.append('</ul>')
-
-            return '\n'.join(result)
-
-        html = process_list_items(html)
-
-        # 处理有序列表 (1. item)
-        def process_ordered_list_items(text):
-            lines = text.split('\n')
-            in_list = False
-            result = []
-
-            for line in lines:
-                if re.match(r'^[\s]*\d+\. ', line):
-                    if not in_list:
-                        result.append('<ol>')
-                        in_list = True
-                    # 处理列表项
-                    item_content = re.sub(r'^[\s]*\d+\. ', '', line)
-                    result.append(f'<li>{item_content}</li>')
-                else:
-                    if in_list:
-                        result.append('</ol>')
-                        in_list = False
-                    result.append(line)
-
-            if in_list:
-                result.append('</ol>')
-
-            return '\n'.join(result)
-
-        html = process_ordered_list_items(html)
-
-        # 处理引用 (> text)
-        html = re.sub(r'^> (.+)$', r'<blockquote>\1</blockquote>',
-                      html, flags=re.MULTILINE)
-
-        # 处理代码块 (```text```)
-        html = re.sub(r'```([^`]+)```', r'<pre><code>\1</code></pre>', html)
-
-        # 处理行内代码 (`text`)
-        html = re.sub(r'`([^`]+)`', r'<code>\1</code>', html)
-
-        # 处理分割线 (--- 或 ***)
-        html = re.sub(r'^[-*]{3,}$', r'<hr>', html, flags=re.MULTILINE)
-
-        # 处理段落（将连续的非空行包装在<p>标签中）
-        def process_paragraphs(text):
-            lines = text.split('\n')
-            result = []
-            in_paragraph = False
-            current_paragraph = []
-
-            for line in lines:
-                stripped_line = line.strip()
-
-                # 跳过已经是HTML标签的行
-                if stripped_line.startswith('<') and stripped_line.endswith('>'):
-                    if in_paragraph:
-                        result.append(
-                            '<p>' + ' '.join(current_paragraph) + '</p>')
-                        current_paragraph = []
-                        in_paragraph = False
-                    result.append(line)
-                    continue
-
-                # 跳过空行
-                if not stripped_line:
-                    if in_paragraph:
-                        result.append(
-                            '<p>' + ' '.join(current_paragraph) + '</p>')
-                        current_paragraph = []
-                        in_paragraph = False
-                    continue
-
-                # 添加到当前段落
-                current_paragraph.append(stripped_line)
-                in_paragraph = True
-
-            # 处理最后一个段落
-            if in_paragraph:
-                result.append('<p>' + ' '.join(current_paragraph) + '</p>')
-
-            return '\n'.join(result)
-
-        html = process_paragraphs(html)
-
-        return html
+        return self.render_cache.render(markdown_text, link_target='_blank')
 
     def _format_source_header(self, source: Dict[str, Any]) -> str:
         """格式化来源标题头部"""
@@ -242,16 +166,18 @@ class MDDocumentGenerator:
 
     def generate_thematic_document(self) -> str:
         """生成按主题分类的文档"""
-        output = []
+        return ''.join(self.iter_thematic_document())
+
+    def iter_thematic_document(self) -> Iterator[str]:
+        """逐块生成按主题分类的文档"""
 
         # 文档头部
         metadata = self.index_data['metadata']
-        output.append(f"# {metadata['topic']} - 主题分类阅读文档\n")
-        output.append(
-            f"**生成日期**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        output.append(f"**主题**: {metadata['topic']}\n")
-        output.append(f"**来源数量**: {self.total_sources}\n")
-        output.append("---\n\n")
+        yield f"# {metadata['topic']} - 主题分类阅读文档\n"
+        yield f"**生成日期**: {self._generation_date()}\n"
+        yield f"**主题**: {metadata['topic']}\n"
+        yield f"**来源数量**: {self.total_sources}\n"
+        yield "---\n\n"
 
         # 按分类分组
         category_groups = {}
@@ -276,47 +202,47 @@ class MDDocumentGenerator:
 
         for category, sources in category_groups.items():
             category_name = category_names.get(category, category)
-            output.append(f"## {category_name}\n\n")
+            yield f"## {category_name}\n\n"
 
             for source in sources:
-                output.append(self._format_source_header(source))
+                yield self._format_source_header(source)
 
                 # --- MODIFICATION START ---
                 # Add Word Count and Zhihu Link if they exist, for Quick Search compatibility
                 if 'word_count' in source:
-                    output.append(f"**字数:** {source['word_count']}\n\n")
+                    yield f"**字数:** {source['word_count']}\n\n"
                 if source.get('zhihu_link'):
-                    output.append(f"**知乎链接:** {source['zhihu_link']}\n\n")
+                    yield f"**知乎链接:** {source['zhihu_link']}\n\n"
 
                 # Add the full original content with a clear header
-                output.append("### 原文\n\n---\n\n")
+                yield "### 原文\n\n---\n\n"
                 if 'full_content' in source:
                     # Prefer the full_content passed directly from quick_search
-                    output.append(source['full_content'])
+                    yield source['full_content']
                 else:
                     # Fallback to reading from source file for deep_search compatibility
                     content = self._read_source_file(
                         self._get_source_path(source)
                     )
-                    output.append(content)
+                    yield content
 
-                output.append("\n\n---\n\n")
+                yield "\n\n---\n\n"
                 # --- MODIFICATION END ---
 
-        return ''.join(output)
-
     def generate_source_based_document(self) -> str:
         """生成按来源分组的文档"""
-        output = []
+        return ''.join(self.iter_source_based_document())
+
+    def iter_source_based_document(self) -> Iterator[str]:
+        """逐块生成按来源分组的文档"""
 
         # 文档头部
         metadata = self.index_data['metadata']
-        output.append(f"# {metadata['topic']} - 主题阅读\n")
-        output.append(
-            f"**生成日期**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        output.append(f"**主题**: {metadata['topic']}\n")
-        output.append(f"**来源数量**: {self.total_sources}\n")
-        output.append("---\n\n")
+        yield f"# {metadata['topic']} - 主题阅读\n"
+        yield f"**生成日期**: {self._generation_date()}\n"
+        yield f"**主题**: {metadata['topic']}\n"
+        yield f"**来源数量**: {self.total_sources}\n"
+        yield "---\n\n"
 
         # 按文件路径分组
         file_groups = {}
@@ -327,20 +253,20 @@ class MDDocumentGenerator:
             file_groups[file_path].append(source)
 
         # 生成目录
-        output.append("## 📚 目录\n\n")
+        yield "## 📚 目录\n\n"
         for i, (file_path, sources) in enumerate(file_groups.items(), 1):
             # 提取标题
             title = self._extract_title_from_content(
                 file_path) or os.path.splitext(os.path.basename(file_path))[0]
-            output.append(f"{i}. [{title}](#{self._generate_anchor(title)})\n")
-        output.append("\n---\n\n")
+            yield f"{i}. [{title}](#{self._generate_anchor(title)})\n"
+        yield "\n---\n\n"
 
         # 生成各文件内容
         for file_path, sources in file_groups.items():
             # 提取标题作为小标题
             title = self._extract_title_from_content(
                 file_path) or os.path.splitext(os.path.basename(file_path))[0] if file_path else "未命名来源"
-            # output.append(f"## {title}\n\n")
+            # yield f"## {title}\n\n"
 
             # 添加文件路径信息 - 转换为相对路径
             relative_file_path = file_path
@@ -349,36 +275,167 @@ class MDDocumentGenerator:
             elif '/' in relative_file_path:
                 relative_file_path = os.path.basename(relative_file_path)
 
-            # output.append(f"**文件路径**: `{relative_file_path}`\n\n")
+            # yield f"**文件路径**: `{relative_file_path}`\n\n"
 
             # 读取原文内容（只读取一次）
             content = self._read_source_file(file_path)
-            output.append(content)
-            output.append("\n\n\n\n")
+            yield content
+            yield "\n\n\n\n"
+
+    def _source_excerpts(self, source: Dict[str, Any]):
+        """返回来源的摘录小节及原文链接"""
+        file_path = self._get_source_path(source)
+        full_path = self._resolve_source_path(file_path) if file_path else ""
+        if 'full_content' in source:
+            content = source['full_content']
+        else:
+            content = self._read_source_file(file_path) if file_path else ""
+        rel_path = os.path.relpath(full_path, self.kb_dir) if full_path else ""
+        sections = excerpt_sections(
+            rel_path, content,
+            terms=source_terms(source, self.index_data['metadata'].get('topic', '')),
+            best_chunks=source.get('best_chunks'),
+            context=self.excerpt_context,
+        )
+        return sections, full_article_link(source, full_path)
+
+    def _source_title(self, source: Dict[str, Any]) -> str:
+        """来源标题：优先索引中的标题，其次文件名"""
+        file_path = self._get_source_path(source)
+        return source.get('title') or (
+            os.path.splitext(os.path.basename(file_path))[0] if file_path else "未命名来源")
+
+    def generate_excerpt_document(self) -> str:
+        """生成摘录文档：每个来源只保留命中的段落及其上下文"""
+        return ''.join(self.iter_excerpt_document())
+
+    def iter_excerpt_document(self) -> Iterator[str]:
+        """逐块生成摘录文档"""
+
+        # 文档头部
+        metadata = self.index_data['metadata']
+        yield f"# {metadata['topic']} - 摘录阅读\n"
+        yield f"**生成日期**: {self._generation_date()}\n"
+        yield f"**主题**: {metadata['topic']}\n"
+        yield f"**来源数量**: {self.total_sources}\n"
+        yield f"**上下文段落**: {self.excerpt_context}\n"
+        yield "---\n\n"
+
+        # 生成目录
+        yield "## 📚 目录\n\n"
+        for i, source in enumerate(self.index_data['sources'], 1):
+            title = self._source_title(source)
+            yield f"{i}. [{title}](#{self._generate_anchor(title)})\n"
+        yield "\n---\n\n"
+
+        for source in self.index_data['sources']:
+            yield f"## {self._source_title(source)}\n\n"
+            if 'word_count' in source:
+                yield f"**字数:** {source['word_count']}\n\n"
 
-        return ''.join(output)
+            sections, link = self._source_excerpts(source)
+            for i, section in enumerate(sections):
+                if i:
+                    yield "\n\n……\n\n"
+                if section.heading_path:
+                    yield f"> 📍 {format_heading_path(section.heading_path)}\n\n"
+                yield section.text
+
+            if link:
+                yield f"\n\n[阅读全文]({link})"
+            yield "\n\n---\n\n"
+
+    def generate_excerpt_html_document(self) -> str:
+        """生成HTML格式的摘录文档"""
+        return ''.join(self.iter_excerpt_html_document())
+
+    def iter_excerpt_html_document(self) -> Iterator[str]:
+        """逐块生成HTML格式的摘录文档"""
+
+        metadata = self.index_data['metadata']
+        topic = html.escape(metadata['topic'])
+        yield ("""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>"""+topic+""" - 摘录阅读</title>
+    <style>
+        body {
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Microsoft YaHei', sans-serif;
+            line-height: 1.6;
+            max-width: 1200px;
+            margin: 0 auto;
+            padding: 20px;
+            background-color: #f5f5f5;
+        }
+        .header {
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            padding: 30px;
+            border-radius: 10px;
+            margin-bottom: 30px;
+            text-align: center;
+        }
+        .source {
+            background: white;
+            padding: 20px 30px;
+            border-radius: 8px;
+            margin-bottom: 20px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+        }
+        .excerpt-path {
+            color: #667eea;
+            font-size: 0.9em;
+            margin-bottom: 0.5em;
+        }
+        .excerpt + .excerpt {
+            border-top: 1px dashed #ddd;
+            padding-top: 1em;
+        }
+        .full-link a {
+            color: #667eea;
+            text-decoration: none;
+        }
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>"""+topic+""" - 摘录阅读</h1>
+        <p>来源数量: """+str(self.total_sources)+""" | 上下文段落: """+str(self.excerpt_context)+"""</p>
+    </div>""")
+
+        for source in self.index_data['sources']:
+            yield f"""
+    <div class="source">
+        <h2 class="source-title">{html.escape(self._source_title(source))}</h2>"""
+
+            sections, link = self._source_excerpts(source)
+            for section in sections:
+                yield """
+        <div class="excerpt">"""
+                if section.heading_path:
+                    yield f"""
+            <div class="excerpt-path">📍 {html.escape(format_heading_path(section.heading_path))}</div>"""
+                yield f"""
+            <div class="original-content">
+                {self._markdown_to_html(section.text)}
+            </div>
+        </div>"""
+
+            if link:
+                yield f"""
+        <p class="full-link"><a href="{html.escape(link)}" target="_blank">🔗 阅读全文</a></p>"""
+            yield """
+    </div>"""
+
+        yield """
+</body>
+</html>"""
 
     def _extract_title_from_content(self, file_path: str) -> Optional[str]:
         """从文件内容中提取第一个#标题"""
-        try:
-            # 处理文件路径：如果已经包含knowledge_base前缀，则直接使用；否则拼接
-            if file_path.startswith('knowledge_base/'):
-                # 路径已经包含knowledge_base前缀，直接使用
-                full_path = file_path
-            else:
-                # 路径是相对的，需要拼接知识库目录
-                full_path = os.path.join(self.kb_dir, file_path)
-
-            if os.path.exists(full_path):
-                with open(full_path, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                    for line in lines:
-                        line = line.strip()
-                        if line.startswith('# '):
-                            return line[2:].strip()
-        except Exception:
-            pass
-        return None
+        return self.source_store.title(file_path) if file_path else None
 
     def _generate_anchor(self, title: str) -> str:
         """生成markdown锚点链接"""
@@ -391,16 +448,18 @@ class MDDocumentGenerator:
 
     def generate_concepts_document(self) -> str:
         """生成按关键概念组织的文档"""
-        output = []
+        return ''.join(self.iter_concepts_document())
+
+    def iter_concepts_document(self) -> Iterator[str]:
+        """逐块生成按关键概念组织的文档"""
 
         # 文档头部
         metadata = self.index_data['metadata']
-        output.append(f"# {metadata['topic']} - 关键概念文档\n")
-        output.append(
-            f"**生成日期**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        output.append(f"**主题**: {metadata['topic']}\n")
-        output.append(f"**来源数量**: {self.total_sources}\n")
-        output.append("---\n\n")
+        yield f"# {metadata['topic']} - 关键概念文档\n"
+        yield f"**生成日期**: {self._generation_date()}\n"
+        yield f"**主题**: {metadata['topic']}\n"
+        yield f"**来源数量**: {self.total_sources}\n"
+        yield "---\n\n"
 
         # 提取所有关键概念
         all_concepts = {}
@@ -412,38 +471,37 @@ class MDDocumentGenerator:
 
         # 按概念组织
         for concept, sources in all_concepts.items():
-            output.append(f"## {concept}\n\n")
+            yield f"## {concept}\n\n"
 
             for source in sources:
                 file_path = self._get_source_path(source)
                 original_title = os.path.splitext(
                     os.path.basename(file_path))[0] if file_path else source.get('title', '来源')
-                output.append(f"### {original_title}\n\n")
+                yield f"### {original_title}\n\n"
                 if file_path:
-                    output.append(
-                        f"**来源**: `{os.path.basename(file_path)}`\n")
-                output.append(f"**字数**: {self._get_word_count(source)}\n")
+                    yield f"**来源**: `{os.path.basename(file_path)}`\n"
+                yield f"**字数**: {self._get_word_count(source)}\n"
                 if source.get('zhihu_link'):
-                    output.append(
-                        f"**知乎链接**: [{source['title']}]({source['zhihu_link']})\n")
-                output.append("\n")
-                preview = self._get_preview(source)
+                    yield f"**知乎链接**: [{source['title']}]({source['zhihu_link']})\n"
+                yield "\n"
+                preview = self._get_preview(source, concept)
                 if preview:
-                    output.append(f"> {preview}\n\n")
+                    yield f"> {preview}\n\n"
                 else:
-                    output.append("> （无摘要）\n\n")
+                    yield "> （无摘要）\n\n"
 
-            output.append("---\n\n")
-
-        return ''.join(output)
+            yield "---\n\n"
 
     def generate_html_document(self) -> str:
         """生成HTML格式文档"""
-        output = []
+        return ''.join(self.iter_html_document())
+
+    def iter_html_document(self) -> Iterator[str]:
+        """逐块生成HTML格式文档"""
 
         # HTML头部
         metadata = self.index_data['metadata']
-        output.append("""<!DOCTYPE html>
+        yield ("""<!DOCTYPE html>
 <html lang="zh-CN">
 <head>
     <meta charset="UTF-8">
@@ -698,7 +756,7 @@ class MDDocumentGenerator:
     <div class="metadata">
         <h2>文档信息</h2>
         <div class="source-meta">
-            <span class="meta-item"><strong>生成日期:</strong> """+datetime.now().strftime('%Y-%m-%d %H:%M:%S')+"""</span>
+            <span class="meta-item"><strong>生成日期:</strong> """+self._generation_date()+"""</span>
             <span class="meta-item"><strong>主题:</strong> """ + metadata['topic']+"""</span>
             <span class="meta-item"><strong>来源数量:</strong> """ + str(self.total_sources)+"""</span>
         </div>
@@ -707,7 +765,7 @@ class MDDocumentGenerator:
         # 统计信息
         total_words = sum(self._get_word_count(s)
                           for s in self.index_data['sources'])
-        output.append("""
+        yield ("""
     <div class="stats">
         <div class="stat-card">
             <div class="stat-number">"""+str(self.total_sources)+"""</div>
@@ -724,10 +782,10 @@ class MDDocumentGenerator:
     </div>""")
 
         # 目录
-        output.append("""
+        yield """
     <div class="toc">
         <h2>📚 目录</h2>
-        <ul>""")
+        <ul>"""
 
         # 按分类生成目录
         category_groups = {}
@@ -760,17 +818,16 @@ class MDDocumentGenerator:
 
         for category, sources in category_groups.items():
             category_name = category_names.get(category, category)
-            output.append(
-                f"""            <li><a href="#{category}">{category_name} ({len(sources)}篇)</a></li>""")
+            yield f"""            <li><a href="#{category}">{category_name} ({len(sources)}篇)</a></li>"""
 
-        output.append("""
+        yield """
         </ul>
-    </div>""")
+    </div>"""
 
         # 生成各分类内容
         for category, sources in category_groups.items():
             category_name = category_names.get(category, category)
-            output.append(f"""    <div class="source" id="{category}">
+            yield f"""    <div class="source" id="{category}">
         <div class="source-header">
             <h2 class="source-title">{category_name}</h2>
             <div class="source-meta">
@@ -778,18 +835,18 @@ class MDDocumentGenerator:
                 <span class="meta-item">共 {len(sources)} 篇文章</span>
             </div>
         </div>
-        <div class="source-content">""")
+        <div class="source-content">"""
 
             for source in sources:
-                output.append(f"""            <div class="source">
+                yield f"""            <div class="source">
                 <div class="source-header">
                     <h3 class="source-title">{source['title']}</h3>
-                    <div class="source-meta">""")
+                    <div class="source-meta">"""
 
                 if source.get('zhihu_link'):
-                    output.append(f"""                        <span class="meta-item">
+                    yield f"""                        <span class="meta-item">
                             <a href="{source['zhihu_link']}" class="zhihu-link" target="_blank">🔗 知乎链接</a>
-                        </span>""")
+                        </span>"""
 
                 # Convert absolute file path to relative path from knowledge base root
                 relative_file_path = self._get_source_path(source)
@@ -799,80 +856,79 @@ class MDDocumentGenerator:
                 elif '/' in relative_file_path:
                     relative_file_path = os.path.basename(relative_file_path)
 
-                output.append(f"""                        <span class="meta-item"><strong>文件:</strong> {relative_file_path}</span>
+                yield f"""                        <span class="meta-item"><strong>文件:</strong> {relative_file_path}</span>
                         <span class="meta-item"><strong>字数:</strong> {self._get_word_count(source)}</span>
                         <span class="meta-item"><strong>分类:</strong> <span class="category">{category_name}</span></span>
                     </div>
                     <div class="source-meta">
-                        <span class="meta-item"><strong>标签:</strong>""")
+                        <span class="meta-item"><strong>标签:</strong>"""
 
                 for tag in self._get_tags(source):
-                    output.append(f""" <span class="tag">{tag}</span>""")
+                    yield f""" <span class="tag">{tag}</span>"""
 
-                output.append("""                        </span>
+                yield """                        </span>
                     </div>
                     <div class="source-meta">
-                        <span class="meta-item"><strong>关键概念:</strong>""")
+                        <span class="meta-item"><strong>关键概念:</strong>"""
 
                 for concept in self._get_key_concepts(source):
-                    output.append(f""" <span class="tag">{concept}</span>""")
+                    yield f""" <span class="tag">{concept}</span>"""
 
-                output.append("""                        </span>
+                yield """                        </span>
                     </div>
                 </div>
-                <div class="source-content">""")
-
-                # 读取原文内容
-                content = self._read_source_file(self._get_source_path(source))
-                if content.startswith("无法读取文件"):
-                    output.append(f"""                    <div class="original-content" style="color: #666; font-style: italic;">
-                        {content}
-                    </div>""")
+                <div class="source-content">"""
+
+                # 读取原文内容，缺失或读取失败的文章只显示错误说明
+                file_path = self._get_source_path(source)
+                error = self._source_error(file_path)
+                if error is not None:
+                    yield f"""                    <div class="original-content" style="color: #666; font-style: italic;">
+                        {error}
+                    </div>"""
                 else:
                     # 将markdown转换为HTML
-                    html_content = self._markdown_to_html(content)
-                    output.append(f"""                    <div class="original-content">
+                    html_content = self._markdown_to_html(self._read_source_file(file_path))
+                    yield f"""                    <div class="original-content">
                         {html_content}
-                    </div>""")
+                    </div>"""
 
-                output.append("""
+                yield """
                 </div>
-            </div>""")
+            </div>"""
 
-            output.append("""
+            yield """
         </div>
-    </div>""")
+    </div>"""
 
         # HTML尾部
-        output.append("""
+        yield """
     <footer style="text-align: center; margin-top: 40px; padding: 20px; color: #666; font-size: 0.9em;">
         <p>文档由 Claude Code 自动生成 | 基于 JSON 索引数据</p>
     </footer>
 </body>
-</html>""")
-
-        return ''.join(output)
+</html>"""
 
     def generate_summary_document(self) -> str:
         """生成概要文档"""
-        output = []
+        return ''.join(self.iter_summary_document())
+
+    def iter_summary_document(self) -> Iterator[str]:
+        """逐块生成概要文档"""
 
         # 文档头部
         metadata = self.index_data['metadata']
-        output.append(f"# {metadata['topic']} - 内容概要\n")
-        output.append(
-            f"**生成日期**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        output.append(f"**主题**: {metadata['topic']}\n")
-        output.append(f"**来源数量**: {self.total_sources}\n")
-        output.append("---\n\n")
+        yield f"# {metadata['topic']} - 内容概要\n"
+        yield f"**生成日期**: {self._generation_date()}\n"
+        yield f"**主题**: {metadata['topic']}\n"
+        yield f"**来源数量**: {self.total_sources}\n"
+        yield "---\n\n"
 
         # 统计信息
-        output.append("## 统计信息\n\n")
-        output.append(f"- **总来源数**: {self.total_sources}\n")
-        output.append(
-            f"- **分类数量**: {len(set(self._get_category(s) for s in self.index_data['sources']))}\n")
-        output.append(
-            f"- **总字数**: {sum(self._get_word_count(s) for s in self.index_data['sources'])}\n\n")
+        yield "## 统计信息\n\n"
+        yield f"- **总来源数**: {self.total_sources}\n"
+        yield f"- **分类数量**: {len(set(self._get_category(s) for s in self.index_data['sources']))}\n"
+        yield f"- **总字数**: {sum(self._get_word_count(s) for s in self.index_data['sources'])}\n\n"
 
         # 分类统计
         category_stats = {}
@@ -883,78 +939,102 @@ class MDDocumentGenerator:
             category_stats[category]['count'] += 1
             category_stats[category]['words'] += self._get_word_count(source)
 
-        output.append("## 分类统计\n\n")
+        yield "## 分类统计\n\n"
         for category, stats in category_stats.items():
-            output.append(
-                f"- **{category}**: {stats['count']} 个来源, {stats['words']} 字\n")
-        output.append("\n")
+            yield f"- **{category}**: {stats['count']} 个来源, {stats['words']} 字\n"
+        yield "\n"
 
         # 关键概念
-        output.append("## 关键概念\n\n")
+        yield "## 关键概念\n\n"
         all_concepts = set()
         for source in self.index_data['sources']:
             all_concepts.update(self._get_key_concepts(source))
 
         for concept in sorted(all_concepts):
-            output.append(f"- {concept}\n")
-        output.append("\n")
+            yield f"- {concept}\n"
+        yield "\n"
 
         # 关系网络
         relationships = self.index_data.get('relationships', {})
         if relationships:
-            output.append("## 概念关系\n\n")
+            yield "## 概念关系\n\n"
 
             if 'core_concepts' in relationships:
-                output.append("### 核心概念\n")
+                yield "### 核心概念\n"
                 for concept in relationships['core_concepts']:
-                    output.append(f"- {concept}\n")
-                output.append("\n")
+                    yield f"- {concept}\n"
+                yield "\n"
 
             if 'related_topics' in relationships:
-                output.append("### 相关主题\n")
+                yield "### 相关主题\n"
                 for topic in relationships['related_topics']:
-                    output.append(f"- {topic}\n")
-                output.append("\n")
+                    yield f"- {topic}\n"
+                yield "\n"
 
             if 'practical_applications' in relationships:
-                output.append("### 实践应用\n")
+                yield "### 实践应用\n"
                 for app in relationships['practical_applications']:
-                    output.append(f"- {app}\n")
-                output.append("\n")
+                    yield f"- {app}\n"
+                yield "\n"
 
             if 'critical_viewpoints' in relationships:
-                output.append("### 批判观点\n")
+                yield "### 批判观点\n"
                 for viewpoint in relationships['critical_viewpoints']:
-                    output.append(f"- {viewpoint}\n")
-                output.append("\n")
-
-        return ''.join(output)
+                    yield f"- {viewpoint}\n"
+                yield "\n"
 
     def generate_document(self, layout_type: str = 'thematic') -> str:
         """生成指定格式的文档"""
+        return ''.join(self.iter_document(layout_type))
+
+    def iter_document(self, layout_type: str = 'thematic') -> Iterator[str]:
+        """逐块生成指定格式的文档"""
         if layout_type == 'thematic':
-            return self.generate_thematic_document()
+            return self.iter_thematic_document()
         elif layout_type == 'source_based':
-            return self.generate_source_based_document()
+            return self.iter_source_based_document()
         elif layout_type == 'concepts':
-            return self.generate_concepts_document()
+            return self.iter_concepts_document()
         elif layout_type == 'summary':
-            return self.generate_summary_document()
+            return self.iter_summary_document()
         elif layout_type == 'html':
-            return self.generate_html_document()
+            return self.iter_html_document()
+        elif layout_type == 'excerpt':
+            return self.iter_excerpt_document()
+        elif layout_type == 'excerpt_html':
+            return self.iter_excerpt_html_document()
         else:
             raise ValueError(f"不支持的布局类型: {layout_type}")
 
+    def write_document(self, layout_type: str, output_path: str,
+                       buffer_size: int = WRITE_BUFFER_SIZE) -> None:
+        """流式生成文档：各块经缓冲写入文件，内存占用与来源数量无关"""
+        self._write_chunks(self.iter_document(layout_type), output_path, buffer_size)
+
     def save_document(self, content: str, output_path: str) -> None:
         """保存文档到文件"""
+        self._write_chunks((content,), output_path)
+
+    @staticmethod
+    def _write_chunks(chunks: Iterable[str], output_path: str,
+                      buffer_size: int = WRITE_BUFFER_SIZE) -> None:
         try:
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            # 先写临时文件再替换，不改写已有文件（它可能是产物缓存的硬链接）
+            tmp_path = f"{output_path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8', buffering=buffer_size) as f:
+                    for chunk in chunks:
+                        f.write(chunk)
+                os.replace(tmp_path, output_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
             print(f"文档已保存到: {output_path}")
         except Exception as e:
             print(f"保存文档时发生错误: {e}")
-
+            raise
 
 def parse_arguments():
     """解析命令行参数"""
@@ -966,6 +1046,10 @@ def parse_arguments():
   python gen_reading_md.py -i 索引文件.json -o 输出目录
   python gen_reading_md.py -i 索引文件.json -o 输出目录 -l thematic
   python gen_reading_md.py -i 索引文件.json -o 输出目录 -l html -t 主题名称
+  python gen_reading_md.py -i 索引文件.json -o 输出目录 -l source_based html
+  python gen_reading_md.py -i 索引文件.json -o 输出目录 -l excerpt -c 2
+  python gen_reading_md.py -i 索引文件.json -o 输出目录 -w 4
+  python gen_reading_md.py -i 索引文件.json -o 输出目录 --reproducible
         '''
     )
 
@@ -989,10 +1073,18 @@ def parse_arguments():
 
     parser.add_argument(
         '-l', '--layout',
+        nargs='+',
         choices=['thematic', 'source_based',
-                 'concepts', 'summary', 'html', 'all'],
-        default='all',
-        help='文档布局类型 (默认: all)'
+                 'concepts', 'summary', 'html', 'excerpt', 'excerpt_html', 'all'],
+        default=['all'],
+        help='文档布局类型，可指定多个 (默认: all，不含摘录版式)'
+    )
+
+    parser.add_argument(
+        '-c', '--context',
+        type=int,
+        default=DEFAULT_CONTEXT_PARAGRAPHS,
+        help=f'摘录版式中命中段落前后保留的段落数 (默认: {DEFAULT_CONTEXT_PARAGRAPHS})'
     )
 
     parser.add_argument(
@@ -1000,12 +1092,30 @@ def parse_arguments():
         help='自定义主题名称 (默认使用JSON中的主题)'
     )
 
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        default=1,
+        help='并发生成布局的进程数，0 表示使用全部CPU (默认: 1)'
+    )
+
     parser.add_argument(
         '--no-source-content',
         action='store_true',
         help='不包含原始文件内容，仅生成索引信息'
     )
 
+    parser.add_argument(
+        '--reproducible',
+        action='store_true',
+        help='可重现构建：生成日期取 SOURCE_DATE_EPOCH、索引的搜索日期或来源文件的最新修改时间，相同输入输出相同'
+    )
+
+    parser.add_argument(
+        '-m', '--manifest',
+        help='生成结束后把任务清单（产物路径、大小、哈希、耗时）写入该文件'
+    )
+
     return parser.parse_args()
 
 
@@ -1014,54 +1124,34 @@ def main():
     # 解析命令行参数
     args = parse_arguments()
 
-    index_file = args.index
-    output_dir = args.output
-    kb_dir = args.kb_dir
-    layout_type = args.layout
-    custom_topic = args.topic
-    no_source_content = args.no_source_content
-
-    try:
-        # 创建生成器
-        generator = MDDocumentGenerator(index_file, kb_dir)
+    # 延迟导入：api 依赖本模块
+    from document_generator.api import DEFAULT_LAYOUTS, load_index
+    from document_generator.artifact_cache import reproducible_time
+    from document_generator.scheduler import schedule_documents
 
-        # 如果有自定义主题名称，更新索引数据
-        if custom_topic:
-            generator.index_data['metadata']['topic'] = custom_topic
+    # 确定要生成的布局类型
+    if 'all' in args.layout:
+        layouts = DEFAULT_LAYOUTS
+    else:
+        layouts = list(dict.fromkeys(args.layout))
 
-        # 设置是否包含原始内容
-        generator.include_source_content = not no_source_content
-
-        # 确定要生成的布局类型
-        if layout_type == 'all':
-            layouts = ['thematic', 'source_based',
-                       'concepts', 'summary', 'html']
-        else:
-            layouts = [layout_type]
-
-        # 生成文档
-        for layout in layouts:
-            print(f"正在生成 {layout} 格式的文档...")
-
-            # 生成文档内容
-            content = generator.generate_document(layout)
-
-            # 确定输出文件名
-            topic_name = generator.index_data['metadata']['topic']
-            if layout == 'html':
-                output_file = os.path.join(
-                    output_dir, f"{topic_name}_{layout}_文档.html")
-            else:
-                output_file = os.path.join(
-                    output_dir, f"{topic_name}_{layout}_文档.md")
-
-            # 保存文档
-            generator.save_document(content, output_file)
-
-            print(f"{layout} 格式文档生成完成!")
+    try:
+        index_data = load_index(args.index)
+        schedule_documents(
+            index_data, args.kb_dir, args.output,
+            layouts=layouts,
+            epub=False,
+            workers=args.workers,
+            topic=args.topic,
+            include_source_content=not args.no_source_content,
+            excerpt_context=args.context,
+            build_time=reproducible_time(args.kb_dir, index_data) if args.reproducible else None,
+            manifest_file=args.manifest,
+            index_path=os.path.abspath(args.index),
+        )
 
         print("\n所有文档生成完成!")
-        print(f"输出目录: {output_dir}")
+        print(f"输出目录: {args.output}")
 
     except Exception as e:
         print(f"生成文档时发生错误: {e}")
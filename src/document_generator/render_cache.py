@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+渲染结果缓存
+按 (正文内容哈希, 渲染器版本) 缓存 Markdown 渲染出的 HTML 片段。
+缓存中链接的 target 属性以占位符保存，取出时再替换，因此 HTML 布局与 EPUB 章节共用同一份结果。
+内存中按字节预算做 LRU，同时每条结果一个文件保存在
+索引目录下（knowledge_base/.sth_index/render_cache/），服务重启或后续请求可直接复用；
+磁盘同样有字节上限，按最近使用时间淘汰。
+文章内容变化后哈希随之变化，旧结果自然不再命中并逐步被淘汰。
+"""
+
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import kb_index
+from document_generator.markdown_renderer import RENDERER_VERSION, markdown_to_html
+
+CACHE_DIRNAME = "render_cache"
+DEFAULT_MEMORY_BUDGET = 32 * 1024 * 1024
+DEFAULT_DISK_BUDGET = 256 * 1024 * 1024
+
+# 短文本直接渲染比查缓存更快，不缓存
+MIN_CACHED_CHARS = 1024
+
+# 缓存结果中链接 target 的占位符；正文含 NUL 字符时不走缓存
+_TARGET_PLACEHOLDER = '\0target\0'
+_TARGET_ATTR = f' target="{_TARGET_PLACEHOLDER}"'
+
+# 已创建的缓存，按目录区分，同一进程内共享
+_CACHES: Dict[str, "RenderCache"] = {}
+
+
+def render_key(markdown_text: str) -> str:
+    """缓存键：正文内容哈希与渲染器版本一起计算"""
+    digest = hashlib.sha1(f"{RENDERER_VERSION}\0".encode('utf-8'))
+    digest.update(markdown_text.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """渲染结果的内存 LRU，外加每条一个文件的磁盘存储"""
+
+    def __init__(self, cache_dir: Optional[str] = None,
+                 memory_budget: int = DEFAULT_MEMORY_BUDGET,
+                 disk_budget: int = DEFAULT_DISK_BUDGET):
+        self.cache_dir = cache_dir
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._memory_bytes = 0
+        # 磁盘上的条目及其大小，最久未使用的在前
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        if cache_dir:
+            self._load_keys()
+
+    @classmethod
+    def for_dir(cls, cache_dir: str) -> "RenderCache":
+        """返回保存在 cache_dir 的进程内共享缓存"""
+        cache = _CACHES.get(cache_dir)
+        if cache is None:
+            cache = _CACHES[cache_dir] = cls(cache_dir)
+        return cache
+
+    @classmethod
+    def for_kb_dir(cls, kb_dir: str) -> "RenderCache":
+        """返回该知识库索引目录下的共享缓存"""
+        return cls.for_dir(os.path.join(kb_index.default_index_dir(os.path.abspath(kb_dir)), CACHE_DIRNAME))
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.html")
+
+    def _load_keys(self) -> None:
+        """登记磁盘上已有的条目（按修改时间排序），不读取内容"""
+        try:
+            names = [n for n in os.listdir(self.cache_dir) if n.endswith('.html')]
+        except OSError:
+            return
+        entries = []
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name[:-len('.html')], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def get(self, key: str) -> Optional[str]:
+        """返回缓存的HTML，未命中时返回 None"""
+        html = self._memory.get(key)
+        if html is not None:
+            self._memory.move_to_end(key)
+            self._touch_disk(key)
+            return html
+        if key not in self._disk:
+            return None
+        try:
+            with open(self._entry_path(key), 'r', encoding='utf-8') as f:
+                html = f.read()
+        except OSError:
+            self._forget_disk(key)
+            return None
+        self._touch_disk(key)
+        self._remember(key, html)
+        return html
+
+    def put(self, key: str, html: str) -> None:
+        """保存渲染结果（内存与磁盘）"""
+        self._remember(key, html)
+        if not self.cache_dir or key in self._disk:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # 多个生成进程可能同时写同一条目，临时文件名带上进程号
+            tmp_path = f"{self._entry_path(key)}.{os.getpid()}.tmp"
+            data = html.encode('utf-8')
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._entry_path(key))
+        except OSError as e:
+            print(f"写入渲染缓存失败 {key}: {e}")
+            return
+        self._disk[key] = len(data)
+        self._disk_bytes += len(data)
+        self._evict_disk()
+
+    def render(self, markdown_text: str, link_target: Optional[str] = None) -> str:
+        """返回 markdown_text 渲染后的HTML，优先使用缓存"""
+        if len(markdown_text) < MIN_CACHED_CHARS or '\0' in markdown_text:
+            return markdown_to_html(markdown_text, link_target)
+        key = render_key(markdown_text)
+        html = self.get(key)
+        if html is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            html = markdown_to_html(markdown_text, _TARGET_PLACEHOLDER)
+            self.put(key, html)
+        if _TARGET_PLACEHOLDER not in html:
+            return html
+        return html.replace(_TARGET_ATTR, f' target="{link_target}"' if link_target else '')
+
+    def _remember(self, key: str, html: str) -> None:
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        if len(html) > self.memory_budget:
+            return
+        self._memory[key] = html
+        self._memory_bytes += len(html)
+        while self._memory_bytes > self.memory_budget:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _touch_disk(self, key: str) -> None:
+        """保持磁盘条目的LRU顺序与使用顺序一致"""
+        if key not in self._disk:
+            return
+        self._disk.move_to_end(key)
+        try:
+            os.utime(self._entry_path(key))
+        except OSError:
+            self._forget_disk(key)
+
+    def _forget_disk(self, key: str) -> None:
+        size = self._disk.pop(key, None)
+        if size is not None:
+            self._disk_bytes -= size
+
+    def _evict_disk(self) -> None:
+        while self._disk_bytes > self.disk_budget and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(self._entry_path(key))
+            except OSError:
+                pass
+
+    def __len__(self) -> int:
+        return len(self._memory.keys() | self._disk.keys())
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._memory or key in self._disk
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文档生成调度器
+每个布局和 EPUB 都是相互独立的任务，在进程池中并发生成，并记录每个产物的耗时，
+便于找出最慢的布局。传入产物缓存时，输入相同的任务直接从缓存取出，不再生成。
+结束后产物的路径、大小、哈希和耗时汇总为任务清单返回，并可原子写入文件。
+清单同时记录生成输入，未生成的布局可在之后首次被请求时按需补充（ensure_artifact）。
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from document_generator.api import ALL_LAYOUTS, DEFAULT_LAYOUTS, generate_documents, load_index
+from document_generator.artifact_cache import ArtifactCache, artifact_key, reproducible_time
+from document_generator.job_manifest import (build_manifest, new_job_id, read_manifest,
+                                             write_manifest)
+
+EPUB_JOB = 'epub'
+
+# 按需生成时每个任务清单一把锁，避免同一布局重复生成、并发更新清单时互相覆盖
+_MANIFEST_LOCKS: Dict[str, threading.Lock] = {}
+_MANIFEST_LOCKS_GUARD = threading.Lock()
+
+# 工作进程中的任务参数，由 _init_worker 设置，索引数据每个进程只传输一次
+_WORKER_ARGS: Optional[Tuple[Dict[str, Any], str, str, Dict[str, Any]]] = None
+
+
+def _init_worker(index_data: Dict[str, Any], kb_dir: str, output_dir: str,
+                 options: Dict[str, Any]) -> None:
+    global _WORKER_ARGS
+    _WORKER_ARGS = (index_data, kb_dir, output_dir, options)
+
+
+def _run_job(job: str, index_data: Dict[str, Any], kb_dir: str, output_dir: str,
+             options: Dict[str, Any]) -> Tuple[str, str, float]:
+    """生成单个产物，返回 (任务名, 路径, 耗时秒数)"""
+    start = time.perf_counter()
+    if job == EPUB_JOB:
+        artifacts = generate_documents(index_data, kb_dir, output_dir, layouts=(), epub=True, **options)
+    else:
+        artifacts = generate_documents(index_data, kb_dir, output_dir, layouts=[job], epub=False, **options)
+    return job, artifacts[job], time.perf_counter() - start
+
+
+def _run_worker_job(job: str) -> Tuple[str, str, float]:
+    return _run_job(job, *_WORKER_ARGS)
+
+
+def _job_list(layouts: Iterable[str], epub: bool) -> List[str]:
+    # EPUB 通常最慢，最先提交
+    return ([EPUB_JOB] if epub else []) + list(layouts)
+
+
+def schedule_documents(index_data: Dict[str, Any], kb_dir: str, output_dir: str,
+                       layouts: Iterable[str] = DEFAULT_LAYOUTS,
+                       epub: bool = True,
+                       workers: int = 1,
+                       artifact_cache: Optional[ArtifactCache] = None,
+                       job_id: Optional[str] = None,
+                       manifest_file: Optional[str] = None,
+                       index_path: Optional[str] = None,
+                       **options: Any) -> Dict[str, Any]:
+    """
+    并发生成布局文档和 EPUB。
+
+    workers 为 0 时使用全部 CPU，为 1 时在当前进程内依次生成；
+    传入 artifact_cache 时以可重现模式生成（build_time 取 reproducible_time()，由索引内容得出），
+    命中缓存的任务直接把缓存的文件链接到 output_dir，其余任务生成后存入缓存。
+    manifest_file 非空时把任务清单原子写入该路径，job_id 默认自动生成；
+    给出 index_path 时清单记录生成输入，之后可用 ensure_artifact 按需生成其他布局。
+    其余参数与 generate_documents 相同。返回
+    {"artifacts": {任务名: 路径}, "timings": {任务名: 秒}, "elapsed": 总秒数,
+    "cached": [命中缓存的任务名], "job_id": 任务ID, "manifest": 任务清单}，
+    产物按任务提交顺序排列。任一任务失败时抛出异常。
+    """
+    jobs = _job_list(layouts, epub)
+    start = time.perf_counter()
+    results: Dict[str, Tuple[str, float]] = {}
+    keys: Dict[str, str] = {}
+
+    if artifact_cache is not None:
+        # build_time 出现在文档头和 EPUB 文件名中，因此计入缓存键
+        options.setdefault('build_time', reproducible_time(kb_dir, index_data))
+        for job in jobs:
+            job_start = time.perf_counter()
+            keys[job] = artifact_key(index_data, kb_dir, job, options)
+            path = artifact_cache.fetch(keys[job], output_dir)
+            if path is not None:
+                results[job] = (path, time.perf_counter() - job_start)
+                print(f"{job} 命中产物缓存: {path}")
+    pending = [job for job in jobs if job not in results]
+    workers = min(workers or os.cpu_count() or 1, max(len(pending), 1))
+
+    if workers > 1:
+        print(f"使用 {workers} 个进程并发生成 {len(pending)} 个文档")
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(index_data, kb_dir, output_dir, options)) as executor:
+            futures = [executor.submit(_run_worker_job, job) for job in pending]
+            for future in as_completed(futures):
+                job, path, seconds = future.result()
+                results[job] = (path, seconds)
+                print(f"{job} 完成，耗时 {seconds:.2f} 秒")
+    else:
+        for job in pending:
+            job, path, seconds = _run_job(job, index_data, kb_dir, output_dir, options)
+            results[job] = (path, seconds)
+
+    if artifact_cache is not None:
+        for job in pending:
+            artifact_cache.put(keys[job], results[job][0])
+
+    elapsed = time.perf_counter() - start
+    artifacts = {job: results[job][0] for job in jobs}
+    timings = {job: results[job][1] for job in jobs}
+    cached = [job for job in jobs if job not in pending]
+    print(format_timings(timings, elapsed))
+
+    job_id = job_id or new_job_id()
+    topic = options.get('topic') or index_data.get('metadata', {}).get('topic', '')
+    inputs = None
+    if index_path:
+        inputs = {
+            "index_path": os.path.abspath(index_path),
+            "kb_dir": os.path.abspath(kb_dir),
+            "output_dir": os.path.abspath(output_dir),
+            # build_time 在按需生成时重新确定
+            "options": {key: value for key, value in options.items() if key != 'build_time'},
+        }
+    manifest = build_manifest(job_id, topic, artifacts, timings, elapsed, cached, inputs)
+    if manifest_file:
+        write_manifest(manifest, manifest_file)
+    return {
+        "artifacts": artifacts,
+        "timings": timings,
+        "elapsed": elapsed,
+        "cached": cached,
+        "job_id": job_id,
+        "manifest": manifest,
+    }
+
+
+def _manifest_lock(manifest_file: str) -> threading.Lock:
+    with _MANIFEST_LOCKS_GUARD:
+        return _MANIFEST_LOCKS.setdefault(os.path.abspath(manifest_file), threading.Lock())
+
+
+def ensure_artifact(manifest_file: str, job: str,
+                    artifact_cache: Optional[ArtifactCache] = None) -> str:
+    """
+    返回任务清单中某个产物（布局名或 'epub'）的路径；尚未生成时按清单记录的输入生成，
+    写入同一输出目录并更新清单。产物缓存命中时直接链接缓存的文件。
+    """
+    if job != EPUB_JOB and job not in ALL_LAYOUTS:
+        raise ValueError(f"不支持的布局类型: {job}")
+
+    with _manifest_lock(manifest_file):
+        manifest = read_manifest(manifest_file)
+        record = manifest["artifacts"].get(job)
+        if record and os.path.exists(record["path"]):
+            return record["path"]
+
+        inputs = manifest.get("inputs")
+        if not inputs:
+            raise ValueError(f"任务清单未记录生成输入，无法按需生成: {manifest_file}")
+        print(f"按需生成 {job}: {manifest['job_id']}")
+        result = schedule_documents(
+            load_index(inputs["index_path"]), inputs["kb_dir"], inputs["output_dir"],
+            layouts=[] if job == EPUB_JOB else [job],
+            epub=job == EPUB_JOB,
+            artifact_cache=artifact_cache,
+            job_id=manifest["job_id"],
+            **inputs["options"],
+        )
+        manifest["artifacts"].update(result["manifest"]["artifacts"])
+        write_manifest(manifest, manifest_file)
+        return result["artifacts"][job]
+
+
+def format_timings(timings: Dict[str, float], elapsed: float) -> str:
+    """按耗时从长到短列出各产物的生成时间"""
+    width = max((len(job) for job in timings), default=0)
+    lines = ["文档生成耗时:"]
+    for job, seconds in sorted(timings.items(), key=lambda item: -item[1]):
+        lines.append(f"  {job:<{width}}  {seconds:6.2f}s")
+    lines.append(f"  总计  {elapsed:.2f}s")
+    return '\n'.join(lines)
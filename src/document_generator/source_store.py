@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+来源文件缓存
+解析来源路径，读取并解码知识库文章，缓存正文、标题和字数。
+kb.pack 中的正文只有在其记录的大小和修改时间与磁盘文件一致时才使用，否则直接读文件。
+MDDocumentGenerator 与 EPUBDocumentGenerator 共享同一个 SourceStore，
+一次生成中每篇文章只读取、解码一次；常驻的服务进程还可以跨请求复用热门文章。
+缓存按字节预算做 LRU 淘汰，文件大小或修改时间变化后自动失效；
+服务进程的多个请求线程共用同一缓存，读写都在锁内进行。
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from kb_pack import KBPack
+
+# 缓存正文的总字节数上限（按 UTF-8 编码大小计）
+DEFAULT_BYTE_BUDGET = 64 * 1024 * 1024
+
+# 已创建的缓存，按知识库目录区分
+_STORES: Dict[str, "SourceStore"] = {}
+_STORES_LOCK = threading.Lock()
+
+
+class SourceDocument:
+    """一篇已读取的来源文章"""
+
+    __slots__ = ("path", "rel_path", "text", "title", "word_count", "size", "stamp", "error")
+
+    def __init__(self, path: str, rel_path: str, text: str, size: int,
+                 stamp: Optional[Tuple[int, int]], error: Optional[str] = None):
+        self.path = path
+        self.rel_path = rel_path
+        self.text = text
+        self.title = _extract_title(text) if error is None else None
+        self.word_count = len(text) if error is None else 0
+        self.size = size
+        # 读取时文件的 (大小, 纳秒修改时间)，用于判断缓存是否失效
+        self.stamp = stamp
+        self.error = error
+
+    @property
+    def found(self) -> bool:
+        return self.error is None
+
+
+def _extract_title(text: str) -> Optional[str]:
+    """返回第一个 # 标题"""
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('# '):
+            return line[2:].strip()
+    return None
+
+
+class SourceStore:
+    """按绝对路径缓存来源文章，字节预算内 LRU，大小或修改时间变化即失效"""
+
+    def __init__(self, kb_dir: str, byte_budget: int = DEFAULT_BYTE_BUDGET):
+        self.kb_dir = os.path.abspath(kb_dir)
+        self.byte_budget = byte_budget
+        self._documents: "OrderedDict[str, SourceDocument]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def for_kb_dir(cls, kb_dir: str) -> "SourceStore":
+        """返回该知识库目录共享的缓存（进程内单例）"""
+        kb_dir = os.path.abspath(kb_dir)
+        with _STORES_LOCK:
+            store = _STORES.get(kb_dir)
+            if store is None:
+                store = _STORES[kb_dir] = cls(kb_dir)
+            return store
+
+    def resolve(self, file_path: str) -> str:
+        """将来源路径规范化为知识库目录下的绝对路径"""
+        if not file_path:
+            return ""
+
+        # 统一路径分隔符
+        normalized = os.path.normpath(file_path.strip())
+
+        # 绝对路径保持不变
+        if os.path.isabs(normalized):
+            return normalized
+
+        # 去掉重复的 knowledge_base 前缀
+        parts = normalized.split(os.sep)
+        if parts and parts[0] in ("knowledge_base", "knowledgebase"):
+            parts = parts[1:]
+
+        # 路径已以知识库目录名开头（如 sth-matters/...）
+        kb_basename = os.path.basename(self.kb_dir.rstrip(os.sep))
+        if parts and parts[0] == kb_basename:
+            parts = parts[1:]
+
+        return os.path.normpath(os.path.join(self.kb_dir, *parts))
+
+    def get(self, file_path: str) -> SourceDocument:
+        """返回来源文章；文件缺失或读取失败时 error 字段给出原因"""
+        full_path = self.resolve(file_path)
+        try:
+            stat: Optional[os.stat_result] = os.stat(full_path)
+        except OSError:
+            stat = None
+        stamp = (stat.st_size, stat.st_mtime_ns) if stat is not None else None
+
+        with self._lock:
+            cached = self._documents.get(full_path)
+            if cached is not None and cached.stamp == stamp:
+                self._documents.move_to_end(full_path)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        # 读取和解码在锁外进行，不阻塞其他线程的命中
+        document = self._load(full_path, stat)
+        with self._lock:
+            self._store(full_path, document)
+        return document
+
+    def _load(self, full_path: str, stat: Optional[os.stat_result]) -> SourceDocument:
+        rel_path = os.path.relpath(full_path, self.kb_dir)
+        if stat is None:
+            return SourceDocument(full_path, rel_path, "", 0, None,
+                                  error=f"无法找到文件: {full_path}")
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        try:
+            # 打包文件与磁盘文件一致时从内存映射中读取，否则读磁盘上的新内容
+            pack = KBPack.for_kb_dir(self.kb_dir)
+            data = None
+            if pack is not None and pack.is_fresh(rel_path, stat):
+                data = pack.get_bytes(rel_path)
+            if data is None:
+                with open(full_path, 'rb') as f:
+                    data = f.read()
+            return SourceDocument(full_path, rel_path, str(data, 'utf-8'), len(data), stamp)
+        except Exception as e:
+            return SourceDocument(full_path, rel_path, "", 0, stamp,
+                                  error=f"读取文件时出错: {full_path}, 错误: {e}")
+
+    def _store(self, full_path: str, document: SourceDocument) -> None:
+        # 调用方须持有 self._lock
+        previous = self._documents.pop(full_path, None)
+        if previous is not None:
+            self._bytes -= previous.size
+        if document.stamp is None or document.size > self.byte_budget:
+            # 缺失的文件不缓存，文件出现后即可读到；超出预算的大文件也不缓存
+            return
+        self._documents[full_path] = document
+        self._bytes += document.size
+        while self._bytes > self.byte_budget:
+            _, evicted = self._documents.popitem(last=False)
+            self._bytes -= evicted.size
+
+    def read_text(self, file_path: str) -> str:
+        """返回正文；失败时返回错误说明（与旧的 _read_source_file 一致）"""
+        document = self.get(file_path)
+        return document.text if document.found else document.error
+
+    def title(self, file_path: str) -> Optional[str]:
+        """返回文章的第一个 # 标题"""
+        return self.get(file_path).title
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    @property
+    def cached_bytes(self) -> int:
+        return self._bytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._documents.clear()
+            self._bytes = 0
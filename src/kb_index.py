@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+KB Index: a persistent inverted index over the knowledge base.
+
+CJK text is tokenized into character bigrams and Latin text into lowercase
+words. Queries are answered from postings lookups so that only the candidate
+files have to be opened and verified.
+
+A manifest of (relative path, size, mtime, content hash) records the state of
+the knowledge base the index was built from, so that after a ``git pull`` only
+added, changed or deleted files have to be re-processed. The KB pack, the
+tag taxonomy, the MinHash signatures used for dedup and the chunk table are
+maintained in the same pass.
+"""
+
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import chunker
+import dedup
+import kb_pack
+import tag_taxonomy
+
+# 2: tokens are casefolded
+INDEX_VERSION = 2
+INDEX_DIRNAME = ".sth_index"
+INDEX_FILENAME = "inverted_index.json"
+MANIFEST_FILENAME = "manifest.json"
+
+# Manifest entry: [size, mtime_ns, sha1 hex digest]
+ManifestEntry = List
+
+_CJK = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+_TOKEN_RE = re.compile(rf"[{_CJK}]+|[^\W{_CJK}]+")
+_CJK_RUN_RE = re.compile(rf"^[{_CJK}]+$")
+_REGEX_META = set(".^$*+?{}[]\\|()")
+
+# Loaded indexes keyed by path, invalidated when the file's mtime changes
+_LOADED: Dict[str, "InvertedIndex"] = {}
+# Manifest path -> (mtime, version)
+_VERSIONS: Dict[str, Tuple[float, str]] = {}
+# Manifest path -> (mtime, {relative path: content hash})
+_HASHES: Dict[str, Tuple[float, Dict[str, str]]] = {}
+# Manifest path -> (mtime, {relative path: (size, mtime_ns)})
+_STATS: Dict[str, Tuple[float, Dict[str, Tuple[int, int]]]] = {}
+
+
+def default_index_dir(kb_dir: str) -> str:
+    """Return the index directory that sits next to the knowledge base clone."""
+    return os.path.join(os.path.dirname(os.path.abspath(kb_dir)), INDEX_DIRNAME)
+
+
+def should_exclude_file(file_path: str, knowledge_base_dir: str) -> bool:
+    """Check if file should be excluded from search"""
+    # Get relative path from knowledge base
+    rel_path = os.path.relpath(file_path, knowledge_base_dir)
+
+    # Exclude files and directories starting with .
+    path_parts = rel_path.split(os.sep)
+    for part in path_parts:
+        if part.startswith('.'):
+            return True
+
+    # Exclude specific README.md file in root of knowledge base
+    if rel_path == "README.md":
+        return True
+
+    return False
+
+
+def iter_kb_files(kb_dir: str) -> Iterator[str]:
+    """Yield searchable markdown files under kb_dir in a stable (sorted) order."""
+    for root, dirs, files in os.walk(kb_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        for name in sorted(files):
+            if not name.endswith('.md'):
+                continue
+            file_path = os.path.join(root, name)
+            if not should_exclude_file(file_path, kb_dir):
+                yield file_path
+
+
+def content_hash(data: bytes) -> str:
+    """Return the content hash recorded in the manifest."""
+    return hashlib.sha1(data).hexdigest()
+
+
+def read_kb_file(file_path: str) -> Tuple[bytes, str]:
+    """Read a knowledge base file, returning its raw bytes and decoded text."""
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    return data, data.decode('utf-8')
+
+
+def scan_manifest(kb_dir: str, previous: Optional[Dict[str, ManifestEntry]] = None
+                  ) -> Dict[str, ManifestEntry]:
+    """Stat every searchable file and return the manifest entries.
+
+    Content hashes are reused from ``previous`` when size and mtime are
+    unchanged, so only modified files are read.
+    """
+    previous = previous or {}
+    files: Dict[str, ManifestEntry] = {}
+    for file_path in iter_kb_files(kb_dir):
+        rel_path = os.path.relpath(file_path, kb_dir)
+        try:
+            stat = os.stat(file_path)
+            old = previous.get(rel_path)
+            if old and old[0] == stat.st_size and old[1] == stat.st_mtime_ns:
+                files[rel_path] = old
+                continue
+            with open(file_path, 'rb') as f:
+                digest = content_hash(f.read())
+        except OSError as e:
+            print(f"Error scanning file {file_path}: {e}")
+            continue
+        files[rel_path] = [stat.st_size, stat.st_mtime_ns, digest]
+    return files
+
+
+def diff_manifest(old: Dict[str, ManifestEntry], new: Dict[str, ManifestEntry]
+                  ) -> Tuple[List[str], List[str], List[str]]:
+    """Return (added, changed, deleted) relative paths between two manifests."""
+    added = sorted(p for p in new if p not in old)
+    changed = sorted(p for p in new if p in old and old[p][2] != new[p][2])
+    deleted = sorted(p for p in old if p not in new)
+    return added, changed, deleted
+
+
+def manifest_version(files: Dict[str, ManifestEntry]) -> str:
+    """Return a short digest identifying the knowledge base contents."""
+    digest = hashlib.sha1()
+    for rel_path in sorted(files):
+        digest.update(f"{rel_path}\0{files[rel_path][2]}\n".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def load_manifest(index_dir: str) -> Optional[Dict[str, ManifestEntry]]:
+    """Load the manifest files table, or None if it does not exist."""
+    manifest_path = os.path.join(index_dir, MANIFEST_FILENAME)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)["files"]
+    except (OSError, json.JSONDecodeError, KeyError):
+        return None
+
+
+def current_kb_version(index_dir: str) -> Optional[str]:
+    """Return the version recorded in the manifest, or None without a manifest."""
+    manifest_path = os.path.join(index_dir, MANIFEST_FILENAME)
+    try:
+        mtime = os.path.getmtime(manifest_path)
+    except OSError:
+        return None
+    cached = _VERSIONS.get(manifest_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            version = json.load(f).get("version")
+    except (OSError, json.JSONDecodeError):
+        return None
+    _VERSIONS[manifest_path] = (mtime, version)
+    return version
+
+
+def manifest_hashes(index_dir: str) -> Dict[str, str]:
+    """Return {relative path: content hash} from the manifest (empty without one)."""
+    manifest_path = os.path.join(index_dir, MANIFEST_FILENAME)
+    try:
+        mtime = os.path.getmtime(manifest_path)
+    except OSError:
+        return {}
+    cached = _HASHES.get(manifest_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    files = load_manifest(index_dir) or {}
+    hashes = {rel_path: entry[2] for rel_path, entry in files.items()}
+    _HASHES[manifest_path] = (mtime, hashes)
+    return hashes
+
+
+def stale_paths(kb_dir: str, index_dir: str) -> Optional[Tuple[List[str], List[str]]]:
+    """Return (modified, deleted) relative paths since the manifest was written.
+
+    Only stats the files (size and mtime), so it is cheap enough to run on
+    every query. New files count as modified. Returns None without a manifest.
+    """
+    manifest_path = os.path.join(index_dir, MANIFEST_FILENAME)
+    try:
+        mtime = os.path.getmtime(manifest_path)
+    except OSError:
+        return None
+    cached = _STATS.get(manifest_path)
+    if cached and cached[0] == mtime:
+        recorded = cached[1]
+    else:
+        files = load_manifest(index_dir)
+        if files is None:
+            return None
+        recorded = {rel_path: (entry[0], entry[1]) for rel_path, entry in files.items()}
+        _STATS[manifest_path] = (mtime, recorded)
+
+    modified = []
+    seen = set()
+    prefix = len(os.path.join(kb_dir, ''))
+    for file_path in iter_kb_files(kb_dir):
+        rel_path = file_path[prefix:]
+        seen.add(rel_path)
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            continue
+        if recorded.get(rel_path) != (stat.st_size, stat.st_mtime_ns):
+            modified.append(rel_path)
+    deleted = sorted(p for p in recorded if p not in seen)
+    return modified, deleted
+
+
+def save_manifest(index_dir: str, files: Dict[str, ManifestEntry]) -> str:
+    """Atomically write the manifest into index_dir and return its path."""
+    os.makedirs(index_dir, exist_ok=True)
+    manifest_path = os.path.join(index_dir, MANIFEST_FILENAME)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            "version": manifest_version(files),
+            "updated_at": datetime.now().isoformat(timespec='seconds'),
+            "files": files,
+        }, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, manifest_path)
+    return manifest_path
+
+
+def is_literal_query(topic: str) -> bool:
+    """Return True if the topic contains no regex metacharacters."""
+    return not any(ch in _REGEX_META for ch in topic)
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into CJK character bigrams and casefolded Latin words.
+
+    A CJK run of a single character is kept as a unigram so that it can
+    still be looked up.
+    """
+    tokens = []
+    # casefold() like the matchers, so e.g. "ß" and "ss" share a token
+    for run in _TOKEN_RE.findall(text.casefold()):
+        if _CJK_RUN_RE.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+class InvertedIndex:
+    """Token -> document postings for the knowledge base."""
+
+    def __init__(self, docs: Optional[List[Optional[str]]] = None,
+                 postings: Optional[Dict[str, List[int]]] = None,
+                 built_at: str = ""):
+        self.docs = docs or []
+        self.postings = postings or {}
+        self.built_at = built_at
+        self._latin_vocab: Optional[List[str]] = None
+        self._mtime: Optional[float] = None
+
+    def add_document(self, rel_path: str, content: str) -> int:
+        """Register a document and its tokens, returning its doc id."""
+        doc_id = len(self.docs)
+        self.docs.append(rel_path)
+        for token in set(tokenize(content)):
+            self.postings.setdefault(token, []).append(doc_id)
+        self._latin_vocab = None
+        return doc_id
+
+    def remove_documents(self, rel_paths: Iterable[str]) -> None:
+        """Drop documents from the index.
+
+        Doc ids are left as empty slots so that the ids of the remaining
+        documents stay stable; they are compacted on the next full build.
+        """
+        targets = set(rel_paths)
+        removed = {i for i, path in enumerate(self.docs) if path in targets}
+        if not removed:
+            return
+        for i in removed:
+            self.docs[i] = None
+        for token in list(self.postings):
+            kept = [i for i in self.postings[token] if i not in removed]
+            if kept:
+                self.postings[token] = kept
+            else:
+                del self.postings[token]
+        self._latin_vocab = None
+
+    @property
+    def document_count(self) -> int:
+        return sum(1 for path in self.docs if path is not None)
+
+    def _docs_for_token(self, token: str) -> Set[int]:
+        """Return ids of documents that may contain token as a substring."""
+        if _CJK_RUN_RE.match(token) and len(token) == 2:
+            return set(self.postings.get(token, ()))
+
+        if _CJK_RUN_RE.match(token):
+            # Single CJK character: any bigram containing it
+            vocab: Iterable[str] = (t for t in self.postings
+                                    if token in t and _CJK_RUN_RE.match(t))
+        else:
+            # Latin words in the query may be fragments of indexed words
+            if self._latin_vocab is None:
+                self._latin_vocab = [t for t in self.postings
+                                     if not _CJK_RUN_RE.match(t)]
+            vocab = (t for t in self._latin_vocab if token in t)
+
+        doc_ids: Set[int] = set()
+        for term in vocab:
+            doc_ids.update(self.postings[term])
+        return doc_ids
+
+    def candidates(self, query: str) -> Optional[List[str]]:
+        """Return relative paths of documents that may contain the literal query.
+
+        Returns None when the query yields no tokens, meaning every
+        document is a candidate.
+        """
+        query_tokens = set(tokenize(query))
+        if not query_tokens:
+            return None
+
+        result: Optional[Set[int]] = None
+        # Rarest tokens first so the intersection shrinks quickly
+        for token in sorted(query_tokens, key=lambda t: len(self.postings.get(t, ()))):
+            doc_ids = self._docs_for_token(token)
+            result = doc_ids if result is None else result & doc_ids
+            if not result:
+                return []
+        return [self.docs[i] for i in sorted(result) if self.docs[i] is not None]
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": INDEX_VERSION,
+            "built_at": self.built_at,
+            "docs": self.docs,
+            "postings": self.postings,
+        }
+
+    def save(self, index_dir: str) -> str:
+        """Atomically write the index into index_dir and return its path."""
+        os.makedirs(index_dir, exist_ok=True)
+        index_path = os.path.join(index_dir, INDEX_FILENAME)
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, index_path)
+        self._mtime = os.path.getmtime(index_path)
+        _LOADED[index_path] = self
+        return index_path
+
+    @classmethod
+    def load(cls, index_dir: str) -> Optional["InvertedIndex"]:
+        """Load the index from index_dir, or return None if it is missing or outdated."""
+        index_path = os.path.join(index_dir, INDEX_FILENAME)
+        try:
+            mtime = os.path.getmtime(index_path)
+        except OSError:
+            return None
+
+        cached = _LOADED.get(index_path)
+        if cached is not None and cached._mtime == mtime:
+            return cached
+
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error loading search index {index_path}: {e}")
+            return None
+        if data.get("version") != INDEX_VERSION:
+            return None
+
+        index = cls(data["docs"], data["postings"], data.get("built_at", ""))
+        index._mtime = mtime
+        _LOADED[index_path] = index
+        return index
+
+
+def build_index(kb_dir: str, index_dir: str) -> Dict:
+    """Build the index, manifest and KB pack from scratch."""
+    manifest: Dict[str, ManifestEntry] = {}
+    index = InvertedIndex(built_at=datetime.now().isoformat(timespec='seconds'))
+    taxonomy = tag_taxonomy.TagTaxonomy()
+    signatures = dedup.SignatureStore()
+    chunks = chunker.ChunkTable()
+    pack_path = os.path.join(index_dir, kb_pack.PACK_FILENAME)
+    with kb_pack.PackWriter(pack_path) as writer:
+        for file_path in iter_kb_files(kb_dir):
+            rel_path = os.path.relpath(file_path, kb_dir)
+            try:
+                stat = os.stat(file_path)
+                data, content = read_kb_file(file_path)
+            except Exception as e:
+                print(f"Error indexing file {file_path}: {e}")
+                continue
+            index.add_document(rel_path, content)
+            taxonomy.add_document(rel_path, tag_taxonomy.extract_tags(content))
+            signatures.add_document(rel_path, content)
+            manifest[rel_path] = [stat.st_size, stat.st_mtime_ns, content_hash(data)]
+            chunks.add_document(rel_path, content, manifest[rel_path][2])
+            writer.add(rel_path, data, stat.st_mtime_ns)
+        writer.manifest_version = manifest_version(manifest)
+    index_path = index.save(index_dir)
+    taxonomy.save(index_dir)
+    signatures.save(index_dir)
+    chunks.save(index_dir)
+    save_manifest(index_dir, manifest)
+    return {
+        "index_path": index_path,
+        "total_files": index.document_count,
+        "total_tokens": len(index.postings),
+        "total_tags": len(taxonomy),
+        "total_chunks": len(chunks),
+    }
+
+
+def update_index(kb_dir: str, index_dir: str) -> Dict:
+    """Bring the index up to date by re-processing only changed files.
+
+    Falls back to a full build when there is no usable index or manifest.
+    """
+    old_manifest = load_manifest(index_dir)
+    index = InvertedIndex.load(index_dir)
+    taxonomy = tag_taxonomy.TagTaxonomy.load(index_dir)
+    signatures = dedup.SignatureStore.load(index_dir)
+    chunks = chunker.ChunkTable.load(index_dir)
+    if any(part is None for part in (old_manifest, index, taxonomy, signatures, chunks)):
+        stats = build_index(kb_dir, index_dir)
+        stats.update({"full_rebuild": True, "added": [], "changed": [], "deleted": []})
+        return stats
+
+    new_manifest = scan_manifest(kb_dir, old_manifest)
+    added, changed, deleted = diff_manifest(old_manifest, new_manifest)
+
+    if added or changed or deleted:
+        index.remove_documents(changed + deleted)
+        taxonomy.remove_documents(changed + deleted)
+        signatures.remove_documents(changed + deleted)
+        chunks.remove_documents(changed + deleted)
+        for rel_path in added + changed:
+            try:
+                _, content = read_kb_file(os.path.join(kb_dir, rel_path))
+            except Exception as e:
+                print(f"Error indexing file {rel_path}: {e}")
+                new_manifest.pop(rel_path, None)
+                continue
+            index.add_document(rel_path, content)
+            taxonomy.add_document(rel_path, tag_taxonomy.extract_tags(content))
+            signatures.add_document(rel_path, content)
+            chunks.add_document(rel_path, content, new_manifest[rel_path][2])
+        index.built_at = datetime.now().isoformat(timespec='seconds')
+        index_path = index.save(index_dir)
+        taxonomy.save(index_dir)
+        signatures.save(index_dir)
+        chunks.save(index_dir)
+    else:
+        index_path = os.path.join(index_dir, INDEX_FILENAME)
+
+    # Mtimes may have moved even when contents did not
+    if new_manifest != old_manifest:
+        save_manifest(index_dir, new_manifest)
+
+    pack_path = os.path.join(index_dir, kb_pack.PACK_FILENAME)
+    version = manifest_version(new_manifest)
+    old_pack = kb_pack.KBPack.for_kb_dir(kb_dir)
+    mtimes = {rel_path: entry[1] for rel_path, entry in new_manifest.items()}
+    # Touched files keep their version but need their new mtime in the pack
+    if old_pack is None or old_pack.manifest_version != version or old_pack.mtimes != mtimes:
+        kb_pack.write_pack(kb_dir, pack_path, sorted(new_manifest), version,
+                           reuse=old_pack, reread=set(added + changed), mtimes=mtimes)
+
+    return {
+        "index_path": index_path,
+        "total_files": index.document_count,
+        "total_tokens": len(index.postings),
+        "total_tags": len(taxonomy),
+        "total_chunks": len(chunks),
+        "full_rebuild": False,
+        "added": added,
+        "changed": changed,
+        "deleted": deleted,
+    }
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+KB Pack: the knowledge base concatenated into one memory-mapped file.
+
+Layout::
+
+    MAGIC | body 0 | \\0 | body 1 | \\0 | ... | table (JSON) | table offset (8 bytes LE) | MAGIC
+
+The table maps each relative path to the ``[offset, length, mtime_ns]`` of
+its UTF-8 body; readers only trust a body while the file on disk still has
+that size and mtime (see ``KBPack.is_fresh``), so an edited or deleted
+article is read from disk until the next ``update-index``. Readers ``mmap`` the pack and hand out zero-copy ``memoryview`` slices,
+and literal scans can run over the whole buffer at once instead of paying
+open/stat/decode per file. The NUL separator keeps matches from spanning two
+articles.
+"""
+
+import bisect
+import json
+import mmap
+import os
+import re
+import struct
+from typing import Dict, Iterator, List, Optional, Pattern, Tuple
+
+import kb_index
+
+PACK_FILENAME = "kb.pack"
+MAGIC = b"STHPACK1"
+_FOOTER = struct.Struct("<Q")
+
+# Open packs keyed by path, invalidated when the file's mtime changes
+_OPEN: Dict[str, "KBPack"] = {}
+
+
+class PackWriter:
+    """Stream article bodies into a new pack file."""
+
+    def __init__(self, pack_path: str, manifest_version: str = ""):
+        self.pack_path = pack_path
+        self.manifest_version = manifest_version
+        self._tmp_path = pack_path + ".tmp"
+        self._entries: Dict[str, List[int]] = {}
+        os.makedirs(os.path.dirname(pack_path), exist_ok=True)
+        self._file = open(self._tmp_path, 'wb')
+        self._file.write(MAGIC)
+        self._pos = len(MAGIC)
+
+    def add(self, rel_path: str, data, mtime_ns: Optional[int] = None) -> None:
+        """Append one article body (bytes or memoryview) and the mtime it was read at."""
+        self._file.write(data)
+        self._file.write(b"\0")
+        self._entries[rel_path] = [self._pos, len(data), mtime_ns]
+        self._pos += len(data) + 1
+
+    def close(self) -> str:
+        """Write the table and footer, then atomically publish the pack."""
+        table = json.dumps({
+            "manifest_version": self.manifest_version,
+            "entries": self._entries,
+        }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self._file.write(table)
+        self._file.write(_FOOTER.pack(self._pos))
+        self._file.write(MAGIC)
+        self._file.close()
+        os.replace(self._tmp_path, self.pack_path)
+        return self.pack_path
+
+    def abort(self) -> None:
+        self._file.close()
+        os.remove(self._tmp_path)
+
+    def __enter__(self) -> "PackWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class KBPack:
+    """Read-only, memory-mapped view of a pack file."""
+
+    def __init__(self, pack_path: str):
+        self.pack_path = pack_path
+        with open(pack_path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mtime = os.path.getmtime(pack_path)
+
+        footer_start = len(self._mm) - _FOOTER.size - len(MAGIC)
+        if (self._mm[:len(MAGIC)] != MAGIC
+                or self._mm[footer_start + _FOOTER.size:] != MAGIC):
+            self._mm.close()
+            raise ValueError(f"Not a KB pack file: {pack_path}")
+        table_start = _FOOTER.unpack_from(self._mm, footer_start)[0]
+        table = json.loads(self._mm[table_start:footer_start].decode('utf-8'))
+
+        self.manifest_version: str = table.get("manifest_version", "")
+        self.entries: Dict[str, Tuple[int, int]] = {
+            path: (entry[0], entry[1]) for path, entry in table["entries"].items()
+        }
+        # Packs written before mtimes were recorded are never considered fresh
+        self.mtimes: Dict[str, Optional[int]] = {
+            path: entry[2] if len(entry) > 2 else None for path, entry in table["entries"].items()
+        }
+        self._data_end = table_start
+        # Sorted body offsets for mapping buffer positions back to articles
+        ordered = sorted((offset, path) for path, (offset, _) in self.entries.items())
+        self._starts = [offset for offset, _ in ordered]
+        self._paths = [path for _, path in ordered]
+
+    @classmethod
+    def for_kb_dir(cls, kb_dir: str) -> Optional["KBPack"]:
+        """Return the (shared) pack built for kb_dir, or None if there is none."""
+        pack_path = os.path.join(kb_index.default_index_dir(kb_dir), PACK_FILENAME)
+        try:
+            mtime = os.path.getmtime(pack_path)
+        except OSError:
+            return None
+
+        pack = _OPEN.get(pack_path)
+        if pack is not None and pack._mtime == mtime:
+            return pack
+        try:
+            pack = cls(pack_path)
+        except (OSError, ValueError) as e:
+            print(f"Error opening KB pack {pack_path}: {e}")
+            return None
+        _OPEN[pack_path] = pack
+        return pack
+
+    def __contains__(self, rel_path: str) -> bool:
+        return rel_path in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def paths(self) -> List[str]:
+        """Relative paths in pack (i.e. sorted) order."""
+        return list(self._paths)
+
+    def get_bytes(self, rel_path: str) -> Optional[memoryview]:
+        """Zero-copy slice of an article body, or None if it is not packed."""
+        entry = self.entries.get(rel_path)
+        if entry is None:
+            return None
+        offset, length = entry
+        return memoryview(self._mm)[offset:offset + length]
+
+    def is_fresh(self, rel_path: str, stat: os.stat_result) -> bool:
+        """True if the packed body still matches the file described by os.stat."""
+        entry = self.entries.get(rel_path)
+        mtime_ns = self.mtimes.get(rel_path)
+        return (entry is not None and mtime_ns is not None
+                and entry[1] == stat.st_size and mtime_ns == stat.st_mtime_ns)
+
+    def read_text(self, rel_path: str) -> Optional[str]:
+        """Decoded article body, or None if it is not packed."""
+        entry = self.entries.get(rel_path)
+        if entry is None:
+            return None
+        offset, length = entry
+        return self._mm[offset:offset + length].decode('utf-8')
+
+    def iter_texts(self, rel_paths: Optional[List[str]] = None) -> Iterator[Tuple[str, str]]:
+        """Yield (relative path, decoded body) pairs."""
+        for rel_path in (self._paths if rel_paths is None else rel_paths):
+            text = self.read_text(rel_path)
+            if text is not None:
+                yield rel_path, text
+
+    def path_at(self, position: int) -> Optional[str]:
+        """Return the article whose body contains a buffer position."""
+        i = bisect.bisect_right(self._starts, position) - 1
+        if i < 0:
+            return None
+        path = self._paths[i]
+        offset, length = self.entries[path]
+        return path if position < offset + length else None
+
+    def search(self, pattern: Pattern[bytes]) -> List[str]:
+        """Run one bytes regex over the whole buffer and return matching paths.
+
+        Each article is reported once, in pack order; after a hit the scan
+        resumes at the start of the next article.
+        """
+        matched = []
+        pos = len(MAGIC)
+        while pos < self._data_end:
+            match = pattern.search(self._mm, pos, self._data_end)
+            if match is None:
+                break
+            path = self.path_at(match.start())
+            if path is None or match.end() > sum(self.entries[path]):
+                # Hit a separator or ran into the next article
+                pos = match.start() + 1
+                continue
+            matched.append(path)
+            offset, length = self.entries[path]
+            pos = offset + length + 1
+        return matched
+
+    def close(self) -> None:
+        _OPEN.pop(self.pack_path, None)
+        self._mm.close()
+
+
+def literal_bytes_pattern(topic: str) -> Optional[Pattern[bytes]]:
+    """Compile a case-insensitive bytes pattern for a literal topic.
+
+    Returns None when the topic has non-ASCII cased characters, whose case
+    folding a bytes pattern cannot reproduce.
+    """
+    if any(ord(ch) > 127 and ch.lower() != ch.upper() for ch in topic):
+        return None
+    return re.compile(re.escape(topic.encode('utf-8')), re.IGNORECASE)
+
+
+def write_pack(kb_dir: str, pack_path: str, rel_paths: List[str],
+               manifest_version: str = "", reuse: Optional[KBPack] = None,
+               reread: Optional[set] = None,
+               mtimes: Optional[Dict[str, int]] = None) -> str:
+    """Write a pack containing rel_paths.
+
+    Bodies are copied from ``reuse`` (an older pack) unless the path is in
+    ``reread`` or missing there, in which case the file is read from disk.
+    ``mtimes`` gives the mtime (ns) the manifest recorded for each body;
+    without one the file is stat'ed before it is read.
+    """
+    reread = reread or set()
+    mtimes = mtimes or {}
+    with PackWriter(pack_path, manifest_version) as writer:
+        for rel_path in rel_paths:
+            file_path = os.path.join(kb_dir, rel_path)
+            mtime_ns = mtimes.get(rel_path)
+            data = None
+            if reuse is not None and rel_path not in reread:
+                data = reuse.get_bytes(rel_path)
+            if data is None:
+                if mtime_ns is None:
+                    mtime_ns = os.stat(file_path).st_mtime_ns
+                data, _ = kb_index.read_kb_file(file_path)
+            writer.add(rel_path, data, mtime_ns)
+    return pack_path
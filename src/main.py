@@ -7,14 +7,16 @@ Gradio前端界面
 
 import gradio as gr
 import os
+import re
 import json
 import time
-import subprocess
-import glob
 from datetime import datetime
 from rpa import DeepSearchRPA
 from email_client import EmailClient
 from quick_search import perform_quick_search
+from workflow import ensure_layout, run_document_generators
+from utils import JOBS_DIRNAME, create_job_dir, gc_job_dirs
+from document_generator.api import ALL_LAYOUTS
 from logger import get_logger, init_logging, log_search_start, log_search_complete, log_email_sent
 
 
@@ -41,7 +43,14 @@ class KnowledgeSearchInterface:
         self.search_rpa = DeepSearchRPA(base_dir=self.base_dir)
         self.email_sender = EmailClient()
 
-    def _send_email_and_get_report(self, topic: str, email: str, files: dict) -> str:
+    def _new_job(self):
+        """Creates the working directory for a new job and removes expired ones."""
+        job_id, job_dir = create_job_dir(self.output_dir)
+        gc_job_dirs(self.output_dir, keep=[job_id])
+        self.logger.info(f"任务目录: {job_dir}")
+        return job_id, job_dir
+
+    def _send_email_and_get_report(self, topic: str, email: str, files: dict, job_id: str = None) -> str:
         """Helper function to send email and generate a report."""
         self.logger.info(
             f"开始发送邮件: 主题='{topic}', 收件人='{email}', 文件数量={len(files)}")
@@ -97,8 +106,29 @@ class KnowledgeSearchInterface:
 - 错误信息：{error_msg}
 
 文件已生成在本地，请检查邮件配置或手动发送。"""
+        if job_id:
+            result_msg += f"""
+
+🗂 **任务ID**：{job_id}
+其他版式（主题分类、关键概念、内容概要、摘录等）可在“其他版式”页按需生成。"""
         return result_msg
 
+    def get_layout(self, job_id: str, layout: str):
+        """Generates (on first request) and returns another layout of a finished job."""
+        job_id = (job_id or "").strip()
+        if not re.fullmatch(r"[\w-]+", job_id):
+            return None, "❌ 请输入有效的任务ID"
+        job_dir = os.path.join(self.output_dir, JOBS_DIRNAME, job_id)
+        if not os.path.isdir(job_dir):
+            return None, f"❌ 未找到任务: {job_id}（任务可能已过期清理）"
+        try:
+            path = ensure_layout(job_dir, job_id, layout)
+        except Exception as e:
+            self.logger.error(f"按需生成失败: 任务='{job_id}', 版式='{layout}', 错误='{e}'")
+            return None, f"❌ 生成失败: {e}"
+        self.logger.info(f"按需生成完成: 任务='{job_id}', 版式='{layout}', 文件='{path}'")
+        return path, f"✅ 已生成: {os.path.basename(path)}"
+
     def deep_search_and_send(self, topic: str, email: str, progress=gr.Progress()):
         """Executes the DEEP search and send workflow."""
         start_time = time.time()
@@ -130,7 +160,8 @@ class KnowledgeSearchInterface:
             return "⚠️ [深度搜索] 完成但未找到生成的文档文件"
 
         progress(0.8, desc="[深度搜索] 正在发送邮件...")
-        report = self._send_email_and_get_report(topic, email, files)
+        report = self._send_email_and_get_report(
+            topic, email, files, search_result.get("job_id"))
         progress(1.0, desc="[深度搜索] 完成！")
 
         # 记录搜索完成
@@ -151,8 +182,13 @@ class KnowledgeSearchInterface:
 
         progress(0.1, desc="[快速搜索] 开始执行关键词匹配...")
 
+        # Each request works in its own output/jobs/<job_id>/ directory, so
+        # concurrent users never mail each other's files
+        job_id, job_dir = self._new_job()
+
         # Step 1: Perform quick search to get the index file
-        search_result = perform_quick_search(topic.strip(), self.base_dir)
+        search_result = perform_quick_search(
+            topic.strip(), self.base_dir, slim=True, output_dir=job_dir)
 
         if not search_result["success"]:
             error_msg = search_result.get('error', '未知错误')
@@ -175,34 +211,22 @@ class KnowledgeSearchInterface:
         progress(0.4, desc="[快速搜索] 索引生成，开始转换文档...")
         self.logger.info(f"快速搜索索引文件已生成: {index_file_path}")
 
-        # Step 2: Call document generators
+        # Step 2: Generate documents in-process from the already-loaded index.
+        # Gradio serves requests on threads, so forking a process pool per request is
+        # unsafe and pays pool startup every time; generating here also keeps the
+        # process-wide SourceStore / RenderCache warm across requests.
         try:
-            md_gen_cmd = [
-                "python", "src/document_generator/md_generator.py",
-                "-i", index_file_path,
-                "-o", self.output_dir,
-                "-k", os.path.join(self.base_dir,
-                                   "knowledge_base", "sth-matters"),
-                "-l", "all"
-            ]
-            epub_gen_cmd = [
-                "python", "src/document_generator/epub_cli.py",
-                "-i", index_file_path,
-                "-o", self.output_dir,
-                "-k", os.path.join(self.base_dir,
-                                   "knowledge_base", "sth-matters")
-            ]
-
-            self.logger.debug(f"执行MD生成命令: {' '.join(md_gen_cmd)}")
-            subprocess.run(md_gen_cmd, check=True,
-                           capture_output=True, text=True, encoding='utf-8')
-
-            self.logger.debug(f"执行EPUB生成命令: {' '.join(epub_gen_cmd)}")
-            subprocess.run(epub_gen_cmd, check=True,
-                           capture_output=True, text=True, encoding='utf-8')
-
-        except subprocess.CalledProcessError as e:
-            error_message = f"文档生成脚本执行失败: {e.stderr}"
+            found_files = run_document_generators(
+                index_path=index_file_path,
+                kb_dir=os.path.join(self.base_dir,
+                                    "knowledge_base", "sth-matters"),
+                output_dir=job_dir,
+                index_data=search_result.get("index_data"),
+                workers=1,
+                job_id=job_id,
+            )
+        except Exception as e:
+            error_message = f"文档生成失败: {e}"
             duration = time.time() - start_time
             self.logger.error(
                 f"快速搜索文档生成失败: 主题='{topic.strip()}', 错误='{error_message}', 耗时={duration:.2f}秒")
@@ -212,21 +236,6 @@ class KnowledgeSearchInterface:
 
         progress(0.7, desc="[快速搜索] 文档生成完成，准备发送邮件...")
 
-        # Step 3: Find generated files
-        time.sleep(1)  # Allow a moment for files to be fully written
-        file_patterns = {
-            'md': f"*{topic}*_source_based_文档.md",
-            'html': f"*{topic}*_html_文档.html",
-            'epub': f"*{topic}*.epub"
-        }
-        found_files = {}
-        for file_type, pattern in file_patterns.items():
-            # Search in output dir, get the latest one
-            files = sorted(glob.glob(os.path.join(
-                self.output_dir, pattern)), key=os.path.getmtime, reverse=True)
-            if files:
-                found_files[file_type] = files[0]
-
         if not found_files:
             duration = time.time() - start_time
             self.logger.warning(
@@ -236,7 +245,7 @@ class KnowledgeSearchInterface:
             return "⚠️ [快速搜索] 完成但未找到生成的文档文件"
 
         progress(0.8, desc="[快速搜索] 正在发送邮件...")
-        report = self._send_email_and_get_report(topic, email, found_files)
+        report = self._send_email_and_get_report(topic, email, found_files, job_id)
         progress(1.0, desc="[快速搜索] 完成！")
 
         # 记录搜索完成
@@ -300,12 +309,22 @@ class KnowledgeSearchInterface:
                     result_output = gr.Markdown(
                         value="💡 请输入主题和邮箱，然后点击开始按钮...", label="执行结果")
 
+                with gr.TabItem("📄 其他版式"):
+                    with gr.Row():
+                        job_id_input = gr.Textbox(
+                            label="🗂 任务ID", placeholder="搜索结果中给出的任务ID")
+                        layout_input = gr.Dropdown(
+                            list(ALL_LAYOUTS) + ["epub"], label="📑 版式", value="thematic")
+                    layout_btn = gr.Button("📥 生成并下载", variant="primary")
+                    layout_file = gr.File(label="文档")
+                    layout_status = gr.Markdown()
+
                 with gr.TabItem("📖 使用说明"):
                     gr.Markdown("""
                     ### 系统功能
                     1. **深度搜索**：AI代理驱动，对知识库进行多角度的深入分析、扩展和总结。
                     2. **快速搜索**：基于关键词直接匹配知识库中的文章，速度快，适合精确查找。
-                    3. **文档生成**：自动生成EPUB、Markdown、HTML等多种格式。
+                    3. **文档生成**：自动生成EPUB、Markdown、HTML；其他版式可凭任务ID在“其他版式”页按需生成。
                     4. **邮件发送**：将生成结果直接发送到指定邮箱。
                     """)
 
@@ -315,6 +334,11 @@ class KnowledgeSearchInterface:
                 outputs=[result_output],
                 show_progress=True
             )
+            layout_btn.click(
+                fn=self.get_layout,
+                inputs=[job_id_input, layout_input],
+                outputs=[layout_file, layout_status],
+            )
 
             gr.Examples(
                 examples=[
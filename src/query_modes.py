@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Query Modes: how a quick-search topic is parsed and matched.
+
+- ``literal``: the topic is a plain string, matched case-insensitively with
+  ``str.count`` on a casefolded shadow of the text (or on the text itself
+  when the topic has no cased characters, e.g. pure CJK).
+- ``regex``: the topic is a regular expression, compiled once per process;
+  scans run in a child process that is killed when a file exceeds the time
+  budget (``re`` cannot be interrupted mid-match).
+- ``boolean``: ``a b`` requires both terms, ``-a`` (or ``NOT a``) excludes a
+  term and ``|`` (or ``OR``) separates alternatives, e.g.
+  ``社会化 教育 -学校 | 家庭教育``. Terms are literals; quote phrases
+  containing spaces.
+- ``keywords``: a list of literals matched at once with Aho-Corasick.
+- ``semantic``: documents are picked by the TF-IDF/LSA index (see
+  semantic_index); matching only locates the query's tokens for snippets.
+
+``auto`` keeps the historical behaviour: ``a | b`` of literals is a keyword
+list, a topic without regex metacharacters is a literal and anything else a
+regex.
+"""
+
+import multiprocessing
+import re
+import shlex
+from functools import lru_cache
+from typing import (Callable, Dict, Iterator, List, NamedTuple, Optional, Pattern, Sequence,
+                    Tuple, TypeVar)
+
+from aho_corasick import AhoCorasick
+from kb_index import is_literal_query, tokenize
+
+QUERY_MODES = ("auto", "literal", "regex", "boolean", "semantic")
+
+# Seconds a regex may spend on one file before the search is aborted
+REGEX_TIME_BUDGET = 2.0
+
+# Match spans kept per file, enough to pick snippets from
+MAX_SPANS = 256
+
+# (required terms, excluded terms) for each `|` alternative
+BooleanGroups = Tuple[Tuple[Tuple[str, ...], Tuple[str, ...]], ...]
+# (start, end) character offsets of a match
+Span = Tuple[int, int]
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class RegexTimeout(Exception):
+    """A regex query exceeded its per-file time budget."""
+
+
+def map_with_budget(func: Callable[[T], R], items: Sequence[T], budget: float) -> Iterator[R]:
+    """Yield func(item) for each item, computed in a child process.
+
+    A catastrophic regex such as ``(a+)+$`` backtracks inside a single ``re``
+    call, which never returns control to Python, so the per-item budget is
+    enforced by waiting on the child and terminating it when it overruns.
+    The child receives the whole batch when it starts (e.g. the paths of the
+    files to scan, which it reads itself) and streams back one small result
+    per item, so file bodies never cross the pipe. Every call has its own
+    child, so concurrent searches never share one.
+    """
+    if not items:
+        return
+    ctx = multiprocessing.get_context()
+    conn, child_conn = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_budget_worker, args=(child_conn, func, items), daemon=True)
+    process.start()
+    child_conn.close()
+    try:
+        for item in items:
+            if not conn.poll(max(budget, 0)):
+                raise RegexTimeout(f"regex timed out after {budget}s on {item}")
+            try:
+                yield conn.recv()
+            except EOFError:
+                raise RuntimeError(f"regex worker exited while scanning {item}")
+    finally:
+        process.terminate()
+        process.join()
+        conn.close()
+
+
+def _budget_worker(conn, func: Callable, items: Sequence) -> None:
+    """Child process of map_with_budget."""
+    for item in items:
+        conn.send(func(item))
+    conn.close()
+
+
+class Hits(NamedTuple):
+    """What a matcher found in one text: {term: occurrences} and the
+    spans of (at most MAX_SPANS of) the matches."""
+    counts: Dict[str, int]
+    spans: List[Span]
+
+
+# Returns the Hits for a matching text, or None; spans=False skips locating
+# the matches (the span list is then empty) when only counts are needed
+Matcher = Callable[..., Optional[Hits]]
+
+
+class Query(NamedTuple):
+    """A parsed quick-search query.
+
+    ``mode`` is the resolved mode (never ``auto``); ``terms`` are the literal
+    terms used for index lookups and ranking (the topic itself for literal
+    and regex queries).
+    """
+    mode: str
+    topic: str
+    terms: Tuple[str, ...]
+    groups: BooleanGroups = ()
+
+
+def parse_keywords(topic: str) -> Optional[List[str]]:
+    """
+    Splits a `|`-separated topic such as "关键词1 | 关键词2" into keywords.
+
+    Returns None unless there are at least two parts and every part is a
+    literal, so that genuine regex alternations keep their regex meaning.
+    """
+    if '|' not in topic:
+        return None
+    keywords = [part.strip() for part in topic.split('|') if part.strip()]
+    if len(keywords) < 2 or not all(is_literal_query(k) for k in keywords):
+        return None
+    return keywords
+
+
+def parse_boolean(topic: str) -> BooleanGroups:
+    """Parse a boolean topic into (required, excluded) term groups."""
+    try:
+        tokens = shlex.split(topic.replace('|', ' | '))
+    except ValueError:
+        # Unbalanced quotes: fall back to plain whitespace splitting
+        tokens = topic.replace('|', ' | ').split()
+
+    groups = []
+    required: List[str] = []
+    excluded: List[str] = []
+    negate_next = False
+    for token in tokens + ['|']:
+        if token in ('|', 'OR'):
+            if required or excluded:
+                groups.append((tuple(required), tuple(excluded)))
+            required, excluded, negate_next = [], [], False
+        elif token == 'AND':
+            continue
+        elif token == 'NOT':
+            negate_next = True
+        elif token.startswith('-') and len(token) > 1:
+            excluded.append(token[1:])
+        elif negate_next:
+            excluded.append(token)
+            negate_next = False
+        else:
+            required.append(token)
+    return tuple(groups)
+
+
+def parse_query(topic: str, mode: str = "auto",
+                keywords: Optional[List[str]] = None) -> Query:
+    """Resolve a topic (and optional keyword list) into a Query."""
+    if mode not in QUERY_MODES:
+        raise ValueError(f"Unknown query mode '{mode}', expected one of {', '.join(QUERY_MODES)}")
+    if keywords:
+        return Query("keywords", topic, tuple(dict.fromkeys(keywords)))
+    if mode == "auto":
+        keywords = parse_keywords(topic)
+        if keywords:
+            return Query("keywords", topic, tuple(dict.fromkeys(keywords)))
+        mode = "literal" if is_literal_query(topic) else "regex"
+    if mode == "boolean":
+        groups = parse_boolean(topic)
+        terms = tuple(dict.fromkeys(t for required, _ in groups for t in required))
+        return Query("boolean", topic, terms, groups)
+    if mode == "semantic":
+        return Query("semantic", topic, tuple(dict.fromkeys(tokenize(topic))))
+    if mode == "regex":
+        try:
+            compile_topic(topic)
+        except re.error as e:
+            raise ValueError(f"Invalid regex '{topic}': {e}")
+        return Query(mode, topic, (topic,))
+    # Surrounding whitespace is never part of a literal term
+    return Query(mode, topic, (topic.strip(),))
+
+
+def cache_form(query: Query) -> list:
+    """The parts of a query that decide its results, for result-cache keys.
+
+    Literal terms are casefolded exactly as the matcher folds them (no NFKC,
+    so "ＡＩ" and "AI" stay apart). Boolean queries are keyed by their parsed
+    groups, so "a OR b" and "a or b" keep their different meanings; their
+    terms, like keyword lists, stay as typed because cached records name
+    them. Regex and semantic topics are used verbatim.
+    """
+    if query.mode == "literal":
+        return [query.mode, [term.casefold() for term in query.terms]]
+    if query.mode == "boolean":
+        return [query.mode, [[list(required), list(excluded)] for required, excluded in query.groups]]
+    if query.mode == "keywords":
+        return [query.mode, list(query.terms)]
+    return [query.mode, query.topic]
+
+
+@lru_cache(maxsize=32)
+def compile_topic(topic: str) -> Pattern[str]:
+    """Compile a regex topic once per process."""
+    return re.compile(topic, re.IGNORECASE)
+
+
+def _has_case(text: str) -> bool:
+    return text.casefold() != text or text.upper() != text
+
+
+def _find_spans(haystack: str, needle: str, limit: int) -> List[Span]:
+    """Return the (start, end) offsets of the first `limit` occurrences."""
+    spans = []
+    pos = haystack.find(needle)
+    while pos != -1 and len(spans) < limit:
+        spans.append((pos, pos + len(needle)))
+        pos = haystack.find(needle, pos + len(needle))
+    return spans
+
+
+def _literal_finder(terms: Tuple[str, ...]) -> Callable[[str], Tuple[Dict[str, int], Dict[str, List[Span]]]]:
+    """Count and locate each literal term, casefolding the text at most once.
+
+    Offsets refer to the casefolded shadow, which has the same length as the
+    text for all but a handful of special characters (e.g. "ß").
+    """
+    folded = [(term, term.casefold(), _has_case(term)) for term in terms]
+    need_shadow = any(cased for _, _, cased in folded)
+
+    def find(content: str, with_spans: bool = True) -> Tuple[Dict[str, int], Dict[str, List[Span]]]:
+        shadow = content.casefold() if need_shadow else content
+        counts, spans = {}, {}
+        for term, needle, cased in folded:
+            haystack = shadow if cased else content
+            n = haystack.count(needle) if needle else 0
+            if n:
+                counts[term] = n
+                spans[term] = _find_spans(haystack, needle, MAX_SPANS) if with_spans else []
+        return counts, spans
+    return find
+
+
+def regex_scan(pattern: Pattern[str], content: str, max_spans: int = MAX_SPANS) -> Tuple[int, List[Span]]:
+    """Count matches of pattern in content.
+
+    Returns the match count and the spans of the first max_spans matches.
+    The whole text is scanned in one pass so anchors and matches keep their
+    meaning; run it through map_with_budget to bound its time.
+    """
+    total = 0
+    spans: List[Span] = []
+    for match in pattern.finditer(content):
+        total += 1
+        if len(spans) < max_spans:
+            spans.append((match.start(), match.end()))
+    return total, spans
+
+
+@lru_cache(maxsize=8)
+def get_matcher(query: Query) -> Matcher:
+    """Build the matcher for a query once per process (and once per worker).
+
+    Matchers hold no mutable state, so threads may share them. The regex
+    matcher runs in-process; callers bound its time with map_with_budget.
+    """
+    if query.mode == "keywords":
+        automaton = AhoCorasick(query.terms)
+        lengths = {k: len(k) for k in automaton.keywords}
+
+        def match(content: str, spans: bool = True) -> Optional[Hits]:
+            max_spans = MAX_SPANS if spans else 0
+            hits: Dict[str, int] = {}
+            found: List[Span] = []
+            for start, keyword in automaton.iter_matches(content):
+                hits[keyword] = hits.get(keyword, 0) + 1
+                if len(found) < max_spans:
+                    found.append((start, start + lengths[keyword]))
+            if not hits:
+                return None
+            # Keep the caller's keyword order
+            return Hits({k: hits[k] for k in automaton.keywords if k in hits}, found)
+        return match
+
+    if query.mode == "regex":
+        pattern = compile_topic(query.topic)
+
+        def match(content: str, spans: bool = True) -> Optional[Hits]:
+            n, found = regex_scan(pattern, content, MAX_SPANS if spans else 0)
+            return Hits({query.topic: n}, found) if n else None
+        return match
+
+    if query.mode == "boolean":
+        all_terms = tuple(dict.fromkeys(
+            t for required, excluded in query.groups for t in required + excluded))
+        finder = _literal_finder(all_terms)
+
+        def match(content: str, spans: bool = True) -> Optional[Hits]:
+            counts, term_spans = finder(content, spans)
+            matched = [required for required, excluded in query.groups
+                       if all(t in counts for t in required)
+                       and not any(t in counts for t in excluded)]
+            if not matched:
+                return None
+            hit_terms = {t for required in matched for t in required}
+            # Only negative terms matched: still a hit, with no term counts
+            terms = [t for t in query.terms if t in hit_terms]
+            return Hits({t: counts[t] for t in terms},
+                        sorted(span for t in terms for span in term_spans[t])[:MAX_SPANS])
+        return match
+
+    finder = _literal_finder(query.terms)
+
+    if query.mode == "semantic":
+        def match(content: str, spans: bool = True) -> Optional[Hits]:
+            # Every document handed over by the vector index is a hit
+            counts, term_spans = finder(content, spans)
+            return Hits(counts, sorted(span for spans in term_spans.values() for span in spans))
+        return match
+
+    def match(content: str, spans: bool = True) -> Optional[Hits]:
+        counts, term_spans = finder(content, spans)
+        if not counts:
+            return None
+        return Hits(counts, [span for spans in term_spans.values() for span in spans])
+    return match
@@ -6,10 +6,40 @@ Quick Search: A local, keyword-based search implementation.
 
 import os
 import json
-import glob
 import re
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any
+from functools import partial
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+import numpy as np
+
+from chunker import ChunkTable, best_chunks, document_chunks
+from dedup import SignatureStore, category_of, collapse_duplicates
+from kb_index import (
+    InvertedIndex,
+    build_index,
+    content_hash,
+    current_kb_version,
+    default_index_dir,
+    iter_kb_files,
+    stale_paths,
+    update_index,
+)
+from kb_pack import KBPack, literal_bytes_pattern
+from query_modes import (QUERY_MODES, REGEX_TIME_BUDGET, Query, RegexTimeout, cache_form,
+                         get_matcher, map_with_budget, parse_query)
+from ranking import bm25_scores, top_k_indices
+from semantic_index import DEFAULT_MAX_FEATURES, DEFAULT_SVD_DIM, SemanticIndex, build_semantic_index
+from result_cache import CACHE_DIRNAME, QueryCache, make_cache_key
+from snippets import DEFAULT_SNIPPET_WINDOW, build_snippets
+from tag_taxonomy import TagTaxonomy, normalize_tag
+
+# Default number of ranked sources kept in the index JSON
+DEFAULT_TOP_K = 50
+# Related index terms listed in the metadata of semantic searches
+RELATED_TERMS = 20
 
 def _extract_title(content: str, file_path: str) -> str:
     """Extracts the H1 title from markdown content, or defaults to the filename."""
@@ -22,78 +52,179 @@ def _extract_zhihu_links(content: str) -> List[str]:
     """Extracts all zhihu zhuanlan links from the content."""
     return re.findall(r'(https://zhuanlan.zhihu.com/p/\w+)', content)
 
-def perform_quick_search(topic: str, base_dir: str) -> Dict[str, Any]:
+def perform_quick_search(topic: str, base_dir: str, workers: int = 1,
+                         keywords: Optional[List[str]] = None,
+                         top_k: Optional[int] = DEFAULT_TOP_K,
+                         slim: bool = False, use_cache: bool = True,
+                         mode: str = "auto",
+                         snippet_window: int = DEFAULT_SNIPPET_WINDOW,
+                         tag_scope: Optional[str] = None,
+                         dedup: bool = True,
+                         output_dir: Optional[str] = None) -> Dict[str, Any]:
     """
     Performs a quick, keyword-based search through the knowledge base.
 
     Args:
-        topic: The keyword to search for.
+        topic: The keyword to search for, interpreted according to `mode`.
         base_dir: The project's root directory.
+        workers: Number of worker processes for the scan. 1 scans serially in
+            this process; 0 uses one worker per CPU core.
+        keywords: Keywords to match all at once with an Aho-Corasick automaton.
+            A file matches if any keyword occurs; each result records which
+            keywords hit and how often. `topic` is then only used as a label.
+        top_k: Keep only the k best sources by BM25 score (None keeps all).
+            Sources are written in rank order and carry their `score` and `rank`.
+        slim: Write a slim index: sources carry the file path and a
+            `content_hash` instead of `full_content`, and the generators read
+            bodies lazily from the knowledge base. The JSON is written compactly.
+        use_cache: Reuse the ranked results of an identical earlier query
+            against the same KB manifest version (requires a built index).
+        mode: How to interpret the topic: 'literal', 'regex', 'boolean'
+            (`a b -c | d`), 'semantic' (rank documents by TF-IDF/LSA
+            similarity, requires build-semantic), or 'auto' (default), which
+            matches a `|`-separated list of literals as keywords, a topic
+            without regex metacharacters as a literal and anything else as a
+            regex.
+        snippet_window: Characters of context on each side of a match in the
+            KWIC snippets that make up each source's `snippets` and
+            `content_preview`.
+        tag_scope: Only search documents tagged with this tag path or one
+            below it, e.g. '#2A-功夫/1-核心能力' (requires a built index).
+            The index metadata then lists the tag's ancestors, siblings and
+            children for vertical and horizontal scans.
+        dedup: Collapse mirrored copies of an article (same content hash,
+            or near-duplicates by MinHash when the index has signatures)
+            into the best-ranked one, which lists the others in
+            `alternate_paths` and all their top-level directories in
+            `categories`. Applied before the top_k cut.
+        output_dir: Directory the index file is written to (default:
+            base_dir/output). Pass a per-job directory so concurrent
+            searches on the same topic do not overwrite each other's index.
 
     Returns:
         A dictionary containing the search result status and the path to the index file.
     """
     knowledge_base_dir = os.path.join(base_dir, "knowledge_base", "sth-matters")
-    output_dir = os.path.join(base_dir, "output")
+    output_dir = output_dir or os.path.join(base_dir, "output")
     os.makedirs(output_dir, exist_ok=True)
 
     if not os.path.isdir(knowledge_base_dir):
         return {"success": False, "error": "Knowledge base directory not found."}
 
-    print(f"Starting quick search for topic: '{topic}' in '{knowledge_base_dir}'")
-
-    # Define exclusion list
-    def should_exclude_file(file_path, knowledge_base_dir):
-        """Check if file should be excluded from search"""
-        # Get relative path from knowledge base
-        rel_path = os.path.relpath(file_path, knowledge_base_dir)
+    try:
+        query = parse_query(topic, mode, keywords)
+    except ValueError as e:
+        return {"success": False, "error": str(e)}
+    print(f"Starting quick search for topic: '{topic}' ({query.mode} mode) in '{knowledge_base_dir}'")
 
-        # Exclude files and directories starting with .
-        path_parts = rel_path.split(os.sep)
-        for part in path_parts:
-            if part.startswith('.'):
-                return True
+    taxonomy = TagTaxonomy.load(default_index_dir(knowledge_base_dir))
+    scope = None
+    if tag_scope:
+        if taxonomy is None or tag_scope not in taxonomy:
+            return {"success": False,
+                    "error": f"Tag '{tag_scope}' not found in the tag taxonomy (run build-index first)."}
+        tag_scope = normalize_tag(tag_scope)
+        scope = taxonomy.docs_under(tag_scope)
+        print(f"Tag scope {tag_scope}: {len(scope)} document(s)")
 
-        # Exclude specific README.md file in root of knowledge base
-        if rel_path == "README.md":
-            return True
+    semantic = None
+    if query.mode == "semantic":
+        semantic = SemanticIndex.load(default_index_dir(knowledge_base_dir))
+        if semantic is None:
+            return {"success": False, "error": "Semantic index not found (run build-semantic first)."}
 
-        return False
+    # Files edited since the last build/update-index are scanned directly and
+    # bypass the result cache, which is versioned by the manifest
+    stale = stale_paths(knowledge_base_dir, default_index_dir(knowledge_base_dir))
+    if stale is not None and (stale[0] or stale[1]):
+        print(f"Search index is out of date ({len(stale[0])} new or modified, "
+              f"{len(stale[1])} deleted file(s)); run update-index")
+        use_cache = False
 
-    search_results = []
-    # Using glob to recursively find all markdown files
-    for file_path in glob.glob(os.path.join(knowledge_base_dir, '**', '*.md'), recursive=True):
-        # Skip excluded files
-        if should_exclude_file(file_path, knowledge_base_dir):
-            continue
+    cache, cache_key = (_result_cache(query, knowledge_base_dir, top_k, snippet_window,
+                                      tag_scope, dedup, semantic.version if semantic else None)
+                        if use_cache else (None, None))
+    cached = cache.get(cache_key) if cache is not None else None
+    if cached is not None:
+        print(f"Query cache hit: {len(cached['records'])} result(s)")
+        records = [dict(record) for record in cached["records"]]
+        total_matches = cached["total_matches"]
+        collapsed = cached.get("collapsed", 0)
+    else:
+        if semantic is not None:
+            similar = _semantic_targets(semantic, topic, top_k, scope, dedup)
+            rel_paths, total_docs = [path for path, _ in similar], len(semantic.docs)
+        else:
+            rel_paths, total_docs = _scan_targets(query, knowledge_base_dir, scope, stale)
+        workers = workers or os.cpu_count() or 1
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Case-insensitive search
-            if re.search(topic, content, re.IGNORECASE):
-                print(f"Found match in: {file_path}")
-                title = _extract_title(content, file_path)
-                word_count = len(content)
-                zhihu_links = _extract_zhihu_links(content)
-
-                source_item = {
-                    "id": len(search_results) + 1,
-                    "title": title,
-                    "file_path": os.path.relpath(file_path, knowledge_base_dir),
-                    "zhihu_link": zhihu_links[0] if zhihu_links else "", # Taking the first link
-                    "category": "Quick Search Result",
-                    "tags": [topic],
-                    "content_preview": content[:200] + "...",
-                    "word_count": word_count,
-                    "key_concepts": [topic],
-                    "full_content": content # Add full content for the generator
-                }
-                search_results.append(source_item)
+            if workers > 1 and len(rel_paths) > 1:
+                records = _parallel_scan(query, knowledge_base_dir, rel_paths, workers, dedup)
+            else:
+                records = _scan_files(query, knowledge_base_dir, rel_paths, hash_content=dedup)
+        except RegexTimeout as e:
+            print(f"Search aborted: {e}")
+            return {"success": False, "error": str(e)}
 
-        except Exception as e:
-            print(f"Error processing file {file_path}: {e}")
-            continue
+        total_matches = len(records)
+        collapsed = 0
+        if semantic is not None:
+            # Already in similarity order
+            similarity = dict(similar)
+            for record in records:
+                record["score"] = round(similarity[record["file_path"]], 4)
+            ranked = records
+        else:
+            # With dedup, rank everything and collapse mirrors so top_k holds distinct articles
+            ranked = _rank_records(records, list(query.terms), total_docs, None if dedup else top_k)
+        if dedup:
+            deduped = _collapse_mirrors(ranked, knowledge_base_dir)
+            collapsed = len(ranked) - len(deduped)
+            records = deduped[:top_k]
+        else:
+            records = ranked[:top_k]
+        records = _describe_records(query, knowledge_base_dir, records, keep_content=not slim,
+                                    snippet_window=snippet_window)
+        if cache is not None:
+            cache.put(cache_key, [{k: v for k, v in record.items() if k != "full_content"}
+                                  for record in records],
+                      total_matches=total_matches, collapsed=collapsed)
+
+    search_results = []
+    for record in records:
+        content = record.pop("full_content", None)
+        if content is None and not slim:
+            content = _read_body(knowledge_base_dir, record["file_path"])
+            if content is None:
+                continue
+        print(f"Found match in: {os.path.join(knowledge_base_dir, record['file_path'])}")
+        multi_term = query.mode in ("keywords", "boolean")
+        matched_terms = list(record["term_hits"]) if multi_term else [topic]
+        source_item = {
+            "id": len(search_results) + 1,
+            "title": record["title"],
+            "file_path": record["file_path"],
+            "zhihu_link": record["zhihu_link"], # Taking the first link
+            "category": "Quick Search Result",
+            # The document's own tag paths when it has any
+            "tags": (taxonomy.tags_of(record["file_path"]) if taxonomy else None) or matched_terms,
+            "content_preview": record["content_preview"],
+            "snippets": record["snippets"],
+            "best_chunks": record["best_chunks"],
+            "word_count": record["word_count"],
+            "key_concepts": matched_terms,
+        }
+        if multi_term:
+            source_item["keyword_hits"] = record["term_hits"]
+        if "alternate_paths" in record:
+            source_item["alternate_paths"] = record["alternate_paths"]
+            source_item["categories"] = record["categories"]
+        source_item["score"] = record["score"]
+        source_item["rank"] = len(search_results) + 1
+        source_item["content_hash"] = record["content_hash"]
+        if not slim:
+            source_item["full_content"] = content # Add full content for the generator
+        search_results.append(source_item)
 
     if not search_results:
         return {"success": True, "index_file_path": None, "message": "No results found."}
@@ -104,36 +235,517 @@ def perform_quick_search(topic: str, base_dir: str) -> Dict[str, Any]:
             "topic": topic,
             "search_date": datetime.now().strftime('%Y-%m-%d'),
             "total_sources": len(search_results),
+            "total_matches": total_matches,
+            "duplicates_collapsed": collapsed,
+            "query_mode": query.mode,
+            "ranking": "bm25",
+            "top_k": top_k,
+            "index_format": "slim" if slim else "full",
             "description": f"Quick search results for '{topic}'"
         },
         "sources": search_results,
         "relationships": {} # Keep empty for compatibility
     }
+    if semantic is not None:
+        final_index["metadata"]["related_terms"] = semantic.related_terms(topic, RELATED_TERMS)
+    if tag_scope:
+        final_index["metadata"]["tag_scope"] = {
+            "tag": tag_scope,
+            "ancestors": taxonomy.ancestors(tag_scope),
+            "siblings": taxonomy.siblings(tag_scope),
+            "children": taxonomy.children(tag_scope),
+        }
 
     # Save the index file
-    index_filename = f"{topic.replace(' ', '_')}_quick_search_索引.json"
+    safe_topic = re.sub(r'[\\/:*?"<>|]', '_', topic.replace(' ', '_'))
+    index_filename = f"{safe_topic}_quick_search_索引.json"
     index_file_path = os.path.join(output_dir, index_filename)
     
     try:
         with open(index_file_path, 'w', encoding='utf-8') as f:
-            json.dump(final_index, f, ensure_ascii=False, indent=2)
+            if slim:
+                json.dump(final_index, f, ensure_ascii=False, separators=(',', ':'))
+            else:
+                json.dump(final_index, f, ensure_ascii=False, indent=2)
         print(f"Quick search index file created: {index_file_path}")
-        return {"success": True, "index_file_path": index_file_path}
+        return {"success": True, "index_file_path": index_file_path, "index_data": final_index}
     except Exception as e:
         print(f"Error writing index file: {e}")
         return {"success": False, "error": f"Failed to write index file: {e}"}
 
-if __name__ == '__main__':
-    # For testing purposes
-    test_topic = "社会化"
-    # Assuming the script is in src/, so base_dir is one level up
-    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-    result = perform_quick_search(test_topic, project_root)
-    print("\n--- Test Result ---")
+def _result_cache(query: Query, knowledge_base_dir: str, top_k: Optional[int],
+                  snippet_window: int, tag_scope: Optional[str] = None,
+                  dedup: bool = True, semantic_version: Optional[str] = None) -> Tuple[Optional[QueryCache], Optional[str]]:
+    """
+    Returns the query cache and the key for this query, or (None, None) when
+    there is no KB manifest to version the cached results against.
+    """
+    index_dir = default_index_dir(knowledge_base_dir)
+    kb_version = current_kb_version(index_dir)
+    if kb_version is None:
+        return None, None
+    options = {"top_k": top_k, "snippet_window": snippet_window,
+               "tag_scope": tag_scope, "dedup": dedup}
+    if semantic_version:
+        # The vector index is rebuilt separately from the manifest
+        options["semantic_version"] = semantic_version
+    cache = QueryCache.for_dir(os.path.join(index_dir, CACHE_DIRNAME))
+    return cache, make_cache_key(cache_form(query), options, kb_version)
+
+
+def _candidate_files(term: str, index: Optional[InvertedIndex]) -> Optional[set]:
+    """
+    Returns the relative paths that may contain a literal term, or None if
+    every file may (no index, or the term yields no index tokens).
+    """
+    if index is None:
+        return None
+    rel_paths = index.candidates(term)
+    return set(rel_paths) if rel_paths is not None else None
+
+
+def _index_candidates(query: Query, index: Optional[InvertedIndex]) -> Optional[set]:
+    """
+    Answers a query from the inverted index: the union over keywords, the
+    union over boolean alternatives of the intersection of their required
+    terms, or the candidates of a literal topic. Returns None when the index
+    cannot narrow the search (regex queries, a missing index, or an
+    alternative with only excluded terms).
+    """
+    if query.mode == "regex" or index is None:
+        return None
+    if query.mode == "boolean":
+        union = set()
+        for required, _ in query.groups:
+            group = None
+            for term in required:
+                candidates = _candidate_files(term, index)
+                if candidates is not None:
+                    group = candidates if group is None else group & candidates
+            if group is None:
+                return None
+            union |= group
+        return union
+
+    union = set()
+    for term in query.terms:
+        candidates = _candidate_files(term, index)
+        if candidates is None:
+            return None
+        union |= candidates
+    return union
+
+
+def _scan_targets(query: Query, knowledge_base_dir: str,
+                  scope: Optional[Iterable[str]] = None,
+                  stale: Optional[Tuple[List[str], List[str]]] = None) -> Tuple[List[str], int]:
+    """
+    Returns the relative paths that have to be opened and matched, in a stable
+    order, together with the number of documents in the knowledge base.
+    `scope` (e.g. the documents under a tag) limits the paths returned.
+
+    Uses the inverted index for literal, keyword and boolean queries;
+    otherwise, with a KB pack, a literal topic is pre-filtered by a single
+    scan over the whole pack buffer. `stale` is the (modified, deleted)
+    result of `stale_paths`: modified files are always scanned and deleted
+    ones dropped, since neither the index nor the pack knows about them.
+    """
+    index = InvertedIndex.load(default_index_dir(knowledge_base_dir))
+    total_docs = index.document_count if index is not None else 0
+    modified, deleted = stale or ([], [])
+
+    candidates = _index_candidates(query, index)
+    if candidates is not None:
+        print(f"Index lookup: {len(candidates)} candidate(s) out of {index.document_count} files")
+        candidates = (candidates - set(deleted)) | set(modified)
+        if scope is not None:
+            candidates &= set(scope)
+        return sorted(candidates), total_docs
+    if scope is not None:
+        return sorted(scope), total_docs
+
+    pack = KBPack.for_kb_dir(knowledge_base_dir)
+    if pack is None:
+        rel_paths = [os.path.relpath(p, knowledge_base_dir) for p in iter_kb_files(knowledge_base_dir)]
+        return rel_paths, total_docs or len(rel_paths)
+
+    pattern = literal_bytes_pattern(query.terms[0]) if query.mode == "literal" else None
+    rel_paths = pack.search(pattern) if pattern is not None else pack.paths()
+    if modified or deleted:
+        rel_paths = sorted((set(rel_paths) - set(deleted)) | set(modified))
+    return rel_paths, total_docs or len(pack)
+
+
+def _semantic_targets(semantic: SemanticIndex, topic: str, top_k: Optional[int],
+                      scope: Optional[Iterable[str]], dedup: bool) -> List[Tuple[str, float]]:
+    """
+    Returns the (relative path, similarity) pairs worth opening for a semantic
+    query, most similar first. With dedup, twice top_k are kept so collapsed
+    mirrors can be replaced.
+    """
+    similar = semantic.similar(topic, None)
+    if scope is not None:
+        scope = set(scope)
+        similar = [(path, score) for path, score in similar if path in scope]
+    if top_k is not None:
+        similar = similar[:top_k * 2 if dedup else top_k]
+    print(f"Semantic index: {len(similar)} similar document(s) out of {len(semantic.docs)}")
+    return similar
+
+
+def _rank_records(records: List[Dict[str, Any]], terms: List[str], total_docs: int,
+                  top_k: Optional[int]) -> List[Dict[str, Any]]:
+    """
+    Scores match records with BM25 and returns the top_k of them, best first.
+
+    Query terms are the keywords (or the topic itself); term frequencies are
+    the per-file hit counts recorded by the scan and document lengths are
+    character counts. Every file containing a term is among the matches, so
+    document frequencies are counted over the matches.
+    """
+    if not records:
+        return records
+    term_freqs = np.array([[record["term_hits"].get(term, 0) for term in terms]
+                           for record in records], dtype=np.float64).reshape(len(records), len(terms))
+    doc_lengths = np.array([record["word_count"] for record in records], dtype=np.float64)
+    doc_freqs = np.count_nonzero(term_freqs, axis=0)
+
+    scores = bm25_scores(term_freqs, doc_lengths, doc_freqs, max(total_docs, len(records)))
+    ranked = []
+    for i in top_k_indices(scores, top_k):
+        record = records[i]
+        record["score"] = round(float(scores[i]), 4)
+        ranked.append(record)
+    return ranked
+
+
+def _collapse_mirrors(records: List[Dict[str, Any]], knowledge_base_dir: str) -> List[Dict[str, Any]]:
+    """
+    Collapses ranked match records of the same article into the best-ranked one.
+
+    Exact mirrors share a content hash; near-duplicates are matched with the
+    MinHash signatures computed at index time (exact matching only without
+    an index).
+    """
+    store = SignatureStore.load(default_index_dir(knowledge_base_dir))
+    deduped = collapse_duplicates(
+        records,
+        hash_of=lambda record: record["content_hash"],
+        signature_of=lambda record: store.get(record["file_path"]) if store else None,
+        path_of=lambda record: record["file_path"],
+        categories_of=lambda record: [category_of(record["file_path"])],
+    )
+    if len(deduped) < len(records):
+        print(f"Collapsed {len(records) - len(deduped)} mirrored result(s)")
+    return deduped
+
+
+def _read_body(knowledge_base_dir: str, rel_path: str) -> Optional[str]:
+    """
+    Returns the content of a knowledge base file, from the KB pack when the
+    packed body still matches the file's size and mtime. Edited files are
+    read from disk and deleted ones yield None.
+    """
+    file_path = os.path.join(knowledge_base_dir, rel_path)
+    try:
+        stat = os.stat(file_path)
+    except OSError as e:
+        print(f"Error processing file {file_path}: {e}")
+        return None
+
+    pack = KBPack.for_kb_dir(knowledge_base_dir)
+    if pack is not None and pack.is_fresh(rel_path, stat):
+        return pack.read_text(rel_path)
+
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except Exception as e:
+        print(f"Error processing file {file_path}: {e}")
+        return None
+
+
+def _scan_files(query: Query, knowledge_base_dir: str, rel_paths: List[str],
+                hash_content: bool = True) -> List[Dict[str, Any]]:
+    """
+    Matches the query against each file and returns light match records.
+
+    A record carries file_path, word_count and term_hits ({term: count}),
+    which is all ranking needs, plus content_hash when hash_content is set
+    (for collapsing mirrors). Snippets, chunks and titles are only worked
+    out for the results that survive ranking (see _describe_records).
+    Regex queries are scanned in a child process under a per-file time
+    budget and keep their match spans, so the regex need not run again.
+    Runs in worker processes in parallel mode, so it must stay a picklable
+    module-level function.
+    """
+    if query.mode == "regex":
+        scan = partial(_scan_file, query, knowledge_base_dir, hash_content, True)
+        results = map_with_budget(scan, rel_paths, REGEX_TIME_BUDGET)
+    else:
+        scan = partial(_scan_file, query, knowledge_base_dir, hash_content, False)
+        results = map(scan, rel_paths)
+    return [record for record in results if record is not None]
+
+
+def _scan_file(query: Query, knowledge_base_dir: str, hash_content: bool, keep_spans: bool,
+               rel_path: str) -> Optional[Dict[str, Any]]:
+    """Returns the light match record of one file, or None if it does not match."""
+    content = _read_body(knowledge_base_dir, rel_path)
+    if content is None:
+        return None
+    try:
+        hits = get_matcher(query)(content, spans=keep_spans)
+    except Exception as e:
+        print(f"Error processing file {os.path.join(knowledge_base_dir, rel_path)}: {e}")
+        return None
+    if hits is None:
+        return None
+    record = {"file_path": rel_path, "word_count": len(content), "term_hits": hits.counts}
+    if hash_content:
+        record["content_hash"] = content_hash(content.encode('utf-8'))
+    if keep_spans:
+        record["spans"] = hits.spans
+    return record
+
+
+def _describe_records(query: Query, knowledge_base_dir: str, records: List[Dict[str, Any]],
+                      keep_content: bool = False,
+                      snippet_window: int = DEFAULT_SNIPPET_WINDOW) -> List[Dict[str, Any]]:
+    """
+    Completes the ranked match records that made the cut.
+
+    Adds title, zhihu_link, snippets, content_preview, best_chunks and
+    content_hash, plus full_content when keep_content is set. Files that
+    can no longer be read are dropped.
+    """
+    matcher = get_matcher(query)
+    chunk_table = ChunkTable.load(default_index_dir(knowledge_base_dir))
+    described = []
+    for record in records:
+        rel_path = record["file_path"]
+        content = _read_body(knowledge_base_dir, rel_path)
+        if content is None:
+            continue
+        file_path = os.path.join(knowledge_base_dir, rel_path)
+        try:
+            spans = record.pop("spans", None)
+            if spans is None:
+                hits = matcher(content)
+                spans = hits.spans if hits is not None else []
+            digest = record.get("content_hash") or content_hash(content.encode('utf-8'))
+            zhihu_links = _extract_zhihu_links(content)
+            snippets = build_snippets(content, spans, snippet_window)
+            chunks = document_chunks(rel_path, content, digest, chunk_table)
+            record.update({
+                "title": _extract_title(content, file_path),
+                "zhihu_link": zhihu_links[0] if zhihu_links else "",
+                # Fall back to the opening text when no span is known
+                "content_preview": " ".join(snippets) if snippets else content[:200] + "...",
+                "snippets": snippets,
+                "content_hash": digest,
+                "best_chunks": best_chunks(chunks, spans),
+            })
+        except Exception as e:
+            print(f"Error processing file {file_path}: {e}")
+            continue
+        if keep_content:
+            record["full_content"] = content
+        described.append(record)
+    return described
+
+
+def _parallel_scan(query: Query, knowledge_base_dir: str, rel_paths: List[str],
+                   workers: int, hash_content: bool = True) -> List[Dict[str, Any]]:
+    """
+    Splits the file list across a process pool and merges the match records.
+
+    Chunks are contiguous slices of rel_paths and results are concatenated in
+    chunk order, so ids come out the same as with the serial scan.
+    """
+    chunk_count = min(len(rel_paths), workers * 4)
+    chunk_size = -(-len(rel_paths) // chunk_count)
+    chunks = [rel_paths[i:i + chunk_size] for i in range(0, len(rel_paths), chunk_size)]
+    print(f"Scanning {len(rel_paths)} files with {workers} worker processes")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(_scan_files, [query] * len(chunks),
+                               [knowledge_base_dir] * len(chunks), chunks,
+                               [hash_content] * len(chunks))
+        return [record for chunk_records in results for record in chunk_records]
+
+
+def build_search_index(base_dir: str) -> Dict[str, Any]:
+    """
+    Builds the persistent inverted index for the knowledge base.
+
+    Args:
+        base_dir: The project's root directory.
+
+    Returns:
+        A dictionary containing the build status and the path to the index file.
+    """
+    knowledge_base_dir = os.path.join(base_dir, "knowledge_base", "sth-matters")
+    if not os.path.isdir(knowledge_base_dir):
+        return {"success": False, "error": "Knowledge base directory not found."}
+
+    print(f"Building search index for '{knowledge_base_dir}'")
+    try:
+        stats = build_index(knowledge_base_dir, default_index_dir(knowledge_base_dir))
+    except Exception as e:
+        print(f"Error writing search index: {e}")
+        return {"success": False, "error": f"Failed to write search index: {e}"}
+
+    print(f"Search index created: {stats['index_path']} ({stats['total_files']} files, {stats['total_tokens']} tokens)")
+    return {"success": True, **stats}
+
+
+def update_search_index(base_dir: str) -> Dict[str, Any]:
+    """
+    Incrementally refreshes the search index after the knowledge base changed.
+
+    Only files that were added, changed or deleted since the last build or
+    update (according to the manifest) are re-processed.
+
+    Args:
+        base_dir: The project's root directory.
+
+    Returns:
+        A dictionary containing the update status and the lists of
+        added/changed/deleted files.
+    """
+    knowledge_base_dir = os.path.join(base_dir, "knowledge_base", "sth-matters")
+    if not os.path.isdir(knowledge_base_dir):
+        return {"success": False, "error": "Knowledge base directory not found."}
+
+    print(f"Updating search index for '{knowledge_base_dir}'")
+    try:
+        stats = update_index(knowledge_base_dir, default_index_dir(knowledge_base_dir))
+    except Exception as e:
+        print(f"Error updating search index: {e}")
+        return {"success": False, "error": f"Failed to update search index: {e}"}
+
+    if stats["full_rebuild"]:
+        print("No usable index or manifest found, rebuilt from scratch.")
+    else:
+        print(f"Search index updated: {len(stats['added'])} added, "
+              f"{len(stats['changed'])} changed, {len(stats['deleted'])} deleted")
+    return {"success": True, **stats}
+
+
+def build_semantic_search_index(base_dir: str, max_features: int = DEFAULT_MAX_FEATURES,
+                                svd_dim: int = DEFAULT_SVD_DIM) -> Dict[str, Any]:
+    """
+    Builds the TF-IDF/LSA vector index used by semantic searches.
+
+    Args:
+        base_dir: The project's root directory.
+        max_features: Number of index terms kept.
+        svd_dim: Dimensions of the LSA reduction (0 keeps the sparse TF-IDF only).
+
+    Returns:
+        A dictionary containing the build status and index statistics.
+    """
+    knowledge_base_dir = os.path.join(base_dir, "knowledge_base", "sth-matters")
+    if not os.path.isdir(knowledge_base_dir):
+        return {"success": False, "error": "Knowledge base directory not found."}
+
+    print(f"Building semantic index for '{knowledge_base_dir}'")
+    try:
+        stats = build_semantic_index(knowledge_base_dir, default_index_dir(knowledge_base_dir),
+                                     max_features=max_features, svd_dim=svd_dim)
+    except Exception as e:
+        print(f"Error writing semantic index: {e}")
+        return {"success": False, "error": f"Failed to write semantic index: {e}"}
+
+    print(f"Semantic index created: {stats['index_path']} ({stats['total_files']} files, "
+          f"{stats['total_features']} terms, {stats['svd_dim']} LSA dimensions)")
+    return {"success": True, **stats}
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Quick search over the local knowledge base")
+    parser.add_argument(
+        '-b', '--base-dir',
+        default=os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+        help="Project root directory (default: parent of src/)"
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('build-index', help="Build the persistent inverted index")
+    subparsers.add_parser('update-index', help="Re-index only files changed since the last build")
+    semantic_parser = subparsers.add_parser(
+        'build-semantic', help="Build the TF-IDF/LSA vector index for --mode semantic")
+    semantic_parser.add_argument(
+        '--features', type=int, default=DEFAULT_MAX_FEATURES,
+        help=f"Index terms kept (default: {DEFAULT_MAX_FEATURES})"
+    )
+    semantic_parser.add_argument(
+        '--svd-dim', type=int, default=DEFAULT_SVD_DIM,
+        help=f"LSA dimensions (default: {DEFAULT_SVD_DIM}, 0 = sparse TF-IDF only)"
+    )
+
+    search_parser = subparsers.add_parser('search', help="Run a quick search and write the index JSON")
+    search_parser.add_argument(
+        'topic', help="Keyword to search for; 'a | b | c' matches a keyword list"
+    )
+    search_parser.add_argument(
+        '-m', '--mode', choices=QUERY_MODES, default='auto',
+        help="How to interpret the topic (default: auto = keyword list, literal or regex; "
+             "semantic needs build-semantic)"
+    )
+    search_parser.add_argument(
+        '-k', '--top-k', type=int, default=DEFAULT_TOP_K,
+        help=f"Keep only the k best-ranked sources (default: {DEFAULT_TOP_K}, 0 = all)"
+    )
+    search_parser.add_argument(
+        '-t', '--tag',
+        help="Only search documents under this tag path, e.g. '#2A-功夫/1-核心能力'"
+    )
+    search_parser.add_argument(
+        '--snippet-window', type=int, default=DEFAULT_SNIPPET_WINDOW,
+        help=f"Characters of context around each match in snippets (default: {DEFAULT_SNIPPET_WINDOW})"
+    )
+    search_parser.add_argument(
+        '--slim', action='store_true',
+        help="Write a slim index without full_content (generators read the KB lazily)"
+    )
+    search_parser.add_argument(
+        '--no-dedup', action='store_true',
+        help="Keep mirrored copies of the same article as separate sources"
+    )
+    search_parser.add_argument(
+        '--no-cache', action='store_true',
+        help="Ignore and do not update the query result cache"
+    )
+    search_parser.add_argument(
+        '-w', '--workers', type=int, default=1,
+        help="Worker processes for the scan (default: 1, 0 = one per CPU core)"
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    if args.command == 'build-index':
+        result = build_search_index(args.base_dir)
+    elif args.command == 'update-index':
+        result = update_search_index(args.base_dir)
+    elif args.command == 'build-semantic':
+        result = build_semantic_search_index(args.base_dir, args.features, args.svd_dim)
+    else:
+        result = perform_quick_search(args.topic, args.base_dir, workers=args.workers,
+                                      top_k=args.top_k or None, slim=args.slim,
+                                      use_cache=not args.no_cache, mode=args.mode,
+                                      snippet_window=args.snippet_window, tag_scope=args.tag,
+                                      dedup=not args.no_dedup)
+        # The in-memory index is for library callers; the CLI reports the file path
+        result.pop("index_data", None)
     print(json.dumps(result, ensure_ascii=False, indent=2))
-    
-    # Test with a topic that might not exist
-    test_topic_no_result = "NonExistentTopic12345"
-    result_no_result = perform_quick_search(test_topic_no_result, project_root)
-    print("\n--- No Result Test ---")
-    print(json.dumps(result_no_ascii=False, indent=2))
\ No newline at end of file
+    return 0 if result["success"] else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ranking: vectorized BM25 scoring and top-k selection for search results.
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def bm25_scores(term_freqs: np.ndarray, doc_lengths: np.ndarray, doc_freqs: np.ndarray,
+                total_docs: int, avg_doc_length: Optional[float] = None,
+                k1: float = BM25_K1, b: float = BM25_B) -> np.ndarray:
+    """
+    Scores documents against query terms with Okapi BM25, in one batch.
+
+    Args:
+        term_freqs: (n_docs, n_terms) occurrences of each query term per document.
+        doc_lengths: (n_docs,) document lengths.
+        doc_freqs: (n_terms,) number of documents in the collection containing each term.
+        total_docs: Size of the collection.
+        avg_doc_length: Average document length; defaults to the mean of doc_lengths.
+
+    Returns:
+        (n_docs,) array of scores.
+    """
+    term_freqs = np.asarray(term_freqs, dtype=np.float64)
+    doc_lengths = np.asarray(doc_lengths, dtype=np.float64)
+    doc_freqs = np.asarray(doc_freqs, dtype=np.float64)
+    if term_freqs.size == 0:
+        return np.zeros(term_freqs.shape[0])
+
+    if not avg_doc_length:
+        avg_doc_length = float(doc_lengths.mean()) or 1.0
+    total_docs = max(total_docs, 1)
+
+    # Lucene-style IDF, always positive
+    idf = np.log1p((total_docs - doc_freqs + 0.5) / (doc_freqs + 0.5))
+    norm = k1 * (1.0 - b + b * doc_lengths / avg_doc_length)
+    weights = term_freqs * (k1 + 1.0) / (term_freqs + norm[:, None])
+    return weights @ idf
+
+
+def top_k_indices(scores: Sequence[float], k: Optional[int] = None) -> np.ndarray:
+    """
+    Returns indices of the k highest scores, best first.
+
+    Uses a partial sort (argpartition) so the cost is linear in the number of
+    documents; ties keep their original order.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    n = scores.shape[0]
+    if k is None or k >= n:
+        selected = np.arange(n)
+    elif k <= 0:
+        return np.arange(0)
+    else:
+        # Everything strictly above the k-th score, then the earliest ties
+        kth = np.partition(-scores, k - 1)[k - 1]
+        above = np.flatnonzero(-scores < kth)
+        ties = np.flatnonzero(-scores == kth)[:k - above.shape[0]]
+        selected = np.concatenate([above, ties])
+    # Sort the selection by descending score, then ascending index
+    order = np.lexsort((selected, -scores[selected]))
+    return selected[order]
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Result Cache: ranked quick-search results keyed by (parsed query,
+search options, KB manifest version).
+
+Entries live in a size-bounded in-memory LRU and are persisted one JSON file
+per entry, so a restart keeps the hot queries and a put only writes one small
+file. Empty result lists are cached too, so repeated misses are cheap.
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+CACHE_DIRNAME = "query_cache"
+DEFAULT_MAX_ENTRIES = 256
+
+# Caches keyed by directory, shared by all searches in this process
+_CACHES: Dict[str, "QueryCache"] = {}
+
+
+def make_cache_key(query: Any, options: Dict[str, Any], kb_version: str) -> str:
+    """Return a stable key for a query (any JSON-serializable form, see
+    query_modes.cache_form) against a given KB version."""
+    payload = json.dumps([query, options, kb_version], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class QueryCache:
+    """LRU of query results with a one-file-per-entry disk store."""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Optional[Dict[str, Any]]]" = OrderedDict()
+        if cache_dir:
+            self._load_keys()
+
+    @classmethod
+    def for_dir(cls, cache_dir: str) -> "QueryCache":
+        """Return the process-wide cache stored in cache_dir."""
+        cache = _CACHES.get(cache_dir)
+        if cache is None:
+            cache = _CACHES[cache_dir] = cls(cache_dir)
+        return cache
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load_keys(self) -> None:
+        """Register persisted entries, least recently used first, without reading them."""
+        try:
+            names = [n for n in os.listdir(self.cache_dir) if n.endswith('.json')]
+        except OSError:
+            return
+        paths = [os.path.join(self.cache_dir, n) for n in names]
+        for path in sorted(paths, key=os.path.getmtime):
+            # None marks an entry whose body is still on disk
+            self._entries[os.path.basename(path)[:-len('.json')]] = None
+        self._evict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for key, or None on a miss."""
+        if key not in self._entries:
+            return None
+        entry = self._entries[key]
+        if entry is None and self.cache_dir:
+            try:
+                with open(self._entry_path(key), 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+                # Keep the on-disk LRU order in step with memory
+                os.utime(self._entry_path(key))
+            except (OSError, json.JSONDecodeError):
+                del self._entries[key]
+                return None
+            self._entries[key] = entry
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, records: List[Dict[str, Any]], **extra: Any) -> None:
+        """Store ranked result records (an empty list records a negative result)."""
+        entry = {"records": records, **extra}
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if self.cache_dir:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = self._entry_path(key) + ".tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(entry, f, ensure_ascii=False, separators=(',', ':'))
+                os.replace(tmp_path, self._entry_path(key))
+            except OSError as e:
+                print(f"Error writing query cache entry {key}: {e}")
+        self._evict()
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries:
+            key, _ = self._entries.popitem(last=False)
+            if self.cache_dir:
+                try:
+                    os.remove(self._entry_path(key))
+                except OSError:
+                    pass
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
@@ -8,11 +8,9 @@
 import subprocess
 import json
 import os
-import time
-import glob
-from pathlib import Path
 from typing import Optional, Dict, Any
 from logger import get_logger
+from utils import copy_into_job, create_job_dir, gc_job_dirs
 from workflow import (
     build_deep_search_prompt,
     extract_index_path,
@@ -122,9 +120,6 @@ class DeepSearchRPA:
                 print(
                     "错误输出:", result.stderr[:1000] + "..." if len(result.stderr) > 1000 else result.stderr)
 
-            # 等待文件生成
-            time.sleep(1)
-
             return {
                 "success": result.returncode == 0,
                 "stdout": result.stdout,
@@ -190,15 +185,22 @@ class DeepSearchRPA:
                 "files": {}
             }
 
+        # 文档生成在独立的任务目录 output/jobs/<job_id>/ 中进行
+        job_id, job_dir = create_job_dir(self.output_dir)
+        gc_job_dirs(self.output_dir, keep=[job_id])
+
         try:
+            # 共享的 output/<主题>_index.json 会被下一次同主题搜索覆盖，任务使用自己的副本
+            index_path = copy_into_job(job_dir, index_path)
             kb_dir = os.path.join(self.kb_dir, "sth-matters")
             generated_files = run_document_generators(
                 index_path=index_path,
                 kb_dir=kb_dir,
-                output_dir=self.output_dir,
+                output_dir=job_dir,
                 base_dir=self.base_dir,
+                job_id=job_id,
             )
-        except subprocess.CalledProcessError as e:
+        except Exception as e:
             return {
                 "success": False,
                 "error": f"文档生成失败: {e}",
@@ -211,7 +213,8 @@ class DeepSearchRPA:
             "topic": topic,
             "claude_result": claude_result,
             "files": generated_files,
-            "output_dir": self.output_dir,
+            "output_dir": job_dir,
+            "job_id": job_id,
             "index_file": index_path,
         }
 
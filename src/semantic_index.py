@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Semantic Index: an offline TF-IDF / LSA vector index over the knowledge base.
+
+Documents are tokenized like the inverted index (CJK bigrams, Latin words)
+and weighted with sublinear TF-IDF. The L2-normalized matrix is stored in
+CSR form as ``.npy`` files; optionally a truncated SVD (randomized, NumPy
+only) reduces it to a dense ``docs x k`` LSA matrix. Query time memory-maps
+the arrays and scores every document with one batched matrix-vector
+product, so no network, GPU or extra dependency is needed.
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import kb_index
+import kb_pack
+from ranking import top_k_indices
+
+SEMANTIC_DIRNAME = "semantic"
+SEMANTIC_VERSION = 1
+META_FILENAME = "meta.json"
+
+DEFAULT_MAX_FEATURES = 50000
+DEFAULT_SVD_DIM = 128
+# Rows of the sparse matrix multiplied at once while building the SVD
+_CHUNK_ROWS = 2048
+
+# Loaded indexes keyed by directory, invalidated when meta.json's mtime changes
+_LOADED: Dict[str, "SemanticIndex"] = {}
+
+
+def _sparse_matmul(data: np.ndarray, indices: np.ndarray, indptr: np.ndarray,
+                   dense: np.ndarray) -> np.ndarray:
+    """Multiply a compressed sparse matrix (CSR, or CSC for the transpose) by dense."""
+    rows = len(indptr) - 1
+    out = np.zeros((rows, dense.shape[1]), dtype=np.float64)
+    for start in range(0, rows, _CHUNK_ROWS):
+        stop = min(rows, start + _CHUNK_ROWS)
+        lo, hi = indptr[start], indptr[stop]
+        if lo == hi:
+            continue
+        contrib = data[lo:hi, None] * dense[indices[lo:hi]]
+        offsets = indptr[start:stop] - lo
+        nonempty = np.diff(indptr[start:stop + 1]) > 0
+        out[start:stop][nonempty] = np.add.reduceat(contrib, offsets[nonempty], axis=0)
+    return out
+
+
+def _sparse_matvec(data: np.ndarray, indices: np.ndarray, indptr: np.ndarray,
+                   vector: np.ndarray) -> np.ndarray:
+    """CSR matrix times a dense vector."""
+    out = np.zeros(len(indptr) - 1, dtype=np.float64)
+    if len(data) == 0:
+        return out
+    contrib = data * vector[indices]
+    nonempty = np.diff(indptr) > 0
+    out[nonempty] = np.add.reduceat(contrib, indptr[:-1][nonempty])
+    return out
+
+
+def randomized_svd(data: np.ndarray, indices: np.ndarray, indptr: np.ndarray,
+                   n_features: int, k: int, oversample: int = 10, power_iters: int = 2,
+                   seed: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Truncated SVD of a CSR matrix (Halko et al.); returns U, S, V with k columns."""
+    # The transpose in CSC form is the same arrays sorted by column
+    order = np.argsort(indices, kind='stable')
+    row_ids = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    t_data, t_indices = data[order], row_ids[order]
+    t_indptr = np.concatenate([[0], np.cumsum(np.bincount(indices, minlength=n_features))])
+
+    def x_times(m):
+        return _sparse_matmul(data, indices, indptr, m)
+
+    def xt_times(m):
+        return _sparse_matmul(t_data, t_indices, t_indptr, m)
+
+    rng = np.random.RandomState(seed)
+    sketch = x_times(rng.normal(size=(n_features, k + oversample)))
+    for _ in range(power_iters):
+        sketch, _ = np.linalg.qr(sketch)
+        sketch, _ = np.linalg.qr(xt_times(sketch))
+        sketch = x_times(sketch)
+    q, _ = np.linalg.qr(sketch)
+    small = xt_times(q).T
+    u_small, s, vt = np.linalg.svd(small, full_matrices=False)
+    return (q @ u_small)[:, :k], s[:k], vt[:k].T
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class SemanticIndex:
+    """Memory-mapped TF-IDF (and optional LSA) matrices with a similarity API."""
+
+    def __init__(self, index_path: str):
+        self.index_path = index_path
+        with open(os.path.join(index_path, META_FILENAME), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get("version") != SEMANTIC_VERSION:
+            raise ValueError(f"Unsupported semantic index version in {index_path}")
+        self.meta = meta
+        self.docs: List[str] = meta["docs"]
+        self.features: List[str] = meta["features"]
+        self.feature_ids = {feature: i for i, feature in enumerate(self.features)}
+        self.idf = np.asarray(meta["idf"], dtype=np.float64)
+        self.svd_dim: int = meta.get("svd_dim", 0)
+        self._mtime = os.path.getmtime(os.path.join(index_path, META_FILENAME))
+
+        def array(name):
+            return np.load(os.path.join(index_path, f"{name}.npy"), mmap_mode='r')
+        self.data, self.indices, self.indptr = array("csr_data"), array("csr_indices"), array("csr_indptr")
+        self.lsa_docs = array("lsa_docs") if self.svd_dim else None
+        self.lsa_terms = array("lsa_terms") if self.svd_dim else None
+
+    @property
+    def version(self) -> str:
+        """Identifies this build, for cache keys."""
+        return f"{self.meta.get('manifest_version', '')}:{self.meta.get('built_at', '')}"
+
+    @classmethod
+    def load(cls, index_dir: str) -> Optional["SemanticIndex"]:
+        """Open the semantic index in index_dir, or return None if it has not been built."""
+        index_path = os.path.join(index_dir, SEMANTIC_DIRNAME)
+        try:
+            mtime = os.path.getmtime(os.path.join(index_path, META_FILENAME))
+        except OSError:
+            return None
+        cached = _LOADED.get(index_path)
+        if cached is not None and cached._mtime == mtime:
+            return cached
+        try:
+            index = cls(index_path)
+        except (OSError, ValueError, KeyError, json.JSONDecodeError) as e:
+            print(f"Error loading semantic index {index_path}: {e}")
+            return None
+        _LOADED[index_path] = index
+        return index
+
+    def query_vector(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (feature ids, weights) of the L2-normalized TF-IDF query vector."""
+        counts: Dict[int, int] = {}
+        for token in kb_index.tokenize(query):
+            feature_id = self.feature_ids.get(token)
+            if feature_id is not None:
+                counts[feature_id] = counts.get(feature_id, 0) + 1
+        ids = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        weights = (1.0 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts))))
+        weights *= self.idf[ids]
+        norm = np.linalg.norm(weights)
+        return ids, (weights / norm if norm else weights)
+
+    def scores(self, query: str) -> np.ndarray:
+        """Cosine similarity of every document to the query."""
+        ids, weights = self.query_vector(query)
+        if len(ids) == 0:
+            return np.zeros(len(self.docs))
+        if self.lsa_docs is not None:
+            projected = weights @ self.lsa_terms[ids]
+            norm = np.linalg.norm(projected)
+            if not norm:
+                return np.zeros(len(self.docs))
+            return self.lsa_docs @ (projected / norm)
+        dense = np.zeros(len(self.features))
+        dense[ids] = weights
+        return _sparse_matvec(self.data, self.indices, self.indptr, dense)
+
+    def similar(self, query: str, k: Optional[int] = 10) -> List[Tuple[str, float]]:
+        """Return up to k (relative path, similarity) pairs, most similar first."""
+        scores = self.scores(query)
+        return [(self.docs[i], float(scores[i])) for i in top_k_indices(scores, k)
+                if scores[i] > 0]
+
+    def related_terms(self, query: str, k: int = 10) -> List[str]:
+        """Return index terms close to the query in LSA space (empty without SVD)."""
+        if self.lsa_terms is None:
+            return []
+        ids, weights = self.query_vector(query)
+        if len(ids) == 0:
+            return []
+        projected = weights @ self.lsa_terms[ids]
+        term_norms = np.linalg.norm(self.lsa_terms, axis=1)
+        term_norms[term_norms == 0] = 1.0
+        scores = (self.lsa_terms @ projected) / term_norms
+        scores[ids] = -np.inf
+        return [self.features[i] for i in top_k_indices(scores, k)]
+
+
+def build_semantic_index(kb_dir: str, index_dir: str,
+                         max_features: int = DEFAULT_MAX_FEATURES,
+                         svd_dim: int = DEFAULT_SVD_DIM, min_df: int = 2,
+                         max_df_ratio: float = 0.5) -> Dict:
+    """
+    Build the TF-IDF matrix (and LSA reduction when svd_dim > 0) from scratch.
+
+    Terms must occur in at least min_df documents and, on larger knowledge
+    bases, in at most max_df_ratio of them; the max_features most common
+    remaining terms are kept.
+    """
+    pack = kb_pack.KBPack.for_kb_dir(kb_dir)
+    if pack is not None:
+        texts = pack.iter_texts()
+    else:
+        texts = ((os.path.relpath(p, kb_dir), kb_index.read_kb_file(p)[1])
+                 for p in kb_index.iter_kb_files(kb_dir))
+
+    docs: List[str] = []
+    doc_counts: List[Dict[str, int]] = []
+    doc_freq: Dict[str, int] = {}
+    for rel_path, content in texts:
+        counts: Dict[str, int] = {}
+        for token in kb_index.tokenize(content):
+            counts[token] = counts.get(token, 0) + 1
+        docs.append(rel_path)
+        doc_counts.append(counts)
+        for token in counts:
+            doc_freq[token] = doc_freq.get(token, 0) + 1
+
+    n_docs = len(docs)
+    min_df = min(min_df, max(1, n_docs // 10))
+    max_df = n_docs * max_df_ratio if n_docs >= 20 else n_docs
+    eligible = [t for t, df in doc_freq.items() if min_df <= df <= max_df]
+    eligible.sort(key=lambda t: (-doc_freq[t], t))
+    features = sorted(eligible[:max_features])
+    feature_ids = {t: i for i, t in enumerate(features)}
+    idf = np.array([np.log((1 + n_docs) / (1 + doc_freq[t])) + 1.0 for t in features])
+
+    data_parts, index_parts, indptr = [], [], [0]
+    for counts in doc_counts:
+        ids = np.array([feature_ids[t] for t in counts if t in feature_ids], dtype=np.int32)
+        tf = np.array([counts[t] for t in counts if t in feature_ids], dtype=np.float64)
+        order = np.argsort(ids)
+        ids = ids[order]
+        weights = (1.0 + np.log(tf[order])) * idf[ids]
+        norm = np.linalg.norm(weights)
+        data_parts.append((weights / norm if norm else weights).astype(np.float32))
+        index_parts.append(ids)
+        indptr.append(indptr[-1] + len(ids))
+    data = np.concatenate(data_parts) if data_parts else np.zeros(0, dtype=np.float32)
+    indices = np.concatenate(index_parts) if index_parts else np.zeros(0, dtype=np.int32)
+    indptr = np.array(indptr, dtype=np.int64)
+
+    k = min(svd_dim, n_docs - 1, len(features) - 1)
+    index_path = os.path.join(index_dir, SEMANTIC_DIRNAME)
+    tmp_path = index_path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, "csr_data.npy"), data)
+    np.save(os.path.join(tmp_path, "csr_indices.npy"), indices)
+    np.save(os.path.join(tmp_path, "csr_indptr.npy"), indptr)
+    if k >= 2:
+        u, s, v = randomized_svd(data.astype(np.float64), indices, indptr, len(features), k)
+        np.save(os.path.join(tmp_path, "lsa_docs.npy"), _normalize_rows(u * s).astype(np.float32))
+        np.save(os.path.join(tmp_path, "lsa_terms.npy"), v.astype(np.float32))
+    else:
+        k = 0
+
+    manifest = kb_index.load_manifest(index_dir)
+    with open(os.path.join(tmp_path, META_FILENAME), 'w', encoding='utf-8') as f:
+        json.dump({
+            "version": SEMANTIC_VERSION,
+            "built_at": datetime.now().isoformat(timespec='seconds'),
+            "manifest_version": kb_index.manifest_version(manifest) if manifest else "",
+            "svd_dim": int(k),
+            "docs": docs,
+            "features": features,
+            "idf": [round(float(x), 6) for x in idf],
+        }, f, ensure_ascii=False, separators=(',', ':'))
+
+    # Swap the new build in; readers holding the old mmaps keep working
+    old_path = index_path + ".old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(index_path):
+        os.replace(index_path, old_path)
+    os.replace(tmp_path, index_path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    _LOADED.pop(index_path, None)
+
+    return {
+        "index_path": index_path,
+        "total_files": n_docs,
+        "total_features": len(features),
+        "svd_dim": int(k),
+    }
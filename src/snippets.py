@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Snippets: keyword-in-context (KWIC) excerpts around match positions.
+
+Quick search records the spans of its matches while scanning a file and
+turns the densest regions into short one-line snippets, so previews show
+the text around the hits rather than the article's front matter.
+"""
+
+import bisect
+import re
+from typing import List, Sequence, Tuple
+
+# Characters of context kept on each side of a match
+DEFAULT_SNIPPET_WINDOW = 80
+DEFAULT_MAX_SNIPPETS = 3
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _clean(text: str) -> str:
+    """Collapse whitespace (including newlines) so a snippet fits on one line."""
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def build_snippets(content: str, spans: Sequence[Tuple[int, int]],
+                   window: int = DEFAULT_SNIPPET_WINDOW,
+                   max_snippets: int = DEFAULT_MAX_SNIPPETS) -> List[str]:
+    """
+    Returns up to max_snippets excerpts of content around the given match spans.
+
+    Every span is a candidate centre; a candidate scores the number of spans
+    that fall inside its window. The best non-overlapping windows are kept
+    and returned in document order, with "..." marking cut-off text.
+    """
+    if not spans or max_snippets <= 0:
+        return []
+    spans = sorted(spans)
+    starts = [start for start, _ in spans]
+
+    candidates = []
+    for start, end in spans:
+        lo = max(0, start - window)
+        hi = min(len(content), end + window)
+        density = bisect.bisect_left(starts, hi) - bisect.bisect_left(starts, lo)
+        # Densest first, earlier windows win ties
+        candidates.append((-density, lo, hi))
+    candidates.sort()
+
+    chosen: List[Tuple[int, int]] = []
+    for _, lo, hi in candidates:
+        if all(hi <= c_lo or lo >= c_hi for c_lo, c_hi in chosen):
+            chosen.append((lo, hi))
+            if len(chosen) == max_snippets:
+                break
+
+    snippets = []
+    for lo, hi in sorted(chosen):
+        text = _clean(content[lo:hi])
+        if lo > 0:
+            text = "..." + text
+        if hi < len(content):
+            text += "..."
+        snippets.append(text)
+    return snippets
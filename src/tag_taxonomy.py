@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tag Taxonomy: the knowledge base's ``#a/b/c`` tag paths as a trie.
+
+Every tag path found in an article (e.g. ``#3-家庭伦理/2-亲子关系/2b-家庭教育``)
+is inserted segment by segment; each node keeps the documents tagged with
+exactly that path. The per-document tags are persisted next to the inverted
+index and maintained by build-index/update-index, and the trie is rebuilt
+from them on load with every node's ``docs_under`` precomputed, so vertical
+(ancestors) and horizontal (siblings) scans are dictionary lookups instead of
+full-text searches.
+"""
+
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+TAGS_FILENAME = "tags.json"
+TAGS_VERSION = 1
+
+# A tag starts with '#' that does not follow a word character, '#', '/' or '&'
+# (URL fragments, "##" headings, HTML entities) and runs to the next
+# whitespace or punctuation that cannot be part of a tag.
+_TAG_RE = re.compile(r"(?<![\w#/&])#([^\s#,，。;；、:：!！?？()（）\[\]【】<>《》\"“”'‘’`|]+)")
+
+# Loaded taxonomies keyed by path, invalidated when the file's mtime changes
+_LOADED: Dict[str, "TagTaxonomy"] = {}
+
+
+def normalize_tag(tag: str) -> Optional[str]:
+    """Return the canonical '#a/b/c' form of a tag path, or None if it is not one."""
+    segments = [s.strip() for s in tag.strip().lstrip('#').split('/')]
+    segments = [s for s in segments if s]
+    if not segments or segments[0].isdigit():
+        # "#1" style numbering is not a tag
+        return None
+    return '#' + '/'.join(segments)
+
+
+def extract_tags(content: str) -> List[str]:
+    """Return the distinct tag paths in content, in order of appearance."""
+    tags = []
+    for raw in _TAG_RE.findall(content):
+        tag = normalize_tag(raw.rstrip('.'))
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+class TagNode:
+    """One tag path segment."""
+
+    __slots__ = ("name", "path", "parent", "children", "docs", "docs_under")
+
+    def __init__(self, name: str, path: str, parent: Optional["TagNode"]):
+        self.name = name
+        self.path = path
+        self.parent = parent
+        self.children: Dict[str, "TagNode"] = {}
+        # Documents tagged with exactly this path
+        self.docs: set = set()
+        # Documents tagged with this path or a descendant, filled in by _finalize
+        self.docs_under: Tuple[str, ...] = ()
+
+
+class TagTaxonomy:
+    """Trie of tag paths with document postings."""
+
+    def __init__(self, documents: Optional[Dict[str, List[str]]] = None):
+        self.documents: Dict[str, List[str]] = {}
+        self.root = TagNode("", "#", None)
+        self._nodes: Dict[str, TagNode] = {}
+        self._mtime: Optional[float] = None
+        self._dirty = True
+        for rel_path, tags in (documents or {}).items():
+            self.add_document(rel_path, tags)
+
+    def add_document(self, rel_path: str, tags: Iterable[str]) -> None:
+        """Register the tag paths of a document."""
+        tags = [t for t in (normalize_tag(t) for t in tags) if t]
+        if rel_path in self.documents:
+            self.remove_documents([rel_path])
+        if not tags:
+            return
+        self.documents[rel_path] = tags
+        for tag in tags:
+            self._insert(tag).docs.add(rel_path)
+        self._dirty = True
+
+    def remove_documents(self, rel_paths: Iterable[str]) -> None:
+        """Drop documents; nodes left without documents are pruned."""
+        for rel_path in rel_paths:
+            for tag in self.documents.pop(rel_path, []):
+                node = self._nodes.get(tag)
+                if node is not None:
+                    node.docs.discard(rel_path)
+        self._prune(self.root)
+        self._dirty = True
+
+    def _insert(self, tag: str) -> TagNode:
+        node = self.root
+        for segment in tag[1:].split('/'):
+            child = node.children.get(segment)
+            if child is None:
+                path = f"{node.path}/{segment}" if node is not self.root else f"#{segment}"
+                child = node.children[segment] = TagNode(segment, path, node)
+                self._nodes[path] = child
+            node = child
+        return node
+
+    def _prune(self, node: TagNode) -> bool:
+        """Remove empty subtrees below node; return True if node itself is empty."""
+        for name, child in list(node.children.items()):
+            if self._prune(child):
+                del node.children[name]
+                del self._nodes[child.path]
+        return not node.docs and not node.children
+
+    def _finalize(self) -> None:
+        """Precompute docs_under for every node (post-order)."""
+        def visit(node: TagNode) -> set:
+            docs = set(node.docs)
+            for child in node.children.values():
+                docs |= visit(child)
+            node.docs_under = tuple(sorted(docs))
+            return docs
+        visit(self.root)
+        self._dirty = False
+
+    def node(self, tag: str) -> Optional[TagNode]:
+        """Return the node for a tag path ('#' prefix optional), or None."""
+        if self._dirty:
+            self._finalize()
+        normalized = normalize_tag(tag)
+        return self._nodes.get(normalized) if normalized else None
+
+    def __contains__(self, tag: str) -> bool:
+        return self.node(tag) is not None
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def roots(self) -> List[str]:
+        """Top-level tag paths."""
+        return [child.path for child in self.root.children.values()]
+
+    def children(self, tag: str) -> List[str]:
+        """Direct child tag paths."""
+        node = self.node(tag)
+        return [child.path for child in node.children.values()] if node else []
+
+    def ancestors(self, tag: str) -> List[str]:
+        """Parent tag paths, nearest first (vertical scan)."""
+        node = self.node(tag)
+        result = []
+        while node is not None and node.parent is not None and node.parent is not self.root:
+            node = node.parent
+            result.append(node.path)
+        return result
+
+    def siblings(self, tag: str) -> List[str]:
+        """Other tag paths under the same parent (horizontal scan)."""
+        node = self.node(tag)
+        if node is None:
+            return []
+        return [child.path for child in node.parent.children.values() if child is not node]
+
+    def docs_at(self, tag: str) -> List[str]:
+        """Documents tagged with exactly this path."""
+        node = self.node(tag)
+        return sorted(node.docs) if node else []
+
+    def docs_under(self, tag: str) -> Tuple[str, ...]:
+        """Documents tagged with this path or any path below it."""
+        node = self.node(tag)
+        return node.docs_under if node else ()
+
+    def tags_of(self, rel_path: str) -> List[str]:
+        """Tag paths found in a document."""
+        return list(self.documents.get(rel_path, []))
+
+    def save(self, index_dir: str) -> str:
+        """Atomically write the per-document tags into index_dir and return the path."""
+        os.makedirs(index_dir, exist_ok=True)
+        tags_path = os.path.join(index_dir, TAGS_FILENAME)
+        tmp_path = tags_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": TAGS_VERSION, "documents": self.documents},
+                      f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, tags_path)
+        self._mtime = os.path.getmtime(tags_path)
+        _LOADED[tags_path] = self
+        return tags_path
+
+    @classmethod
+    def load(cls, index_dir: str) -> Optional["TagTaxonomy"]:
+        """Load the taxonomy from index_dir, or return None if it is missing or outdated."""
+        tags_path = os.path.join(index_dir, TAGS_FILENAME)
+        try:
+            mtime = os.path.getmtime(tags_path)
+        except OSError:
+            return None
+
+        cached = _LOADED.get(tags_path)
+        if cached is not None and cached._mtime == mtime:
+            return cached
+
+        try:
+            with open(tags_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error loading tag taxonomy {tags_path}: {e}")
+            return None
+        if data.get("version") != TAGS_VERSION:
+            return None
+
+        taxonomy = cls(data["documents"])
+        taxonomy._finalize()
+        taxonomy._mtime = mtime
+        _LOADED[tags_path] = taxonomy
+        return taxonomy
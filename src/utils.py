@@ -7,7 +7,99 @@ Utility functions for the Sth-Matters project.
 import os
 import glob
 import shutil
+import time
 from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from document_generator.job_manifest import new_job_id
+
+# Per-job working directories live in output/jobs/<job_id>/
+JOBS_DIRNAME = "jobs"
+DEFAULT_JOB_RETENTION_DAYS = 7
+DEFAULT_MAX_JOBS = 200
+
+
+def create_job_dir(output_dir: str, job_id: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Creates an isolated working directory for one search/generation job
+    and returns (job_id, job_dir).
+
+    Every file a job produces goes into its own directory, so concurrent
+    requests on the same topic never see each other's files. Generators
+    write each file under a temporary name and rename it into place, and
+    the job manifest is written last, so a job directory with a manifest
+    is complete.
+    """
+    job_id = job_id or new_job_id()
+    job_dir = os.path.join(output_dir, JOBS_DIRNAME, job_id)
+    os.makedirs(job_dir, exist_ok=False)
+    return job_id, job_dir
+
+
+def copy_into_job(job_dir: str, path: str) -> str:
+    """
+    Copies a file produced outside the job directory into it and returns
+    the copy's path.
+
+    The deep search writes its index to the shared output/<topic>_index.json,
+    which the next search on the same topic overwrites and archiving moves
+    away. The job works on (and its manifest records) its own copy instead.
+    """
+    target = os.path.join(job_dir, os.path.basename(path))
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    shutil.copy2(path, tmp_path)
+    os.replace(tmp_path, target)
+    return target
+
+
+def list_job_dirs(output_dir: str) -> List[Tuple[float, str]]:
+    """Returns (mtime, path) for every job directory, oldest first."""
+    jobs_dir = os.path.join(output_dir, JOBS_DIRNAME)
+    try:
+        names = os.listdir(jobs_dir)
+    except OSError:
+        return []
+    job_dirs = []
+    for name in names:
+        path = os.path.join(jobs_dir, name)
+        try:
+            if os.path.isdir(path):
+                job_dirs.append((os.path.getmtime(path), path))
+        except OSError:
+            continue
+    return sorted(job_dirs)
+
+
+def gc_job_dirs(output_dir: str,
+                retention_days: float = DEFAULT_JOB_RETENTION_DAYS,
+                max_jobs: int = DEFAULT_MAX_JOBS,
+                keep: Iterable[str] = (),
+                now: Optional[float] = None) -> List[str]:
+    """
+    Removes job directories older than retention_days, then the oldest
+    ones beyond the newest max_jobs. Job ids in `keep` (e.g. the job that
+    is running) are never removed. Returns the removed directories.
+    """
+    now = time.time() if now is None else now
+    cutoff = now - retention_days * 86400
+    keep = set(keep)
+    all_dirs = list_job_dirs(output_dir)
+    job_dirs = [(mtime, path) for mtime, path in all_dirs
+                if os.path.basename(path) not in keep]
+    excess = max(len(all_dirs) - max_jobs, 0)
+
+    removed = []
+    for i, (mtime, path) in enumerate(job_dirs):
+        if mtime >= cutoff and i >= excess:
+            continue
+        try:
+            shutil.rmtree(path)
+            removed.append(path)
+        except OSError as e:
+            print(f"Failed to remove job directory {path}: {e}")
+    if removed:
+        print(f"Removed {len(removed)} old job directories from {os.path.join(output_dir, JOBS_DIRNAME)}")
+    return removed
 
 def archive_existing_output(base_dir: str):
     """
@@ -21,8 +113,9 @@ def archive_existing_output(base_dir: str):
     os.makedirs(archive_base_dir, exist_ok=True)
 
     # Find all items in the output directory, excluding the archive folder itself
+    # and the job directories, which have their own retention policy
     items_to_archive = [item for item in glob.glob(os.path.join(output_dir, '*')) 
-                        if os.path.basename(item) != 'archive']
+                        if os.path.basename(item) not in ('archive', JOBS_DIRNAME)]
 
     if not items_to_archive:
         print("Output directory is clean. No archiving needed.")
@@ -4,15 +4,21 @@
 
 This module centralizes the handoff between the AI agent (produces JSON)
 and the Python document generators (consume JSON), making it easier to
-test with injected runners and fixtures.
+test with injected runners and fixtures. The generators run in-process
+unless a command runner is injected.
 """
 
-import json
 import os
 import re
 import subprocess
-from pathlib import Path
-from typing import Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from document_generator.api import load_index
+from document_generator.artifact_cache import ArtifactCache
+from document_generator.job_manifest import (artifact_paths, manifest_path, new_job_id,
+                                             read_manifest)
+from document_generator.scheduler import EPUB_JOB, ensure_artifact, schedule_documents
+from utils import copy_into_job, create_job_dir, gc_job_dirs
 
 RunnerResult = subprocess.CompletedProcess
 CommandRunner = Callable[[List[str], Optional[str]], RunnerResult]
@@ -51,40 +57,76 @@ def default_runner(cmd: List[str], cwd: Optional[str] = None) -> RunnerResult:
     )
 
 
-def find_generated_documents(output_dir: str, topic: str) -> Dict[str, str]:
-    """Locate generated documents for the topic."""
-    patterns = {
-        "md": f"{topic}_source_based_文档.md",
-        "html": f"{topic}_html_文档.html",
-        "epub": f"{topic}_*.epub",
-    }
-    found: Dict[str, str] = {}
-    base_path = Path(output_dir)
-    if not base_path.exists():
-        return found
+# Artifacts handed to delivery (email), keyed by file type
+DELIVERY_ARTIFACTS = {"md": "source_based", "html": "html", "epub": "epub"}
 
-    for file_type, pattern in patterns.items():
-        matches = sorted(base_path.glob(pattern),
-                         key=os.path.getmtime, reverse=True)
-        if matches:
-            found[file_type] = str(matches[0])
-    return found
+
+def delivery_documents(artifacts: Dict[str, str]) -> Dict[str, str]:
+    """Map generator job names to the file types handed to delivery."""
+    return {
+        file_type: artifacts[name]
+        for file_type, name in DELIVERY_ARTIFACTS.items()
+        if name in artifacts
+    }
 
 
 def run_document_generators(
     index_path: str,
     kb_dir: str,
     output_dir: Optional[str] = None,
-    runner: CommandRunner = default_runner,
+    runner: Optional[CommandRunner] = None,
     base_dir: Optional[str] = None,
+    index_data: Optional[Dict[str, Any]] = None,
+    workers: int = 1,
+    use_artifact_cache: bool = True,
+    job_id: Optional[str] = None,
+    artifacts: Iterable[str] = tuple(DELIVERY_ARTIFACTS.values()),
 ) -> Dict[str, str]:
-    """Run Markdown/HTML and EPUB generators for a given index."""
+    """Run Markdown/HTML and EPUB generators for a given index.
+
+    Without a runner the generators run in this process (or, with
+    ``workers`` > 1, concurrently on a process pool) through
+    document_generator.scheduler, reusing ``index_data`` when the caller
+    already has the index loaded. Output is then reproducible and cached
+    per artifact, so an equivalent index is served from the KB's artifact
+    cache instead of being regenerated (disable with
+    ``use_artifact_cache=False``). A runner runs the CLI scripts as
+    subprocesses.
+
+    Either way the generators write a job manifest into ``output_dir``
+    (named after ``job_id``, generated when not given) and the returned
+    paths are read from it, never discovered by scanning the output
+    directory. Pass a per-job directory from utils.create_job_dir() as
+    ``output_dir`` to keep concurrent jobs apart.
+
+    Only the declared ``artifacts`` (layout names and/or "epub"; by
+    default the ones handed to delivery) are generated. The manifest
+    records the inputs, so any other layout can be produced later, the
+    first time it is requested, with ``ensure_layout``.
+    """
     index_path = os.path.abspath(index_path)
     kb_dir = os.path.abspath(kb_dir)
     if output_dir is None:
         output_dir = os.path.join(os.path.dirname(index_path), "..", "output")
     output_dir = os.path.abspath(output_dir)
+    job_id = job_id or new_job_id()
+    artifacts = list(dict.fromkeys(artifacts))
+    layouts = [name for name in artifacts if name != EPUB_JOB]
+    epub = EPUB_JOB in artifacts
+
+    if runner is None:
+        if index_data is None:
+            index_data = load_index(index_path)
+        artifact_cache = ArtifactCache.for_kb_dir(kb_dir) if use_artifact_cache else None
+        result = schedule_documents(index_data, kb_dir, output_dir, layouts=layouts, epub=epub,
+                                    workers=workers, artifact_cache=artifact_cache,
+                                    job_id=job_id, manifest_file=manifest_path(output_dir, job_id),
+                                    index_path=index_path)
+        return delivery_documents(artifact_paths([result["manifest"]]))
+
     base_dir = base_dir or os.getcwd()
+    md_manifest = manifest_path(output_dir, f"{job_id}_md")
+    epub_manifest = manifest_path(output_dir, f"{job_id}_epub")
 
     md_cmd = [
         "python",
@@ -96,7 +138,9 @@ def run_document_generators(
         "-k",
         kb_dir,
         "-l",
-        "all",
+        *layouts,
+        "-m",
+        md_manifest,
     ]
     epub_cmd = [
         "python",
@@ -107,16 +151,38 @@ def run_document_generators(
         output_dir,
         "-k",
         kb_dir,
+        "-m",
+        epub_manifest,
     ]
 
-    runner(md_cmd, cwd=base_dir)
-    runner(epub_cmd, cwd=base_dir)
+    manifests = []
+    if layouts:
+        runner(md_cmd, cwd=base_dir)
+        manifests.append(read_manifest(md_manifest))
+    if epub:
+        runner(epub_cmd, cwd=base_dir)
+        manifests.append(read_manifest(epub_manifest))
+    return delivery_documents(artifact_paths(manifests))
+
 
-    # Topic name drives file naming
-    with open(index_path, "r", encoding="utf-8") as f:
-        topic = json.load(f).get("metadata", {}).get("topic", "topic")
+def ensure_layout(job_dir: str, job_id: str, layout: str,
+                  use_artifact_cache: bool = True) -> str:
+    """Return the path of a job's layout, generating it on first request.
 
-    return find_generated_documents(output_dir, topic)
+    ``layout`` is any generator layout or "epub". Layouts skipped by
+    ``run_document_generators`` are built from the job's saved index and
+    options into the job directory, and added to its manifest.
+    """
+    manifest_file = manifest_path(job_dir, job_id)
+    if not os.path.exists(manifest_file):
+        # Jobs run through a CLI runner keep one manifest per generator
+        suffix = "epub" if layout == EPUB_JOB else "md"
+        manifest_file = manifest_path(job_dir, f"{job_id}_{suffix}")
+    artifact_cache = None
+    if use_artifact_cache:
+        inputs = read_manifest(manifest_file).get("inputs") or {}
+        artifact_cache = ArtifactCache.for_kb_dir(inputs["kb_dir"]) if inputs.get("kb_dir") else None
+    return ensure_artifact(manifest_file, layout, artifact_cache=artifact_cache)
 
 
 def call_claude(
@@ -142,10 +208,13 @@ def run_deep_search_workflow(
     kb_dir: str,
     output_dir: Optional[str] = None,
     claude_invoker: Optional[ClaudeInvoker] = None,
-    generator_runner: CommandRunner = default_runner,
+    generator_runner: Optional[CommandRunner] = None,
     claude_path: Optional[str] = None,
 ) -> Dict[str, object]:
-    """Full deep-search workflow: invoke AI, parse path, run generators."""
+    """Full deep-search workflow: invoke AI, parse path, run generators.
+
+    generator_runner defaults to running the generators in-process.
+    """
     output_dir = output_dir or os.path.join(base_dir, "output")
     prompt = build_deep_search_prompt(topic)
 
@@ -154,7 +223,7 @@ def run_deep_search_workflow(
             raise FileNotFoundError("未找到 Claude CLI 路径。")
 
         def claude_invoker(pr, cwd): return call_claude(
-            pr, cwd, claude_path, runner=generator_runner
+            pr, cwd, claude_path, runner=generator_runner or default_runner
         )
 
     claude_result = claude_invoker(prompt, base_dir)
@@ -185,17 +254,24 @@ def run_deep_search_workflow(
             "stdout": getattr(claude_result, "stdout", ""),
         }
 
+    # Generate in a job directory from the job's own copy of the index
+    job_id, job_dir = create_job_dir(output_dir)
+    gc_job_dirs(output_dir, keep=[job_id])
+    index_path = copy_into_job(job_dir, index_path)
     files = run_document_generators(
         index_path=index_path,
         kb_dir=kb_dir,
-        output_dir=output_dir,
+        output_dir=job_dir,
         runner=generator_runner,
         base_dir=base_dir,
+        job_id=job_id,
     )
 
     return {
         "success": len(files) > 0,
         "index_path": index_path,
         "files": files,
+        "job_id": job_id,
+        "output_dir": job_dir,
         "stdout": getattr(claude_result, "stdout", ""),
     }
@@ -0,0 +1,146 @@
+"""Reference copy of the multi-pass Markdown converter the generators used
+before document_generator.markdown_renderer. Golden tests and the renderer
+benchmark compare against it."""
+
+import re
+
+
+def legacy_markdown_to_html(markdown_text: str, link_target=None) -> str:
+    """The generators' original multi-pass converter (MD version; EPUB omits link targets)."""
+    if not markdown_text:
+        return ""
+
+    html = markdown_text
+
+    # 处理标题 (# ## ### #### ##### ######)
+    html = re.sub(r'^# (.+)$', r'<h1>\1</h1>', html, flags=re.MULTILINE)
+    html = re.sub(r'^## (.+)$', r'<h2>\1</h2>', html, flags=re.MULTILINE)
+    html = re.sub(r'^### (.+)$', r'<h3>\1</h3>', html, flags=re.MULTILINE)
+    html = re.sub(r'^#### (.+)$', r'<h4>\1</h4>', html, flags=re.MULTILINE)
+    html = re.sub(r'^##### (.+)$', r'<h5>\1</h5>',
+                  html, flags=re.MULTILINE)
+    html = re.sub(r'^###### (.+)$', r'<h6>\1</h6>',
+                  html, flags=re.MULTILINE)
+
+    # 处理粗体 (**text** 和 __text__)
+    html = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', html)
+    html = re.sub(r'__(.+?)__', r'<strong>\1</strong>', html)
+
+    # 处理斜体 (*text* 和 _text_)
+    html = re.sub(r'\*([^*]+)\*', r'<em>\1</em>', html)
+    html = re.sub(r'_([^_]+)_', r'<em>\1</em>', html)
+
+    # 处理链接 [text](url)
+    target = f' target="{link_target}"' if link_target else ''
+    html = re.sub(r'\[([^\]]+)\]\(([^)]+)\)',
+                  r'<a href="\2"' + target + r'>\1</a>', html)
+
+    # 处理无序列表 (- item 和 * item)
+    def process_list_items(text):
+        lines = text.split('\n')
+        in_list = False
+        result = []
+
+        for line in lines:
+            if re.match(r'^[\s]*[-*] ', line):
+                if not in_list:
+                    result.append('<ul>')
+                    in_list = True
+                # 处理列表项，可能包含内部格式
+                item_content = re.sub(r'^[\s]*[-*] ', '', line)
+                result.append(f'<li>{item_content}</li>')
+            else:
+                if in_list:
+                    result.append('</ul>')
+                    in_list = False
+                result.append(line)
+
+        if in_list:
+            result.append('</ul>')
+
+        return '\n'.join(result)
+
+    html = process_list_items(html)
+
+    # 处理有序列表 (1. item)
+    def process_ordered_list_items(text):
+        lines = text.split('\n')
+        in_list = False
+        result = []
+
+        for line in lines:
+            if re.match(r'^[\s]*\d+\. ', line):
+                if not in_list:
+                    result.append('<ol>')
+                    in_list = True
+                # 处理列表项
+                item_content = re.sub(r'^[\s]*\d+\. ', '', line)
+                result.append(f'<li>{item_content}</li>')
+            else:
+                if in_list:
+                    result.append('</ol>')
+                    in_list = False
+                result.append(line)
+
+        if in_list:
+            result.append('</ol>')
+
+        return '\n'.join(result)
+
+    html = process_ordered_list_items(html)
+
+    # 处理引用 (> text)
+    html = re.sub(r'^> (.+)$', r'<blockquote>\1</blockquote>',
+                  html, flags=re.MULTILINE)
+
+    # 处理代码块 (```text```)
+    html = re.sub(r'```([^`]+)```', r'<pre><code>\1</code></pre>', html)
+
+    # 处理行内代码 (`text`)
+    html = re.sub(r'`([^`]+)`', r'<code>\1</code>', html)
+
+    # 处理分割线 (--- 或 ***)
+    html = re.sub(r'^[-*]{3,}$', r'<hr>', html, flags=re.MULTILINE)
+
+    # 处理段落（将连续的非空行包装在<p>标签中）
+    def process_paragraphs(text):
+        lines = text.split('\n')
+        result = []
+        in_paragraph = False
+        current_paragraph = []
+
+        for line in lines:
+            stripped_line = line.strip()
+
+            # 跳过已经是HTML标签的行
+            if stripped_line.startswith('<') and stripped_line.endswith('>'):
+                if in_paragraph:
+                    result.append(
+                        '<p>' + ' '.join(current_paragraph) + '</p>')
+                    current_paragraph = []
+                    in_paragraph = False
+                result.append(line)
+                continue
+
+            # 跳过空行
+            if not stripped_line:
+                if in_paragraph:
+                    result.append(
+                        '<p>' + ' '.join(current_paragraph) + '</p>')
+                    current_paragraph = []
+                    in_paragraph = False
+                continue
+
+            # 添加到当前段落
+            current_paragraph.append(stripped_line)
+            in_paragraph = True
+
+        # 处理最后一个段落
+        if in_paragraph:
+            result.append('<p>' + ' '.join(current_paragraph) + '</p>')
+
+        return '\n'.join(result)
+
+    html = process_paragraphs(html)
+
+    return html
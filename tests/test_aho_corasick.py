@@ -0,0 +1,13 @@
+from aho_corasick import AhoCorasick
+
+
+def test_overlapping_matches_with_offsets():
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+    assert sorted(automaton.iter_matches("ushers")) == [(1, "she"), (2, "he"), (2, "hers")]
+
+
+def test_count_is_case_insensitive_and_handles_cjk():
+    automaton = AhoCorasick(["社会化", "AI", "会"])
+    text = "社会化与ai，以及社会化的 Ai 时代"
+    assert automaton.count(text) == {"社会化": 2, "会": 2, "AI": 2}
+    assert automaton.count("无关内容") == {}
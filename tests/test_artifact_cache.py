@@ -0,0 +1,138 @@
+import copy
+import os
+import time
+from datetime import datetime
+
+from document_generator.api import ALL_LAYOUTS, generate_documents, load_index
+from document_generator.artifact_cache import (ArtifactCache, artifact_key, index_digest,
+                                               reproducible_time)
+from document_generator.scheduler import schedule_documents
+from quick_search import build_search_index, update_search_index
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_reproducible_build_is_byte_identical(temp_project, sample_index_file):
+    index_data = load_index(str(sample_index_file))
+    kb_dir, output_dir = str(temp_project["kb_dir"]), temp_project["output_dir"]
+    build_time = datetime(2024, 1, 2, 3, 4, 5)
+
+    first = generate_documents(index_data, kb_dir, str(output_dir / "first"),
+                               layouts=ALL_LAYOUTS, build_time=build_time)
+    time.sleep(1.1)  # a wall-clock timestamp would now differ
+    second = generate_documents(index_data, kb_dir, str(output_dir / "second"),
+                                layouts=ALL_LAYOUTS, build_time=build_time)
+
+    assert os.path.basename(first["epub"]) == "AI_20240102_030405.epub"
+    for job, path in first.items():
+        assert os.path.basename(path) == os.path.basename(second[job])
+        assert _read(path) == _read(second[job]), job
+    assert b"2024-01-02 03:04:05" in _read(first["html"])
+
+
+def test_reproducible_time_sources(temp_project, sample_index_file, monkeypatch):
+    kb_dir = str(temp_project["kb_dir"])
+    index_data = load_index(str(sample_index_file))
+    monkeypatch.delenv("SOURCE_DATE_EPOCH", raising=False)
+    assert reproducible_time(kb_dir, index_data) == datetime(2024, 1, 1)
+
+    # Without a search date: the newest source file
+    del index_data["metadata"]["search_date"]
+    os.utime(temp_project["sample_md"], (86400 * 365, 86400 * 365))
+    assert reproducible_time(kb_dir, index_data) == datetime(1971, 1, 1)
+
+    # Nothing to go by: the current time, never a fixed epoch
+    assert reproducible_time(kb_dir).year >= 2024
+
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "0")
+    assert reproducible_time(kb_dir, index_data) == datetime(1970, 1, 1)
+
+
+def test_update_index_does_not_invalidate_cached_artifacts(temp_project, sample_index_file, monkeypatch):
+    monkeypatch.delenv("SOURCE_DATE_EPOCH", raising=False)
+    index_data = load_index(str(sample_index_file))
+    kb_dir, output_dir = str(temp_project["kb_dir"]), temp_project["output_dir"]
+    cache = ArtifactCache(str(temp_project["base"] / "artifact_cache"))
+    build_search_index(str(temp_project["base"]))
+
+    first = schedule_documents(index_data, kb_dir, str(output_dir / "first"), layouts=["html"],
+                               artifact_cache=cache)
+    assert b"2024-01-01 00:00:00" in _read(first["artifacts"]["html"])
+
+    # A touched article makes update-index rewrite the manifest, though no content changed
+    time.sleep(1.1)
+    os.utime(temp_project["sample_md"])
+    update_search_index(str(temp_project["base"]))
+    second = schedule_documents(index_data, kb_dir, str(output_dir / "second"), layouts=["html"],
+                                artifact_cache=cache)
+    assert second["cached"] == list(second["artifacts"])
+
+
+def test_key_ignores_search_date_but_not_content(temp_project, sample_index_file):
+    kb_dir = str(temp_project["kb_dir"])
+    index_data = load_index(str(sample_index_file))
+    key = artifact_key(index_data, kb_dir, "html", {"topic": None})
+
+    rerun = copy.deepcopy(index_data)
+    rerun["metadata"]["search_date"] = "2099-12-31"
+    assert artifact_key(rerun, kb_dir, "html", {"topic": None}) == key
+    assert index_digest(rerun) == index_digest(index_data)
+
+    changed = copy.deepcopy(index_data)
+    changed["sources"][0]["title"] = "Other"
+    assert artifact_key(changed, kb_dir, "html", {"topic": None}) != key
+    assert artifact_key(index_data, kb_dir, "summary", {"topic": None}) != key
+    assert artifact_key(index_data, kb_dir, "html", {"topic": "x"}) != key
+
+
+def test_schedule_documents_serves_repeat_from_cache(temp_project, sample_index_file):
+    index_data = load_index(str(sample_index_file))
+    kb_dir, output_dir = str(temp_project["kb_dir"]), temp_project["output_dir"]
+    cache = ArtifactCache(str(temp_project["base"] / "artifact_cache"))
+
+    first = schedule_documents(index_data, kb_dir, str(output_dir / "first"), artifact_cache=cache)
+    assert first["cached"] == []
+    assert len(cache) == len(first["artifacts"])
+
+    rerun = copy.deepcopy(index_data)
+    second = schedule_documents(rerun, kb_dir, str(output_dir / "second"), artifact_cache=cache)
+    assert second["cached"] == list(second["artifacts"])
+    assert cache.hits == len(second["artifacts"])
+    for job, path in second["artifacts"].items():
+        assert os.path.dirname(path) == str(output_dir / "second")
+        assert _read(path) == _read(first["artifacts"][job])
+
+    # The search date is rendered into headers and the EPUB name, so it is not served stale
+    rerun["metadata"]["search_date"] = "2099-12-31"
+    third = schedule_documents(rerun, kb_dir, str(output_dir / "third"), artifact_cache=cache)
+    assert third["cached"] == []
+    assert os.path.basename(third["artifacts"]["epub"]) == "AI_20991231_000000.epub"
+    assert b"2099-12-31 00:00:00" in _read(third["artifacts"]["html"])
+
+
+def test_key_without_manifest_follows_source_files(temp_project, sample_index_file):
+    kb_dir = str(temp_project["kb_dir"])
+    index_data = load_index(str(sample_index_file))
+    key = artifact_key(index_data, kb_dir, "html", {})
+    assert artifact_key(index_data, kb_dir, "html", {}) == key
+
+    temp_project["sample_md"].write_text("# Sample Title\n\nEdited body\n", encoding="utf-8")
+    assert artifact_key(index_data, kb_dir, "html", {}) != key
+
+
+def test_lru_eviction(tmp_path):
+    cache = ArtifactCache(str(tmp_path / "cache"), disk_budget=250)
+    for name in ("a", "b", "c"):
+        path = tmp_path / f"{name}.md"
+        path.write_text(name * 100, encoding="utf-8")
+        cache.put(name, str(path))
+        if name == "b":
+            assert cache.fetch("a", str(tmp_path / "out"))  # a becomes most recently used
+
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert sorted(os.listdir(tmp_path / "cache")) == ["a", "c"]
+    assert cache.fetch("b", str(tmp_path / "out")) is None
+    assert "a" in ArtifactCache(str(tmp_path / "cache"))
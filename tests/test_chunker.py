@@ -0,0 +1,62 @@
+import json
+
+from chunker import ChunkTable, best_chunks, chunk_document
+from kb_index import build_index, default_index_dir, update_index
+from quick_search import perform_quick_search
+
+ARTICLE = (
+    "# 标题\n\n"
+    "第一段。\n第一段续。\n\n"
+    "## 小节\n\n"
+    "```\ncode\n\nmore code\n```\n\n"
+    "第二段，社会化。\n"
+)
+
+
+def test_chunk_document_offsets_and_headings():
+    chunks = chunk_document("a.md", ARTICLE)
+    texts = [ARTICLE[c.start:c.end] for c in chunks]
+    assert texts == ["# 标题", "第一段。\n第一段续。", "## 小节", "```\ncode\n\nmore code\n```", "第二段，社会化。"]
+    assert [c.kind for c in chunks] == ["heading", "paragraph", "heading", "paragraph", "paragraph"]
+    assert chunks[1].heading_path == ("标题",)
+    assert chunks[4].heading_path == ("标题", "小节")
+
+
+def test_chunk_ids_are_stable_across_edits():
+    before = chunk_document("a.md", ARTICLE)
+    after = chunk_document("a.md", "前言\n\n" + ARTICLE)
+    assert {c.chunk_id for c in before} <= {c.chunk_id for c in after}
+    assert len({c.chunk_id for c in chunk_document("b.md", "重复\n\n重复\n")}) == 2
+
+
+def test_best_chunks_counts_hits():
+    chunks = chunk_document("a.md", ARTICLE)
+    hit = ARTICLE.index("社会化")
+    first = ARTICLE.index("第一段续")
+    best = best_chunks(chunks, [(hit, hit + 3), (first, first + 3), (hit, hit + 3)], limit=2)
+    assert [b["hits"] for b in best] == [2, 1]
+    assert best[0]["heading_path"] == ["标题", "小节"]
+
+
+def test_chunk_table_follows_index_updates(temp_project):
+    kb_dir = temp_project["kb_dir"]
+    index_dir = default_index_dir(str(kb_dir))
+    (kb_dir / "a.md").write_text(ARTICLE, encoding="utf-8")
+    build_index(str(kb_dir), index_dir)
+    assert len(ChunkTable.load(index_dir).chunks("a.md")) == 5
+
+    (kb_dir / "a.md").write_text("# 新\n\n一段\n", encoding="utf-8")
+    update_index(str(kb_dir), index_dir)
+    assert len(ChunkTable.load(index_dir).chunks("a.md")) == 2
+
+
+def test_quick_search_reports_best_chunks(temp_project):
+    base_dir = str(temp_project["base"])
+    (temp_project["kb_dir"] / "a.md").write_text(ARTICLE, encoding="utf-8")
+    result = perform_quick_search("社会化", base_dir)
+    with open(result["index_file_path"], "r", encoding="utf-8") as f:
+        source = json.load(f)["sources"][0]
+
+    chunk = source["best_chunks"][0]
+    assert ARTICLE[chunk["start"]:chunk["end"]] == "第二段，社会化。"
+    assert chunk["heading_path"] == ["标题", "小节"]
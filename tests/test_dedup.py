@@ -0,0 +1,77 @@
+import json
+import random
+
+from dedup import duplicate_groups, estimate_similarity, minhash_signature
+from document_generator.md_generator import MDDocumentGenerator
+from quick_search import build_search_index, perform_quick_search
+
+
+def _article(seed: int, length: int = 3000) -> str:
+    rng = random.Random(seed)
+    chars = "社会化教育家庭伦理认知偏差人格发展自我批判实践功夫核心能力亲子关系"
+    return "".join(rng.choice(chars) for _ in range(length))
+
+
+def test_minhash_estimates_similarity():
+    text = _article(1)
+    near = text + "\n\n（转载请注明出处）"
+    other = _article(2)
+    assert estimate_similarity(minhash_signature(text), minhash_signature(near)) >= 0.9
+    assert estimate_similarity(minhash_signature(text), minhash_signature(other)) < 0.5
+
+
+def test_duplicate_groups_keeps_input_order():
+    a, b = minhash_signature(_article(1)), minhash_signature(_article(2))
+    near_a = minhash_signature(_article(1) + "尾注")
+    groups = duplicate_groups(["h1", "h2", "h3", "h1"], [a, b, near_a, None])
+    assert groups == [[0, 2, 3], [1]]
+
+
+def test_quick_search_collapses_mirrors(temp_project):
+    base_dir = str(temp_project["base"])
+    kb_dir = temp_project["kb_dir"]
+    body = "# 社会化\n\n社会化 " + _article(3)
+    for folder in ("【文章目录】", "【答集】"):
+        (kb_dir / folder).mkdir()
+        (kb_dir / folder / "社会化.md").write_text(body, encoding="utf-8")
+    (kb_dir / "【答集】" / "社会化-副本.md").write_text(body + "\n\n转载请注明", encoding="utf-8")
+    (kb_dir / "other.md").write_text("# 其他\n\n社会化 " + _article(4), encoding="utf-8")
+    build_search_index(base_dir)
+
+    result = perform_quick_search("社会化", base_dir)
+    with open(result["index_file_path"], "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    sources = {s["file_path"]: s for s in data["sources"]}
+    assert len(sources) == 2
+    assert data["metadata"]["duplicates_collapsed"] == 2
+    primary = next(s for s in data["sources"] if s["alternate_paths"])
+    assert len(primary["alternate_paths"]) == 2
+    assert set(primary["categories"]) == {"【文章目录】", "【答集】"}
+
+    result = perform_quick_search("社会化", base_dir, dedup=False)
+    with open(result["index_file_path"], "r", encoding="utf-8") as f:
+        assert len(json.load(f)["sources"]) == 4
+
+
+def test_generator_collapses_mirrored_sources(temp_project):
+    kb_dir = temp_project["kb_dir"]
+    for mirror in ("copy", "other"):
+        (kb_dir / mirror).mkdir()
+        (kb_dir / mirror / "sample.md").write_bytes(temp_project["sample_md"].read_bytes())
+    index_path = temp_project["output_dir"] / "mirrors.json"
+    index_path.write_text(json.dumps({
+        "metadata": {"topic": "AI", "total_sources": 3},
+        "sources": [
+            {"id": 1, "title": "Sample", "file_path": "sample.md", "category": "A"},
+            {"id": 2, "title": "Sample", "file_path": "copy/sample.md", "category": "Quick Search Result"},
+            {"id": 3, "title": "Sample", "file_path": "other/sample.md", "category": "Quick Search Result"},
+        ],
+    }, ensure_ascii=False), encoding="utf-8")
+
+    generator = MDDocumentGenerator(str(index_path), str(kb_dir))
+    assert [s["file_path"] for s in generator.index_data["sources"]] == ["sample.md"]
+    assert generator.index_data["sources"][0]["alternate_paths"] == ["copy/sample.md", "other/sample.md"]
+    # Categories come from the KB directory; the index's category only covers top-level files
+    assert generator.index_data["sources"][0]["categories"] == ["A", "copy", "other"]
+    assert generator.total_sources == 1
@@ -0,0 +1,86 @@
+import json
+
+from chunker import chunk_document
+from document_generator.epub_generator import EPUBDocumentGenerator
+from document_generator.excerpts import excerpt_sections, source_terms
+from document_generator.md_generator import MDDocumentGenerator
+
+ARTICLE = (
+    "# 标题\n\n"
+    "开头。\n\n"
+    "## 小节\n\n"
+    "甲段。\n\n"
+    "乙段。\n\n"
+    "社会化出现在这里。\n\n"
+    "丙段。\n\n"
+    "丁段。\n\n"
+    "## 另一节\n\n"
+    "无关内容。\n"
+)
+
+
+def test_excerpt_keeps_matches_with_context():
+    sections = excerpt_sections("a.md", ARTICLE, terms=["社会化"], context=1)
+    assert [s.text for s in sections] == ["乙段。\n\n社会化出现在这里。\n\n丙段。"]
+    assert sections[0].heading_path == ("标题", "小节")
+
+    # Context does not leak into the next section
+    wide = excerpt_sections("a.md", ARTICLE, terms=["社会化"], context=5)
+    assert wide[0].text.startswith("甲段。") and wide[0].text.endswith("丁段。")
+
+
+def test_excerpt_merges_windows_and_uses_best_chunks():
+    chunks = chunk_document("a.md", ARTICLE)
+    other = next(c for c in chunks if ARTICLE[c.start:c.end] == "无关内容。")
+    best = [{"chunk_id": other.chunk_id}, {"chunk_id": "stale"}]
+    sections = excerpt_sections("a.md", ARTICLE, terms=["甲段", "乙段"], best_chunks=best, context=0)
+    assert [s.text for s in sections] == ["甲段。\n\n乙段。", "无关内容。"]
+    assert sections[1].heading_path == ("标题", "另一节")
+
+
+def test_excerpt_without_matches_falls_back_to_opening():
+    sections = excerpt_sections("a.md", ARTICLE, terms=["不存在"], context=0)
+    assert [s.text for s in sections] == ["开头。"]
+
+
+def test_source_terms_combine_hits_concepts_and_topic():
+    source = {"keyword_hits": {"社会化": 3}, "key_concepts": ["社会化", "家庭"]}
+    assert source_terms(source, "教育 | 伦理") == ["社会化", "家庭", "教育", "伦理"]
+
+
+def _write_index(temp_project):
+    (temp_project["kb_dir"] / "long.md").write_text(ARTICLE, encoding="utf-8")
+    index_path = temp_project["output_dir"] / "excerpt.json"
+    index_path.write_text(json.dumps({
+        "metadata": {"topic": "社会化", "total_sources": 1},
+        "sources": [{"id": 1, "title": "长文", "file_path": "long.md",
+                     "zhihu_link": "https://zhihu.com/q/1"}],
+    }, ensure_ascii=False), encoding="utf-8")
+    return index_path
+
+
+def test_md_and_html_excerpt_layouts(temp_project):
+    generator = MDDocumentGenerator(str(_write_index(temp_project)), str(temp_project["kb_dir"]))
+    generator.excerpt_context = 0
+
+    markdown = generator.generate_document("excerpt")
+    assert "社会化出现在这里。" in markdown
+    assert "乙段。" not in markdown and "无关内容。" not in markdown
+    assert "> 📍 标题 › 小节" in markdown
+    assert "[阅读全文](https://zhihu.com/q/1)" in markdown
+
+    page = generator.generate_document("excerpt_html")
+    assert "社会化出现在这里。" in page and "无关内容。" not in page
+    assert 'href="https://zhihu.com/q/1"' in page
+
+
+def test_epub_excerpt_chapter(temp_project):
+    generator = EPUBDocumentGenerator(str(_write_index(temp_project)), str(temp_project["kb_dir"]))
+    source = generator.index_data["sources"][0]
+    assert "无关内容。" in generator._create_chapter_content(source)
+
+    generator.excerpt_context = 0
+    chapter = generator._create_chapter_content(source)
+    assert "社会化出现在这里。" in chapter
+    assert "无关内容。" not in chapter
+    assert "阅读全文" in chapter
@@ -0,0 +1,43 @@
+import copy
+import json
+import os
+
+import pytest
+
+from document_generator.api import DEFAULT_LAYOUTS, generate_documents, load_index
+
+
+def test_generate_documents_in_process(temp_project, sample_index_file):
+    index_data = load_index(str(sample_index_file))
+    before = copy.deepcopy(index_data)
+
+    artifacts = generate_documents(index_data, str(temp_project["kb_dir"]),
+                                   str(temp_project["output_dir"]), topic="自定义")
+
+    assert set(artifacts) == set(DEFAULT_LAYOUTS) | {"epub"}
+    for path in artifacts.values():
+        assert os.path.exists(path)
+    assert os.path.basename(artifacts["html"]) == "自定义_html_文档.html"
+    assert artifacts["epub"].endswith(".epub")
+    # The caller's index is left untouched
+    assert index_data == before
+
+
+def test_generate_documents_selected_layouts(temp_project, sample_index_file):
+    artifacts = generate_documents(load_index(str(sample_index_file)), str(temp_project["kb_dir"]),
+                                   str(temp_project["output_dir"]), layouts=["excerpt"], epub=False)
+    assert list(artifacts) == ["excerpt"]
+    assert sorted(os.listdir(temp_project["output_dir"])) == ["AI_excerpt_文档.md", "AI_index.json"]
+
+    with pytest.raises(ValueError):
+        generate_documents({}, str(temp_project["kb_dir"]), str(temp_project["output_dir"]),
+                           layouts=["nope"])
+
+
+def test_load_index_errors(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_index(str(tmp_path / "missing.json"))
+    broken = tmp_path / "broken.json"
+    broken.write_text("{", encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_index(str(broken))
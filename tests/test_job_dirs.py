@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from quick_search import perform_quick_search
+from utils import JOBS_DIRNAME, create_job_dir, gc_job_dirs, list_job_dirs
+from workflow import run_document_generators
+
+
+def _make_job(output_dir, job_id, mtime):
+    _, job_dir = create_job_dir(str(output_dir), job_id)
+    os.utime(job_dir, (mtime, mtime))
+    return job_dir
+
+
+def test_create_job_dir_is_unique(tmp_path):
+    first_id, first_dir = create_job_dir(str(tmp_path))
+    second_id, second_dir = create_job_dir(str(tmp_path))
+    assert first_id != second_id
+    assert os.path.dirname(first_dir) == str(tmp_path / JOBS_DIRNAME)
+    with pytest.raises(FileExistsError):
+        create_job_dir(str(tmp_path), first_id)
+
+
+def test_gc_removes_expired_and_excess_jobs(tmp_path):
+    day = 86400
+    now = 100 * day
+    expired = _make_job(tmp_path, "expired", now - 8 * day)
+    oldest = _make_job(tmp_path, "oldest", now - 3 * day)
+    older = _make_job(tmp_path, "older", now - 2 * day)
+    newest = _make_job(tmp_path, "newest", now - day)
+    running = _make_job(tmp_path, "running", now - 9 * day)
+
+    removed = gc_job_dirs(str(tmp_path), retention_days=7, max_jobs=3,
+                          keep=["running"], now=now)
+
+    assert sorted(removed) == sorted([expired, oldest])
+    assert [path for _, path in list_job_dirs(str(tmp_path))] == [running, older, newest]
+
+
+def test_jobs_on_same_topic_are_isolated(temp_project, project_root):
+    base_dir = str(temp_project["base"])
+    output_dir = str(temp_project["output_dir"])
+    kb_dir = str(temp_project["kb_dir"])
+
+    files = []
+    for _ in range(2):
+        job_id, job_dir = create_job_dir(output_dir)
+        result = perform_quick_search("AI", base_dir, slim=True, output_dir=job_dir)
+        assert os.path.dirname(result["index_file_path"]) == job_dir
+        files.append(run_document_generators(result["index_file_path"], kb_dir, output_dir=job_dir,
+                                             base_dir=str(project_root), job_id=job_id,
+                                             index_data=result["index_data"]))
+        assert os.path.exists(os.path.join(job_dir, f"{job_id}.manifest.json"))
+
+    for file_type in ("md", "html", "epub"):
+        assert files[0][file_type] != files[1][file_type]
+        assert os.path.dirname(files[0][file_type]) != os.path.dirname(files[1][file_type])
+    assert not [name for name in os.listdir(output_dir) if name != JOBS_DIRNAME]
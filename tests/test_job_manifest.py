@@ -0,0 +1,68 @@
+import glob
+import json
+import os
+
+import pytest
+
+from document_generator.api import load_index
+from document_generator.job_manifest import (artifact_paths, file_sha1, manifest_path,
+                                             read_manifest)
+from document_generator.scheduler import schedule_documents
+from workflow import run_document_generators
+
+
+def test_schedule_documents_writes_manifest(temp_project, sample_index_file):
+    output_dir = str(temp_project["output_dir"])
+    path = manifest_path(output_dir, "job-1")
+    result = schedule_documents(load_index(str(sample_index_file)), str(temp_project["kb_dir"]),
+                                output_dir, layouts=["html"], job_id="job-1", manifest_file=path)
+
+    manifest = read_manifest(path)
+    assert manifest == result["manifest"]
+    assert manifest["job_id"] == "job-1" and manifest["topic"] == "AI"
+    assert list(manifest["artifacts"]) == ["epub", "html"]
+    for job, record in manifest["artifacts"].items():
+        assert record["path"] == result["artifacts"][job]
+        assert record["size"] == os.path.getsize(record["path"])
+        assert record["sha1"] == file_sha1(record["path"])
+        assert record["cached"] is False
+    assert not glob.glob(os.path.join(output_dir, "*.tmp"))
+
+
+def test_read_manifest_rejects_unknown_version(tmp_path):
+    path = tmp_path / "job.manifest.json"
+    path.write_text(json.dumps({"version": 99, "artifacts": {}}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        read_manifest(str(path))
+    with pytest.raises(FileNotFoundError):
+        read_manifest(str(tmp_path / "missing.json"))
+
+
+def test_artifact_paths_merges_manifests():
+    manifests = [
+        {"artifacts": {"html": {"path": "/a.html"}}},
+        {"artifacts": {"epub": {"path": "/b.epub"}}},
+    ]
+    assert artifact_paths(manifests) == {"html": "/a.html", "epub": "/b.epub"}
+
+
+def test_workflow_returns_paths_from_manifest(temp_project, sample_index_file, project_root):
+    output_dir = temp_project["output_dir"]
+    # Another job's EPUB with a newer mtime must not be picked up
+    other = output_dir / "AI_other.epub"
+    other.write_text("other", encoding="utf-8")
+    os.utime(other, (4102444800, 4102444800))
+
+    files = run_document_generators(
+        index_path=str(sample_index_file),
+        kb_dir=str(temp_project["kb_dir"]),
+        output_dir=str(output_dir),
+        base_dir=str(project_root),
+        use_artifact_cache=False,
+    )
+
+    manifests = glob.glob(str(output_dir / "*.manifest.json"))
+    assert len(manifests) == 1
+    recorded = artifact_paths([read_manifest(manifests[0])])
+    assert files == {"md": recorded["source_based"], "html": recorded["html"], "epub": recorded["epub"]}
+    assert files["epub"] != str(other)
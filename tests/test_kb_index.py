@@ -0,0 +1,84 @@
+import os
+
+from kb_index import InvertedIndex, default_index_dir, stale_paths, tokenize
+from quick_search import build_search_index, perform_quick_search, update_search_index
+
+
+def test_tokenize_cjk_bigrams_and_latin_words():
+    assert tokenize("AI社会化 Hello") == ["ai", "社会", "会化", "hello"]
+    assert tokenize("化") == ["化"]
+    assert tokenize("Straße") == tokenize("STRASSE") == ["strasse"]
+
+
+def test_candidates_match_substrings(temp_project):
+    kb_dir = temp_project["kb_dir"]
+    (kb_dir / "other.md").write_text("# Other\n\n家庭教育与社会化\n", encoding="utf-8")
+    build_search_index(str(temp_project["base"]))
+    index = InvertedIndex.load(default_index_dir(str(kb_dir)))
+
+    assert index.candidates("社会化") == ["other.md"]
+    assert index.candidates("会") == ["other.md"]
+    assert index.candidates("zhihu") == ["sample.md"]  # fragment of a URL word
+    assert index.candidates("NoMatchKeyword") == []
+    assert index.candidates("...") is None
+
+
+def test_quick_search_uses_index(temp_project):
+    base_dir = str(temp_project["base"])
+    build = build_search_index(base_dir)
+    assert build["success"] is True
+    assert os.path.exists(build["index_path"])
+    assert os.path.dirname(build["index_path"]) == default_index_dir(str(temp_project["kb_dir"]))
+
+    result = perform_quick_search("keyword", base_dir)
+    assert result["success"] is True
+    assert result["index_file_path"]
+
+
+def test_update_index_reprocesses_only_changed_files(temp_project):
+    base_dir = str(temp_project["base"])
+    kb_dir = temp_project["kb_dir"]
+    (kb_dir / "keep.md").write_text("# Keep\n\n不变的内容\n", encoding="utf-8")
+    (kb_dir / "gone.md").write_text("# Gone\n\n将被删除\n", encoding="utf-8")
+    (kb_dir / ".hidden").mkdir()
+    (kb_dir / ".hidden" / "skip.md").write_text("被排除\n", encoding="utf-8")
+    build_search_index(base_dir)
+
+    (kb_dir / "gone.md").unlink()
+    (kb_dir / "new.md").write_text("# New\n\n新增的社会化文章\n", encoding="utf-8")
+    temp_project["sample_md"].write_text("# Sample Title\n\n改写后的社会化内容\n", encoding="utf-8")
+
+    result = update_search_index(base_dir)
+    assert result["success"] is True
+    assert result["full_rebuild"] is False
+    assert result["added"] == ["new.md"]
+    assert result["changed"] == ["sample.md"]
+    assert result["deleted"] == ["gone.md"]
+
+    index = InvertedIndex.load(default_index_dir(str(kb_dir)))
+    assert index.candidates("社会化") == ["new.md", "sample.md"]
+    assert index.candidates("删除") == []
+    assert index.candidates("排除") == []
+
+    again = update_search_index(base_dir)
+    assert (again["added"], again["changed"], again["deleted"]) == ([], [], [])
+
+
+def test_search_sees_files_changed_since_the_index(temp_project):
+    base_dir = str(temp_project["base"])
+    kb_dir = temp_project["kb_dir"]
+    (kb_dir / "gone.md").write_text("# Gone\n\n家庭与社会化\n", encoding="utf-8")
+    build_search_index(base_dir)
+    assert stale_paths(str(kb_dir), default_index_dir(str(kb_dir))) == ([], [])
+    first = perform_quick_search("社会化", base_dir)
+    assert [s["file_path"] for s in first["index_data"]["sources"]] == ["gone.md"]
+
+    # No update-index: the new file, the edit and the deletion must still show up
+    (kb_dir / "gone.md").unlink()
+    (kb_dir / "new.md").write_text("# New\n\n新增的社会化文章\n", encoding="utf-8")
+    temp_project["sample_md"].write_text("# Sample Title\n\n改写后的社会化内容\n", encoding="utf-8")
+    assert stale_paths(str(kb_dir), default_index_dir(str(kb_dir))) == (["new.md", "sample.md"], ["gone.md"])
+
+    for mode in ("literal", "regex"):
+        result = perform_quick_search("社会化", base_dir, mode=mode)
+        assert sorted(s["file_path"] for s in result["index_data"]["sources"]) == ["new.md", "sample.md"]
@@ -0,0 +1,70 @@
+import os
+import re
+
+from kb_pack import KBPack, PACK_FILENAME, literal_bytes_pattern
+from quick_search import _read_body, build_search_index, perform_quick_search, update_search_index
+
+
+def _write_kb(kb_dir):
+    (kb_dir / "a.md").write_text("# A\n\n关于社会化的讨论\n", encoding="utf-8")
+    (kb_dir / "sub").mkdir()
+    (kb_dir / "sub" / "b.md").write_text("# B\n\nNothing here, just SOCIAL things\n", encoding="utf-8")
+
+
+def test_pack_round_trip_and_buffer_scan(temp_project):
+    kb_dir = temp_project["kb_dir"]
+    _write_kb(kb_dir)
+    build_search_index(str(temp_project["base"]))
+
+    pack = KBPack.for_kb_dir(str(kb_dir))
+    assert pack is not None
+    assert pack.pack_path.endswith(PACK_FILENAME)
+    assert pack.paths() == ["a.md", "sample.md", "sub/b.md"]
+    assert bytes(pack.get_bytes("a.md")) == (kb_dir / "a.md").read_bytes()
+    assert pack.read_text("missing.md") is None
+
+    assert pack.search(literal_bytes_pattern("社会化")) == ["a.md"]
+    assert pack.search(literal_bytes_pattern("social")) == ["sub/b.md"]
+    # Matches must not span article boundaries
+    assert pack.search(re.compile(rb"things\n\x00")) == []
+
+
+def test_update_rewrites_pack_and_search_reads_from_it(temp_project):
+    kb_dir = temp_project["kb_dir"]
+    base_dir = str(temp_project["base"])
+    _write_kb(kb_dir)
+    build_search_index(base_dir)
+
+    (kb_dir / "a.md").write_text("# A\n\n内容已更新\n", encoding="utf-8")
+    update_search_index(base_dir)
+    pack = KBPack.for_kb_dir(str(kb_dir))
+    assert pack.read_text("a.md") == "# A\n\n内容已更新\n"
+    assert pack.read_text("sub/b.md").startswith("# B")
+
+    # Regex topics scan every packed body
+    result = perform_quick_search("SOCIAL\\s+things", base_dir)
+    assert result["index_file_path"]
+
+
+def test_stale_pack_bodies_are_not_served(temp_project):
+    kb_dir = temp_project["kb_dir"]
+    base_dir = str(temp_project["base"])
+    _write_kb(kb_dir)
+    build_search_index(base_dir)
+
+    pack = KBPack.for_kb_dir(str(kb_dir))
+    assert pack.is_fresh("a.md", os.stat(kb_dir / "a.md"))
+
+    # Edited (e.g. by a git pull) without update-index
+    (kb_dir / "a.md").write_text("# A\n\n新的社会化内容\n", encoding="utf-8")
+    os.utime(kb_dir / "a.md", ns=(10 ** 18, 10 ** 18))
+    (kb_dir / "sub" / "b.md").unlink()
+    assert not pack.is_fresh("a.md", os.stat(kb_dir / "a.md"))
+    assert _read_body(str(kb_dir), "a.md") == "# A\n\n新的社会化内容\n"
+    assert _read_body(str(kb_dir), "sub/b.md") is None
+
+    # update-index records the new mtime, so the pack is trusted again
+    update_search_index(base_dir)
+    pack = KBPack.for_kb_dir(str(kb_dir))
+    assert pack.is_fresh("a.md", os.stat(kb_dir / "a.md"))
+    assert "sub/b.md" not in pack
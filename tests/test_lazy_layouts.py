@@ -0,0 +1,90 @@
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from document_generator.api import load_index
+from document_generator.job_manifest import manifest_path, read_manifest
+from document_generator.scheduler import ensure_artifact, schedule_documents
+from utils import create_job_dir
+from workflow import default_runner, ensure_layout, run_deep_search_workflow, run_document_generators
+
+
+def _generate_job(temp_project, sample_index_file, project_root, **kwargs):
+    job_id, job_dir = create_job_dir(str(temp_project["output_dir"]))
+    files = run_document_generators(str(sample_index_file), str(temp_project["kb_dir"]),
+                                    output_dir=job_dir, base_dir=str(project_root),
+                                    job_id=job_id, **kwargs)
+    return job_id, job_dir, files
+
+
+def test_only_delivery_artifacts_are_generated(temp_project, sample_index_file, project_root):
+    job_id, job_dir, files = _generate_job(temp_project, sample_index_file, project_root)
+
+    assert set(files) == {"md", "html", "epub"}
+    manifest = read_manifest(manifest_path(job_dir, job_id))
+    assert list(manifest["artifacts"]) == ["epub", "source_based", "html"]
+    assert manifest["inputs"]["index_path"] == str(sample_index_file)
+    assert not [name for name in os.listdir(job_dir) if "_thematic_" in name]
+
+
+def test_layout_is_generated_on_first_request(temp_project, sample_index_file, project_root):
+    job_id, job_dir, _ = _generate_job(temp_project, sample_index_file, project_root)
+
+    path = ensure_layout(job_dir, job_id, "thematic")
+    assert os.path.dirname(path) == job_dir
+    assert "Sample body with AI mention." in open(path, encoding="utf-8").read()
+    manifest = read_manifest(manifest_path(job_dir, job_id))
+    assert manifest["artifacts"]["thematic"]["path"] == path
+    assert manifest["artifacts"]["html"]  # earlier artifacts are kept
+
+    mtime = os.path.getmtime(path)
+    assert ensure_layout(job_dir, job_id, "thematic") == path
+    assert os.path.getmtime(path) == mtime
+
+    with pytest.raises(ValueError):
+        ensure_layout(job_dir, job_id, "unknown")
+
+
+def test_subprocess_runner_builds_declared_artifacts(temp_project, sample_index_file, project_root):
+    job_id, job_dir, files = _generate_job(temp_project, sample_index_file, project_root,
+                                           runner=default_runner, artifacts=["html"])
+
+    assert list(files) == ["html"]
+    assert not os.path.exists(manifest_path(job_dir, f"{job_id}_epub"))
+    assert ensure_layout(job_dir, job_id, "summary").endswith("_summary_文档.md")
+
+
+def test_manifest_without_inputs_cannot_generate(temp_project, sample_index_file):
+    output_dir = str(temp_project["output_dir"])
+    manifest_file = manifest_path(output_dir, "job")
+    schedule_documents(load_index(str(sample_index_file)), str(temp_project["kb_dir"]), output_dir,
+                       layouts=["html"], epub=False, job_id="job", manifest_file=manifest_file)
+
+    assert ensure_artifact(manifest_file, "html").endswith("_html_文档.html")
+    with pytest.raises(ValueError):
+        ensure_artifact(manifest_file, "thematic")
+
+
+def test_deep_search_job_keeps_its_own_index(temp_project, sample_index_file, project_root):
+    shared_index = temp_project["output_dir"] / "AI_index.json"
+
+    def fake_claude_invoker(prompt, base_dir):
+        return SimpleNamespace(stdout=f"[[[ {shared_index} ]]]", stderr="", returncode=0)
+
+    result = run_deep_search_workflow("AI", str(project_root), str(temp_project["kb_dir"]),
+                                      output_dir=str(temp_project["output_dir"]),
+                                      claude_invoker=fake_claude_invoker)
+    job_dir, job_id = result["output_dir"], result["job_id"]
+    assert os.path.dirname(result["index_path"]) == job_dir
+    manifest = read_manifest(manifest_path(job_dir, job_id))
+    assert manifest["inputs"]["index_path"] == result["index_path"]
+
+    # A later search on the same topic overwrites the shared index
+    data = json.loads(shared_index.read_text(encoding="utf-8"))
+    data["sources"][0]["full_content"] = "Another job's body."
+    shared_index.write_text(json.dumps(data), encoding="utf-8")
+
+    path = ensure_layout(job_dir, job_id, "thematic")
+    assert "Sample body with AI mention." in open(path, encoding="utf-8").read()
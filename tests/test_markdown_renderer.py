@@ -0,0 +1,77 @@
+import glob
+import os
+import random
+
+import pytest
+
+from document_generator.markdown_renderer import markdown_to_html
+from legacy_markdown import legacy_markdown_to_html
+
+ARTICLE = """# 社会化
+
+**社会化**是*个体*习得规范的过程，参见 [回答](https://www.zhihu.com/question/1/answer_2_3)。
+
+## 要点
+
+- 第一点
+- 第二点，包含 __加粗__ 与 `代码`
+* 第三点
+
+1. 步骤一
+2. 步骤二
+
+> 引用的一段话。
+>没有空格的引用
+
+```
+code block
+- not a list
+```
+
+---
+***
+普通段落第一行
+普通段落第二行\r
+  缩进的行
+
+#不是标题
+####### 七级不是标题
+"""
+
+# Random fragments that exercise the order-dependent legacy passes
+_FRAGMENTS = ["#", "# ", "## ", "###### ", "*", "**", "_", "__", "[", "]", "(", ")", "`", "```",
+              "- ", "* ", "1. ", " 2. ", "　- ", "> ", ">", "---", "***", "\n", "\n\n",
+              "  ", "a", "中文", "<x>", "<", ">", "\r", "\t"]
+
+
+@pytest.mark.parametrize("link_target", [None, "_blank"])
+def test_matches_legacy_on_sample_article(link_target):
+    assert markdown_to_html(ARTICLE, link_target) == legacy_markdown_to_html(ARTICLE, link_target)
+
+
+def test_link_target_and_empty_input():
+    assert markdown_to_html("见[a](b)", "_blank") == '<p>见<a href="b" target="_blank">a</a></p>'
+    assert markdown_to_html("见[a](b)") == '<p>见<a href="b">a</a></p>'
+    assert markdown_to_html("") == ""
+
+
+def test_matches_legacy_on_random_markdown():
+    rng = random.Random(0)
+    for _ in range(5000):
+        text = "".join(rng.choice(_FRAGMENTS) for _ in range(rng.randint(0, 30)))
+        for link_target in (None, "_blank"):
+            assert markdown_to_html(text, link_target) == legacy_markdown_to_html(text, link_target), repr(text)
+
+
+def test_matches_legacy_on_knowledge_base(project_root):
+    paths = glob.glob(os.path.join(str(project_root), "knowledge_base", "sth-matters", "**", "*.md"),
+                      recursive=True)
+    if not paths:
+        pytest.skip("knowledge base not checked out")
+    mismatches = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        if markdown_to_html(text, "_blank") != legacy_markdown_to_html(text, "_blank"):
+            mismatches.append(path)
+    assert not mismatches
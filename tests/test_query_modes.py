@@ -0,0 +1,72 @@
+import re
+import time
+
+import pytest
+
+from query_modes import (Hits, RegexTimeout, get_matcher, map_with_budget, parse_boolean,
+                         parse_query, regex_scan)
+
+
+def test_parse_query_auto_mode_keeps_historical_behaviour():
+    assert parse_query("社会化").mode == "literal"
+    assert parse_query("社会.*教育").mode == "regex"
+    keywords = parse_query("社会化 | 家庭教育")
+    assert keywords.mode == "keywords"
+    assert keywords.terms == ("社会化", "家庭教育")
+
+
+def test_parse_query_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        parse_query("AI", mode="fuzzy")
+
+
+def test_parse_boolean_groups():
+    groups = parse_boolean('社会化 教育 -学校 | "family value" NOT school OR AI AND ML')
+    assert groups == (
+        (("社会化", "教育"), ("学校",)),
+        (("family value",), ("school",)),
+        (("AI", "ML"), ()),
+    )
+
+
+def test_literal_matcher_ignores_regex_metacharacters_and_case():
+    match = get_matcher(parse_query("C++", mode="literal"))
+    assert match("Learning c++ and C++") == Hits({"C++": 2}, [(9, 12), (17, 20)])
+    assert match("Learning C") is None
+
+
+def test_boolean_matcher():
+    match = get_matcher(parse_query("社会化 -学校 | 家庭", mode="boolean"))
+    assert match("社会化与教育") == Hits({"社会化": 1}, [(0, 3)])
+    assert match("社会化与学校") is None
+    assert match("家庭与学校") == Hits({"家庭": 1}, [(0, 2)])
+
+
+def test_regex_scan_counts_matches():
+    pattern = re.compile("a", re.IGNORECASE)
+    count, spans = regex_scan(pattern, "A a\n" * 10)
+    assert count == 20
+    assert spans[:3] == [(0, 1), (2, 3), (4, 5)]
+
+
+def test_regex_scan_keeps_anchors_and_long_matches():
+    content = "x" * 100000 + "\n" + "y" * 100000
+    assert regex_scan(re.compile(r"\Ax"), content)[0] == 1
+    assert regex_scan(re.compile(r"x\ny"), content) == (1, [(99999, 100002)])
+
+
+def test_map_with_budget_stops_catastrophic_backtracking():
+    match = get_matcher(parse_query("(a+)+$", mode="regex"))
+    results = map_with_budget(match, ["aaa", "a" * 30 + "!", "aa"], budget=0.5)
+    assert next(results) == Hits({"(a+)+$": 1}, [(0, 3)])
+    started = time.perf_counter()
+    with pytest.raises(RegexTimeout):
+        next(results)
+    assert time.perf_counter() - started < 5
+
+
+def test_parse_query_rejects_invalid_regex():
+    with pytest.raises(ValueError):
+        parse_query("(", mode="regex")
+    with pytest.raises(ValueError):
+        parse_query("(")
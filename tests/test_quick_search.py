@@ -1,5 +1,9 @@
 import json
 import os
+import subprocess
+import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 from quick_search import perform_quick_search
 
@@ -25,3 +29,183 @@ def test_quick_search_no_results(temp_project):
 
     assert result["success"] is True
     assert result["index_file_path"] is None
+
+
+def test_quick_search_cli_prints_only_the_summary(temp_project, project_root):
+    completed = subprocess.run(
+        [sys.executable, str(project_root / "src" / "quick_search.py"),
+         "-b", str(temp_project["base"]), "search", "AI", "--no-cache"],
+        capture_output=True, text=True, encoding="utf-8", check=True,
+    )
+    result = json.loads(completed.stdout[completed.stdout.index("{\n"):])
+    assert result["success"] is True and result["index_file_path"]
+    assert "index_data" not in result
+    assert "AI content with keyword match." not in completed.stdout
+
+
+def test_quick_search_parallel_matches_serial(temp_project):
+    base_dir = str(temp_project["base"])
+    for i in range(12):
+        body = "AI topic" if i % 3 == 0 else "unrelated"
+        (temp_project["kb_dir"] / f"doc_{i:02d}.md").write_text(f"# Doc {i}\n\n{body}\n", encoding="utf-8")
+
+    def load_sources(result):
+        with open(result["index_file_path"], "r", encoding="utf-8") as f:
+            return json.load(f)["sources"]
+
+    serial = load_sources(perform_quick_search("AI", base_dir))
+    parallel = load_sources(perform_quick_search("AI", base_dir, workers=3))
+
+    assert [s["file_path"] for s in parallel] == [s["file_path"] for s in serial]
+    assert [s["id"] for s in parallel] == list(range(1, len(serial) + 1))
+    assert parallel == serial
+
+
+def test_quick_search_keyword_list_records_hits(temp_project):
+    base_dir = str(temp_project["base"])
+    kb_dir = temp_project["kb_dir"]
+    (kb_dir / "family.md").write_text("# 家庭\n\n家庭教育与社会化，社会化很重要\n", encoding="utf-8")
+    (kb_dir / "none.md").write_text("# 无关\n\n没有关键词\n", encoding="utf-8")
+
+    result = perform_quick_search("社会化 | 家庭教育 | keyword", base_dir)
+    with open(result["index_file_path"], "r", encoding="utf-8") as f:
+        sources = {s["file_path"]: s for s in json.load(f)["sources"]}
+
+    assert set(sources) == {"family.md", "sample.md"}
+    assert sources["family.md"]["keyword_hits"] == {"社会化": 2, "家庭教育": 1}
+    assert sources["family.md"]["key_concepts"] == ["社会化", "家庭教育"]
+    assert sources["sample.md"]["keyword_hits"] == {"keyword": 1}
+
+
+def test_quick_search_regex_alternation_is_not_split(temp_project):
+    result = perform_quick_search("key.ord|zzz", str(temp_project["base"]))
+    with open(result["index_file_path"], "r", encoding="utf-8") as f:
+        source = json.load(f)["sources"][0]
+    assert "keyword_hits" not in source
+
+
+def test_quick_search_ranks_and_cuts_off_top_k(temp_project):
+    base_dir = str(temp_project["base"])
+    kb_dir = temp_project["kb_dir"]
+    (kb_dir / "dense.md").write_text("# Dense\n\nAI AI AI AI\n", encoding="utf-8")
+    (kb_dir / "long.md").write_text("# Long\n\nAI " + "filler " * 500 + "\n", encoding="utf-8")
+
+    result = perform_quick_search("AI", base_dir, top_k=2)
+    with open(result["index_file_path"], "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    sources = data["sources"]
+    assert [s["file_path"] for s in sources] == ["dense.md", "sample.md"]
+    assert [s["rank"] for s in sources] == [1, 2]
+    assert [s["id"] for s in sources] == [1, 2]
+    assert sources[0]["score"] > sources[1]["score"]
+    assert data["metadata"]["total_matches"] == 3
+    assert data["metadata"]["total_sources"] == 2
+
+
+def test_quick_search_slim_index_feeds_generators(temp_project):
+    from document_generator.md_generator import MDDocumentGenerator
+
+    result = perform_quick_search("AI", str(temp_project["base"]), slim=True)
+    with open(result["index_file_path"], "r", encoding="utf-8") as f:
+        raw = f.read()
+    data = json.loads(raw)
+    source = data["sources"][0]
+
+    assert "\n" not in raw
+    assert data["metadata"]["index_format"] == "slim"
+    assert "full_content" not in source
+    assert len(source["content_hash"]) == 40
+
+    generator = MDDocumentGenerator(result["index_file_path"], str(temp_project["kb_dir"]))
+    assert "AI content with keyword match." in generator.generate_thematic_document()
+
+
+def test_quick_search_query_modes(temp_project):
+    base_dir = str(temp_project["base"])
+    kb_dir = temp_project["kb_dir"]
+    (kb_dir / "a.md").write_text("# A\n\n社会化 教育\n", encoding="utf-8")
+    (kb_dir / "b.md").write_text("# B\n\n社会化 学校\n", encoding="utf-8")
+    (kb_dir / "c.md").write_text("# C\n\n家庭 (AI)\n", encoding="utf-8")
+
+    def matched(topic, mode):
+        result = perform_quick_search(topic, base_dir, mode=mode, use_cache=False)
+        if result["index_file_path"] is None:
+            return set()
+        with open(result["index_file_path"], "r", encoding="utf-8") as f:
+            data = json.load(f)
+        assert data["metadata"]["query_mode"] == mode
+        return {s["file_path"] for s in data["sources"]}
+
+    assert matched("社会化 -学校 | 家庭", "boolean") == {"a.md", "c.md"}
+    assert matched("(AI)", "literal") == {"c.md"}
+    assert matched("(AI)", "regex") == {"c.md", "sample.md"}
+
+
+def test_quick_search_reports_bad_regex(temp_project):
+    base_dir = str(temp_project["base"])
+    result = perform_quick_search("(", base_dir, use_cache=False)
+    assert result["success"] is False
+    assert "Invalid regex" in result["error"]
+
+    (temp_project["kb_dir"] / "slow.md").write_text("a" * 30 + "!", encoding="utf-8")
+    result = perform_quick_search("(a+)+$", base_dir, use_cache=False)
+    assert result["success"] is False
+    assert "timed out" in result["error"]
+
+
+def test_concurrent_regex_searches_do_not_interfere(temp_project):
+    base_dir = str(temp_project["base"])
+    kb_dir = temp_project["kb_dir"]
+    for i in range(40):
+        (kb_dir / f"doc{i}.md").write_text(f"# Doc {i}\n\n" + "社会化 教育 " * (i + 1), encoding="utf-8")
+
+    def counts(topic):
+        result = perform_quick_search(topic, base_dir, mode="regex", use_cache=False, top_k=None,
+                                      output_dir=str(temp_project["output_dir"] / uuid.uuid4().hex))
+        assert "index_data" in result, result
+        # Scores follow the per-file match counts
+        return {s["file_path"]: s["score"] for s in result["index_data"]["sources"]}
+
+    topics = ["社会化.教育", "教育 社会", "Doc [0-9]+"] * 2
+    expected = {topic: counts(topic) for topic in set(topics)}
+    with ThreadPoolExecutor(max_workers=len(topics)) as executor:
+        results = list(executor.map(counts, topics))
+    assert results == [expected[topic] for topic in topics]
+
+
+def test_quick_search_previews_show_matches(temp_project):
+    base_dir = str(temp_project["base"])
+    body = "# 长文\n\n" + "前言。" * 200 + "这里讨论社会化的问题。" + "结尾。" * 200
+    (temp_project["kb_dir"] / "long.md").write_text(body, encoding="utf-8")
+
+    result = perform_quick_search("社会化", base_dir, snippet_window=10)
+    with open(result["index_file_path"], "r", encoding="utf-8") as f:
+        source = json.load(f)["sources"][0]
+
+    assert source["snippets"] == ["...前言。前言。这里讨论社会化的问题。结尾。结尾。..."]
+    assert source["content_preview"] == source["snippets"][0]
+
+
+def test_quick_search_tag_scope(temp_project):
+    from quick_search import build_search_index
+
+    base_dir = str(temp_project["base"])
+    kb_dir = temp_project["kb_dir"]
+    (kb_dir / "skill.md").write_text("# Skill\n\nAI 练习 #2A-功夫/1-核心能力\n", encoding="utf-8")
+    (kb_dir / "source.md").write_text("# Source\n\nAI 资料 #2A-功夫/2-信源管理\n", encoding="utf-8")
+    build_search_index(base_dir)
+
+    result = perform_quick_search("AI", base_dir, tag_scope="#2A-功夫/1-核心能力")
+    with open(result["index_file_path"], "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    assert [s["file_path"] for s in data["sources"]] == ["skill.md"]
+    assert data["sources"][0]["tags"] == ["#2A-功夫/1-核心能力"]
+    assert data["metadata"]["tag_scope"] == {
+        "tag": "#2A-功夫/1-核心能力",
+        "ancestors": ["#2A-功夫"],
+        "siblings": ["#2A-功夫/2-信源管理"],
+        "children": [],
+    }
+    assert perform_quick_search("AI", base_dir, tag_scope="#nope")["success"] is False
@@ -0,0 +1,21 @@
+import numpy as np
+
+from ranking import bm25_scores, top_k_indices
+
+
+def test_bm25_prefers_frequent_terms_in_short_documents():
+    term_freqs = np.array([[1, 0], [3, 0], [3, 0], [0, 1]])
+    doc_lengths = np.array([100, 100, 400, 100])
+    doc_freqs = np.array([3, 1])
+    scores = bm25_scores(term_freqs, doc_lengths, doc_freqs, total_docs=10)
+
+    assert scores[1] > scores[2] > scores[0] > 0
+    # The rarer term carries a higher IDF
+    assert scores[3] > scores[0]
+
+
+def test_top_k_is_ordered_and_stable_on_ties():
+    scores = [0.5, 2.0, 0.5, 1.0, 0.5]
+    assert top_k_indices(scores, 3).tolist() == [1, 3, 0]
+    assert top_k_indices(scores, None).tolist() == [1, 3, 0, 2, 4]
+    assert top_k_indices(scores, 0).tolist() == []
@@ -0,0 +1,75 @@
+import os
+
+from document_generator import render_cache
+from document_generator.epub_generator import EPUBDocumentGenerator
+from document_generator.markdown_renderer import markdown_to_html
+from document_generator.md_generator import MDDocumentGenerator
+from document_generator.render_cache import RenderCache, render_key
+from document_generator.source_store import SourceStore
+
+
+ARTICLE = "# Title\n\n" + "\n\n".join(
+    f"Paragraph {i} with **bold** and a [link](https://example.com/{i})." for i in range(40)
+)
+
+
+def test_render_matches_renderer_for_both_link_targets(tmp_path):
+    cache = RenderCache(str(tmp_path / "render_cache"))
+    assert cache.render(ARTICLE) == markdown_to_html(ARTICLE)
+    assert cache.render(ARTICLE, "_blank") == markdown_to_html(ARTICLE, "_blank")
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert len(os.listdir(tmp_path / "render_cache")) == 1
+
+
+def test_short_text_bypasses_cache(tmp_path):
+    cache = RenderCache(str(tmp_path / "render_cache"))
+    assert cache.render("a **short** one") == "<p>a <strong>short</strong> one</p>"
+    assert len(cache) == 0 and cache.misses == 0
+
+
+def test_entries_persist_across_instances(tmp_path):
+    cache_dir = str(tmp_path / "render_cache")
+    RenderCache(cache_dir).render(ARTICLE)
+
+    reloaded = RenderCache(cache_dir)
+    assert render_key(ARTICLE) in reloaded
+    assert reloaded.render(ARTICLE, "_blank") == markdown_to_html(ARTICLE, "_blank")
+    assert (reloaded.hits, reloaded.misses) == (1, 0)
+
+
+def test_renderer_version_invalidates_entries(tmp_path, monkeypatch):
+    cache = RenderCache(str(tmp_path / "render_cache"))
+    cache.render(ARTICLE)
+    monkeypatch.setattr(render_cache, "RENDERER_VERSION", 2)
+    cache.render(ARTICLE)
+    assert cache.misses == 2
+
+
+def test_lru_eviction_in_memory_and_on_disk(tmp_path):
+    cache_dir = tmp_path / "render_cache"
+    cache = RenderCache(str(cache_dir), memory_budget=250, disk_budget=250)
+    cache.put("a", "a" * 100)
+    cache.put("b", "b" * 100)
+    assert cache.get("a") == "a" * 100  # a becomes most recently used
+    cache.put("c", "c" * 100)  # evicts b
+
+    assert "b" not in cache
+    assert sorted(os.listdir(cache_dir)) == ["a.html", "c.html"]
+    assert cache.get("b") is None
+    assert RenderCache(str(cache_dir)).get("a") == "a" * 100
+
+
+def test_generators_share_rendered_article(temp_project, sample_index_file):
+    kb_dir = str(temp_project["kb_dir"])
+    temp_project["sample_md"].write_text(ARTICLE, encoding="utf-8")
+    store = SourceStore(kb_dir)
+    cache = RenderCache(str(temp_project["base"] / "render_cache"))
+
+    md = MDDocumentGenerator(str(sample_index_file), kb_dir, source_store=store, render_cache=cache)
+    assert markdown_to_html(ARTICLE, "_blank") in md.generate_document("html")
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    epub = EPUBDocumentGenerator(str(sample_index_file), kb_dir, source_store=store, render_cache=cache)
+    chapter = epub._create_chapter_content(epub.index_data["sources"][0])
+    assert markdown_to_html(ARTICLE) in chapter
+    assert (cache.hits, cache.misses) == (1, 1)
@@ -0,0 +1,70 @@
+import json
+
+import quick_search
+from quick_search import build_search_index, perform_quick_search, update_search_index
+from query_modes import cache_form, parse_query
+from result_cache import QueryCache, make_cache_key
+
+
+def test_lru_eviction_and_persistence(tmp_path):
+    cache = QueryCache(str(tmp_path), max_entries=2)
+    cache.put("a", [{"file_path": "a.md"}])
+    cache.put("b", [])
+    assert cache.get("a") == {"records": [{"file_path": "a.md"}]}
+    cache.put("c", [{"file_path": "c.md"}])
+
+    assert "b" not in cache  # least recently used
+    reloaded = QueryCache(str(tmp_path), max_entries=2)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.json", "c.json"]
+    assert reloaded.get("a")["records"] == [{"file_path": "a.md"}]
+
+
+def test_key_normalization():
+    assert cache_form(parse_query(" AI ")) == cache_form(parse_query("ai"))
+    # The literal matcher does not apply NFKC, so full-width text is another query
+    assert cache_form(parse_query("ＡＩ")) != cache_form(parse_query("AI"))
+    assert cache_form(parse_query(r"\S+")) == ["regex", r"\S+"]
+    # Boolean operators are only operators in upper case
+    assert (cache_form(parse_query("社会化 OR 家庭", mode="boolean"))
+            != cache_form(parse_query("社会化 or 家庭", mode="boolean")))
+    assert make_cache_key("ai", {"top_k": 5}, "v1") != make_cache_key("ai", {"top_k": 5}, "v2")
+
+
+def test_boolean_operator_case_is_not_served_from_cache(temp_project):
+    base_dir = str(temp_project["base"])
+    kb_dir = temp_project["kb_dir"]
+    (kb_dir / "a.md").write_text("# A\n\n社会化\n", encoding="utf-8")
+    (kb_dir / "b.md").write_text("# B\n\n社会化 or 家庭\n", encoding="utf-8")
+    (kb_dir / "c.md").write_text("# C\n\n家庭\n", encoding="utf-8")
+    build_search_index(base_dir)
+
+    def matched(topic):
+        result = perform_quick_search(topic, base_dir, mode="boolean")
+        return {s["file_path"] for s in result["index_data"]["sources"]}
+
+    assert matched("社会化 OR 家庭") == {"a.md", "b.md", "c.md"}
+    assert matched("社会化 or 家庭") == {"b.md"}
+
+
+def test_quick_search_reuses_cached_results_until_kb_changes(temp_project, monkeypatch):
+    base_dir = str(temp_project["base"])
+    build_search_index(base_dir)
+    first = perform_quick_search("AI", base_dir)
+    missing = perform_quick_search("NoMatchKeyword", base_dir)
+    assert missing["index_file_path"] is None
+
+    def fail_scan(*args, **kwargs):
+        raise AssertionError("scan should be served from the cache")
+
+    monkeypatch.setattr(quick_search, "_scan_targets", fail_scan)
+    second = perform_quick_search("ai ", base_dir)
+    assert perform_quick_search("NoMatchKeyword", base_dir)["index_file_path"] is None
+    with open(first["index_file_path"], encoding="utf-8") as f1, \
+            open(second["index_file_path"], encoding="utf-8") as f2:
+        assert json.load(f1)["sources"][0]["full_content"] == json.load(f2)["sources"][0]["full_content"]
+
+    monkeypatch.undo()
+    (temp_project["kb_dir"] / "new.md").write_text("# New\n\nAI again\n", encoding="utf-8")
+    update_search_index(base_dir)
+    with open(perform_quick_search("AI", base_dir)["index_file_path"], encoding="utf-8") as f:
+        assert json.load(f)["metadata"]["total_sources"] == 2
@@ -0,0 +1,32 @@
+import os
+
+from document_generator.api import DEFAULT_LAYOUTS, load_index
+from document_generator.scheduler import format_timings, schedule_documents
+
+
+def test_schedule_documents_serial_and_parallel(temp_project, sample_index_file):
+    index_data = load_index(str(sample_index_file))
+    kb_dir, output_dir = str(temp_project["kb_dir"]), str(temp_project["output_dir"])
+
+    serial = schedule_documents(index_data, kb_dir, os.path.join(output_dir, "serial"), workers=1)
+    parallel = schedule_documents(index_data, kb_dir, os.path.join(output_dir, "parallel"), workers=2)
+
+    for result in (serial, parallel):
+        assert list(result["artifacts"]) == ["epub", *DEFAULT_LAYOUTS]
+        assert set(result["timings"]) == set(result["artifacts"])
+        assert all(seconds >= 0 for seconds in result["timings"].values())
+        for path in result["artifacts"].values():
+            assert os.path.exists(path)
+
+    def body(path):
+        with open(path, encoding="utf-8") as f:
+            return [line for line in f if not line.startswith("**生成日期**")]
+
+    assert body(serial["artifacts"]["source_based"]) == body(parallel["artifacts"]["source_based"])
+
+
+def test_format_timings_lists_long_pole_first():
+    report = format_timings({"html": 0.1, "epub": 2.0, "summary": 0.01}, 2.2)
+    lines = report.splitlines()
+    assert [line.split()[0] for line in lines[1:4]] == ["epub", "html", "summary"]
+    assert lines[-1].split()[0] == "总计"
@@ -0,0 +1,63 @@
+import json
+
+import numpy as np
+
+from kb_index import build_index, default_index_dir
+from quick_search import build_semantic_search_index, perform_quick_search
+from semantic_index import SemanticIndex, _sparse_matmul, build_semantic_index, randomized_svd
+
+_DOCS = {
+    "family/a.md": "# 家庭\n\n家庭教育 亲子关系 父母 孩子 社会化",
+    "family/b.md": "# 亲子\n\n亲子关系 父母 孩子 家庭教育",
+    "skill/c.md": "# 功夫\n\n核心能力 功夫 练习 基本功",
+    "skill/d.md": "# 基本功\n\n基本功 功夫 练习 核心能力 信源管理",
+    "misc/e.md": "# 杂谈\n\nAI 伦理 技术 社会",
+}
+
+
+def _write_kb(kb_dir):
+    for rel_path, body in _DOCS.items():
+        path = kb_dir / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(body, encoding="utf-8")
+
+
+def test_sparse_helpers_match_dense():
+    dense = np.array([[1.0, 0, 2], [0, 0, 0], [0, 3, 4]])
+    data, indices, indptr = np.array([1.0, 2, 3, 4]), np.array([0, 2, 1, 2]), np.array([0, 2, 2, 4])
+    other = np.arange(6.0).reshape(3, 2)
+    assert np.allclose(_sparse_matmul(data, indices, indptr, other), dense @ other)
+
+    u, s, v = randomized_svd(data, indices, indptr, 3, 2)
+    assert np.allclose(s, np.linalg.svd(dense, compute_uv=False)[:2])
+
+
+def test_similar_with_and_without_svd(temp_project):
+    kb_dir = temp_project["kb_dir"]
+    _write_kb(kb_dir)
+    index_dir = default_index_dir(str(kb_dir))
+    build_index(str(kb_dir), index_dir)
+
+    for svd_dim in (0, 3):
+        stats = build_semantic_index(str(kb_dir), index_dir, svd_dim=svd_dim)
+        assert stats["svd_dim"] == svd_dim
+        index = SemanticIndex.load(index_dir)
+        assert isinstance(index.data, np.memmap)
+        top = [path for path, _ in index.similar("父母与孩子的家庭教育", k=2)]
+        assert set(top) == {"family/a.md", "family/b.md"}
+
+
+def test_quick_search_semantic_mode(temp_project):
+    base_dir = str(temp_project["base"])
+    _write_kb(temp_project["kb_dir"])
+    assert perform_quick_search("功夫", base_dir, mode="semantic")["success"] is False
+
+    assert build_semantic_search_index(base_dir, svd_dim=3)["success"] is True
+    result = perform_quick_search("基本功练习", base_dir, mode="semantic", top_k=2)
+    with open(result["index_file_path"], "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    assert {s["file_path"] for s in data["sources"]} == {"skill/c.md", "skill/d.md"}
+    assert data["metadata"]["query_mode"] == "semantic"
+    assert data["sources"][0]["score"] >= data["sources"][1]["score"] > 0
+    assert "related_terms" in data["metadata"]
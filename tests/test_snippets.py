@@ -0,0 +1,29 @@
+from snippets import build_snippets
+
+
+def test_build_snippets_prefers_dense_regions():
+    content = "AI intro. " + "x" * 200 + " AI and more AI here. " + "y" * 200
+    first = content.index("AI and")
+    second = content.index("AI here")
+    spans = [(0, 2), (first, first + 2), (second, second + 2)]
+
+    snippets = build_snippets(content, spans, window=20, max_snippets=1)
+    assert len(snippets) == 1
+    assert "AI and more AI here" in snippets[0]
+    assert snippets[0].startswith("...") and snippets[0].endswith("...")
+
+
+def test_build_snippets_are_single_line_and_in_document_order():
+    content = "# Title\n\nfirst hit\n\n" + "z" * 300 + "\nsecond\nhit\n"
+    spans = [(content.index("second"), content.index("second") + 6),
+             (content.index("first"), content.index("first") + 5)]
+
+    snippets = build_snippets(content, spans, window=10)
+    assert len(snippets) == 2
+    assert "first hit" in snippets[0]
+    assert snippets[1].endswith("second hit")
+    assert all("\n" not in s for s in snippets)
+
+
+def test_build_snippets_without_spans():
+    assert build_snippets("text", []) == []
@@ -0,0 +1,118 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from document_generator.md_generator import MDDocumentGenerator
+from document_generator.source_store import SourceStore
+from quick_search import build_search_index
+
+
+def test_resolve_handles_prefixes(temp_project):
+    kb_dir = temp_project["kb_dir"]
+    store = SourceStore(str(kb_dir))
+    expected = str(kb_dir / "a" / "b.md")
+    assert store.resolve("a/b.md") == expected
+    assert store.resolve("knowledge_base/sth-matters/a/b.md") == expected
+    assert store.resolve("sth-matters/a/b.md") == expected
+    assert store.resolve(expected) == expected
+
+
+def test_get_exposes_title_body_and_word_count(temp_project):
+    store = SourceStore(str(temp_project["kb_dir"]))
+    document = store.get("sample.md")
+    assert document.found
+    assert document.title == "Sample Title"
+    assert document.word_count == len(temp_project["sample_md"].read_text(encoding="utf-8"))
+
+    missing = store.get("missing.md")
+    assert not missing.found and missing.error.startswith("无法找到文件")
+    assert store.read_text("missing.md") == missing.error
+
+
+def test_lru_budget_and_mtime_invalidation(temp_project):
+    kb_dir = temp_project["kb_dir"]
+    for name in ("a", "b", "c"):
+        (kb_dir / f"{name}.md").write_text(name * 100, encoding="utf-8")
+    store = SourceStore(str(kb_dir), byte_budget=250)
+
+    store.get("a.md")
+    store.get("b.md")
+    store.get("a.md")  # a becomes most recently used
+    store.get("c.md")  # evicts b
+    assert store.cached_bytes <= 250
+    assert (store.hits, store.misses) == (1, 3)
+    store.get("a.md")
+    assert store.hits == 2
+    store.get("b.md")
+    assert store.misses == 4
+
+    path = kb_dir / "a.md"
+    path.write_text("changed", encoding="utf-8")
+    os.utime(path, (1, 1))
+    assert store.get("a.md").text == "changed"
+
+    # A rewrite that keeps the mtime but changes the size is still picked up
+    path.write_text("changed again", encoding="utf-8")
+    os.utime(path, (1, 1))
+    assert store.get("a.md").text == "changed again"
+
+
+def test_concurrent_reads_keep_byte_budget(temp_project):
+    kb_dir = temp_project["kb_dir"]
+    names = [f"doc{i}.md" for i in range(40)]
+    for i, name in enumerate(names):
+        (kb_dir / name).write_text(f"# Doc {i}\n" + "x" * (50 + i), encoding="utf-8")
+    store = SourceStore(str(kb_dir), byte_budget=1000)
+
+    def read_all(offset):
+        for step in range(200):
+            name = names[(offset + step * 7) % len(names)]
+            assert store.get(name).title == f"Doc {names.index(name)}"
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(read_all, range(8)))
+
+    assert store.cached_bytes <= 1000
+    assert store.cached_bytes == sum(d.size for d in store._documents.values())
+    assert store.hits + store.misses == 8 * 200
+
+
+def test_generator_reads_each_source_once(temp_project, sample_index_file):
+    store = SourceStore(str(temp_project["kb_dir"]))
+    generator = MDDocumentGenerator(str(sample_index_file), str(temp_project["kb_dir"]),
+                                    source_store=store)
+    for layout in ("thematic", "source_based", "concepts", "summary", "html"):
+        generator.generate_document(layout)
+    assert store.misses == 1
+    assert store.hits > 1
+
+
+def test_edited_article_is_not_served_from_stale_pack(temp_project):
+    kb_dir = temp_project["kb_dir"]
+    build_search_index(str(temp_project["base"]))
+    store = SourceStore(str(kb_dir))
+    assert store.get("sample.md").title == "Sample Title"
+
+    # A git pull without update-index: the pack still holds the old body
+    path = kb_dir / "sample.md"
+    path.write_text("# Edited Title\n\nNew body", encoding="utf-8")
+    os.utime(path, (10 ** 9, 10 ** 9))
+    document = store.get("sample.md")
+    assert document.title == "Edited Title"
+    assert document.text == "# Edited Title\n\nNew body"
+
+
+def test_html_layout_flags_missing_articles(temp_project):
+    index_data = {
+        "metadata": {"topic": "AI", "total_sources": 2},
+        "sources": [
+            {"id": 1, "title": "Sample Title", "file_path": "sample.md", "category": "AI"},
+            {"id": 2, "title": "Gone", "file_path": "gone.md", "category": "AI"},
+        ],
+    }
+    generator = MDDocumentGenerator(None, str(temp_project["kb_dir"]), index_data=index_data)
+    document = generator.generate_document("html")
+
+    assert '<div class="original-content">' in document
+    missing = document.split('font-style: italic;">', 1)[1]
+    assert missing.strip().startswith("无法找到文件")
+    assert "<p>无法找到文件" not in document
@@ -0,0 +1,98 @@
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+import pytest
+
+from document_generator.api import ALL_LAYOUTS
+from document_generator.md_generator import MDDocumentGenerator
+
+SOURCES = 5000
+
+# Runs in a fresh interpreter so ru_maxrss only reflects this workload
+MEMORY_PROBE = r"""
+import json, os, resource, sys, tracemalloc
+sys.path.insert(0, sys.argv[1])
+from document_generator.md_generator import MDDocumentGenerator
+from document_generator.render_cache import RenderCache
+from document_generator.source_store import SourceStore
+
+kb_dir, output_dir, count = sys.argv[2], sys.argv[3], int(sys.argv[4])
+body = "# Title {}\n\n" + ("AI paragraph with **bold** and a [link](https://example.com). " * 40 + "\n\n") * 2
+sources = []
+for i in range(count):
+    with open(os.path.join(kb_dir, f"doc_{i}.md"), "w", encoding="utf-8") as f:
+        f.write(body.format(i))
+    sources.append({"id": i, "title": f"Title {i}", "file_path": f"doc_{i}.md",
+                    "category": f"category_{i % 7}", "tags": ["AI"], "key_concepts": ["AI"],
+                    "content_preview": "AI", "word_count": len(body)})
+index_data = {"metadata": {"topic": "AI", "total_sources": count}, "sources": sources}
+
+def generator():
+    # Caches with small budgets, so the bound reflects the writer, not the caches
+    return MDDocumentGenerator(None, kb_dir, index_data=index_data,
+                               source_store=SourceStore(kb_dir, byte_budget=1 << 20),
+                               render_cache=RenderCache(None, memory_budget=1 << 20))
+
+rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+for layout in ("thematic", "source_based"):
+    generator().write_document(layout, os.path.join(output_dir, layout + ".md"))
+rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+
+tracemalloc.start()
+generator().write_document("thematic", os.path.join(output_dir, "traced.md"))
+peak = tracemalloc.get_traced_memory()[1]
+tracemalloc.stop()
+
+sizes = {name: os.path.getsize(os.path.join(output_dir, name)) for name in os.listdir(output_dir)}
+print(json.dumps({"rss_growth_kb": rss_growth, "tracemalloc_peak": peak, "sizes": sizes}))
+"""
+
+
+def test_streaming_memory_is_bounded_for_large_index(tmp_path, project_root):
+    pytest.importorskip("resource")
+    kb_dir = tmp_path / "knowledge_base" / "sth-matters"
+    output_dir = tmp_path / "output"
+    kb_dir.mkdir(parents=True)
+    output_dir.mkdir()
+
+    completed = subprocess.run(
+        [sys.executable, "-c", MEMORY_PROBE, str(project_root / "src"),
+         str(kb_dir), str(output_dir), str(SOURCES)],
+        capture_output=True, text=True, encoding="utf-8", check=True,
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    corpus = result["sizes"]["thematic.md"]
+    assert corpus > 15 * 1024 * 1024
+    assert result["sizes"]["source_based.md"] > 15 * 1024 * 1024
+    # Building the document in memory peaks at several copies of the corpus
+    assert result["tracemalloc_peak"] < 8 * 1024 * 1024
+    assert result["rss_growth_kb"] < 48 * 1024
+
+
+def test_streamed_output_matches_joined_document(temp_project, sample_index_file):
+    generator = MDDocumentGenerator(str(sample_index_file), str(temp_project["kb_dir"]))
+    generator.build_time = datetime(2024, 1, 1)
+    for layout in ALL_LAYOUTS:
+        path = temp_project["output_dir"] / f"{layout}.out"
+        generator.write_document(layout, str(path))
+        assert path.read_text(encoding="utf-8") == generator.generate_document(layout), layout
+    assert not [name for name in os.listdir(temp_project["output_dir"]) if name.endswith(".tmp")]
+
+
+def test_failed_stream_leaves_no_partial_file(temp_project, sample_index_file, monkeypatch):
+    generator = MDDocumentGenerator(str(sample_index_file), str(temp_project["kb_dir"]))
+
+    def broken():
+        yield "# partial\n"
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(generator, "iter_thematic_document", broken)
+    path = temp_project["output_dir"] / "thematic.md"
+    with pytest.raises(RuntimeError):
+        generator.write_document("thematic", str(path))
+    assert not path.exists()
+    assert os.listdir(temp_project["output_dir"]) == ["AI_index.json"]
@@ -0,0 +1,47 @@
+from kb_index import build_index, default_index_dir, update_index
+from tag_taxonomy import TagTaxonomy, extract_tags, normalize_tag
+
+
+def test_extract_tags():
+    content = (
+        "# 标题\n\n相关：#2A-功夫/1-核心能力/ 以及 #3-家庭伦理/2-亲子关系/2b-家庭教育。\n"
+        "见 https://example.com/page#anchor 与 ## 小节，编号 #1，重复 #2A-功夫/1-核心能力\n"
+    )
+    assert extract_tags(content) == ["#2A-功夫/1-核心能力", "#3-家庭伦理/2-亲子关系/2b-家庭教育"]
+    assert normalize_tag("2A-功夫//1-核心能力/") == "#2A-功夫/1-核心能力"
+
+
+def test_taxonomy_queries():
+    taxonomy = TagTaxonomy({
+        "a.md": ["#2A-功夫/1-核心能力"],
+        "b.md": ["#2A-功夫/2-信源管理"],
+        "c.md": ["#2A-功夫"],
+        "d.md": ["#3-家庭伦理/2-亲子关系/2b-家庭教育"],
+    })
+
+    assert taxonomy.children("#2A-功夫") == ["#2A-功夫/1-核心能力", "#2A-功夫/2-信源管理"]
+    assert taxonomy.siblings("2A-功夫/1-核心能力") == ["#2A-功夫/2-信源管理"]
+    assert taxonomy.ancestors("#3-家庭伦理/2-亲子关系/2b-家庭教育") == ["#3-家庭伦理/2-亲子关系", "#3-家庭伦理"]
+    assert taxonomy.docs_under("#2A-功夫") == ("a.md", "b.md", "c.md")
+    assert taxonomy.docs_at("#2A-功夫") == ["c.md"]
+    assert taxonomy.docs_under("#missing") == ()
+
+    taxonomy.remove_documents(["b.md"])
+    assert "#2A-功夫/2-信源管理" not in taxonomy
+    assert taxonomy.docs_under("#2A-功夫") == ("a.md", "c.md")
+
+
+def test_taxonomy_is_maintained_by_index_updates(temp_project):
+    kb_dir = temp_project["kb_dir"]
+    index_dir = default_index_dir(str(kb_dir))
+    (kb_dir / "tagged.md").write_text("# T\n\n#2A-功夫/1-核心能力\n", encoding="utf-8")
+    build_index(str(kb_dir), index_dir)
+    assert TagTaxonomy.load(index_dir).docs_under("#2A-功夫") == ("tagged.md",)
+
+    (kb_dir / "tagged.md").write_text("# T\n\n#2A-功夫/2-信源管理\n", encoding="utf-8")
+    (kb_dir / "new.md").write_text("# N\n\n#2A-功夫/1-核心能力\n", encoding="utf-8")
+    update_index(str(kb_dir), index_dir)
+
+    taxonomy = TagTaxonomy.load(index_dir)
+    assert taxonomy.docs_under("#2A-功夫/1-核心能力") == ("new.md",)
+    assert taxonomy.docs_under("#2A-功夫/2-信源管理") == ("tagged.md",)
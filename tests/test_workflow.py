@@ -4,6 +4,7 @@ from types import SimpleNamespace
 import pytest
 
 from workflow import (
+    default_runner,
     extract_index_path,
     run_document_generators,
     run_deep_search_workflow,
@@ -33,6 +34,20 @@ def test_run_document_generators(temp_project, sample_index_file, project_root):
     assert "epub" in files and os.path.exists(files["epub"])
 
 
+def test_run_document_generators_with_subprocess_runner(temp_project, sample_index_file, project_root):
+    files = run_document_generators(
+        index_path=str(sample_index_file),
+        kb_dir=str(temp_project["kb_dir"]),
+        output_dir=str(temp_project["output_dir"]),
+        runner=default_runner,
+        base_dir=str(project_root),
+    )
+
+    assert set(files) == {"md", "html", "epub"}
+    for path in files.values():
+        assert os.path.exists(path)
+
+
 def test_run_deep_search_workflow_with_fake_claude(temp_project, project_root):
     index_path = temp_project["output_dir"] / "AI_index.json"
 